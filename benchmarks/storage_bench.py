@@ -0,0 +1,275 @@
+# benchmarks/storage_bench.py
+"""
+Micro-benchmarks for every persisted dataset.
+
+Generates synthetic data shaped like ``modlogs.json``, ``warnings.json``,
+``stats.json``, ``active_mutes.json`` and ``giveaways.json`` at each scale,
+then times the hot write path of each dataset (and a cold load) on:
+
+  legacy   the old per-cog path: json.load the whole file, mutate, json.dump it back
+  sqlite   utils.storage.SQLiteBackend
+  json     utils.storage.JSONBackend (write-behind documents)
+  journal  utils.journal, which holds mod logs on either backend (modlogs only)
+
+JSONBackend writes only queue a document for the write-behind thread, so its
+``write`` row is the cost seen by the caller; ``write+flush`` times each
+write together with the flush that persists it. Everything runs in a
+scratch directory. Run from the repository root:
+
+  python -m benchmarks.storage_bench --scales 1000,100000,1000000
+  STORAGE_CODECS=stats=msgpack python -m benchmarks.storage_bench --backends sqlite
+
+Bytes written come from /proc/self/io where available, otherwise from the
+growth of the scratch directory.
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import storage  # noqa: E402
+from utils.journal import Journal  # noqa: E402
+
+DATASETS = ("modlogs", "warnings", "stats", "active_mutes", "giveaways")
+BACKENDS = ("legacy", "sqlite", "json")
+LEGACY_INDENT = {"giveaways": 4}  # the old cogs dumped with indent=2, giveaways with 4
+ENTRIES_PER_GUILD = 1000
+PERIODS = ("daily", "weekly", "monthly", "all")
+
+
+# --- synthetic data ---
+
+def _guilds(n):
+    return [str(900000000000000000 + g) for g in range(max(1, n // ENTRIES_PER_GUILD))]
+
+def _user(rng):
+    return str(rng.randrange(100000000000000000, 999999999999999999))
+
+def modlog_entry(rng):
+    return {
+        "action": rng.choice(["ban", "kick", "mute", "warn", "message_delete"]),
+        "moderator": f"mod#{rng.randrange(10000):04d}",
+        "target": f"user#{rng.randrange(10000):04d}",
+        "reason": "synthetic reason " * rng.randrange(1, 4),
+        "timestamp": "2026-10-18T12:00:00.000000",
+    }
+
+def stats_user(rng):
+    keys = {"daily": "2026-10-18", "weekly": "2026-W41", "monthly": "2026-10", "all": "all"}
+    return {
+        "messages": {p: {keys[p]: rng.randrange(1000)} for p in PERIODS},
+        "vc_time": {p: {keys[p]: rng.random() * 36000} for p in PERIODS},
+        "channels": {str(rng.randrange(10**17, 10**18)): {p: {keys[p]: rng.randrange(100)} for p in PERIODS}},
+    }
+
+def generate(name, n, rng):
+    """``{key: value}`` with ``n`` entries in total, laid out like the legacy file."""
+    guilds = _guilds(n)
+    per_guild = max(1, n // len(guilds))
+    if name == "modlogs":
+        return {g: [modlog_entry(rng) for _ in range(per_guild)] for g in guilds}
+    if name == "warnings":
+        return {g: {_user(rng): ["synthetic warning"] for _ in range(per_guild)} for g in guilds}
+    if name == "stats":
+        return {g: {_user(rng): stats_user(rng) for _ in range(per_guild)} for g in guilds}
+    if name == "active_mutes":
+        return {g: {_user(rng): {"until": time.time() + 3600, "reason": "Mute duration"}
+                    for _ in range(per_guild)} for g in guilds}
+    if name == "giveaways":
+        return {str(10**18 + i): {"prize": "Nitro", "channel_id": 10**17 + i, "end_time": time.time() + 86400}
+                for i in range(n)}
+    raise ValueError(name)
+
+
+def mutate(name, data, rng):
+    """Apply the change one real operation makes; returns the touched keys."""
+    if name == "giveaways":
+        key = str(2 * 10**18 + rng.randrange(10**9))
+        data[key] = {"prize": "Nitro", "channel_id": 1, "end_time": time.time()}
+        return [key]
+    guild = rng.choice(list(data))
+    if name == "modlogs":
+        data[guild].append(modlog_entry(rng))
+    elif name == "warnings":
+        data[guild].setdefault(_user(rng), []).append("synthetic warning")
+    elif name == "stats":
+        # A flush writes every guild that saw activity; simulate a busy tick
+        touched = rng.sample(list(data), min(10, len(data)))
+        for g in touched:
+            user = rng.choice(list(data[g]))
+            data[g][user]["messages"]["all"]["all"] += 1
+        return touched
+    elif name == "active_mutes":
+        data[guild][_user(rng)] = {"until": time.time() + 60, "reason": "Mute duration"}
+    return [guild]
+
+
+# --- measurement ---
+
+def _io_written():
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Case:
+    """Times ``fn`` up to ``ops`` times or until ``budget`` seconds have passed."""
+
+    def __init__(self, workdir, ops, budget):
+        self.workdir = workdir
+        self.ops = ops
+        self.budget = budget
+
+    def run(self, fn, finish=None):
+        io_before, size_before = _io_written(), _dir_size(self.workdir)
+        samples = []
+        deadline = time.perf_counter() + self.budget
+        while len(samples) < self.ops and (len(samples) < 3 or time.perf_counter() < deadline):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        if finish:
+            finish()
+        io_after = _io_written()
+        if io_before is not None and io_after is not None:
+            written = io_after - io_before
+        else:
+            written = max(0, _dir_size(self.workdir) - size_before)
+        return samples, written
+
+
+def bench_legacy(name, data, case, rng):
+    # Same as the cogs before utils.storage: no temp file, no fsync
+    path = os.path.join(case.workdir, f"{name}.json")
+    indent = LEGACY_INDENT.get(name, 2)
+
+    def load():
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def save(doc):
+        with open(path, "w") as f:
+            json.dump(doc, f, indent=indent)
+
+    def op():
+        doc = load()
+        mutate(name, doc, rng)
+        save(doc)
+
+    save(data)
+    yield "load", case.run(load)
+    yield "write", case.run(op)
+
+
+def bench_journal(name, data, case, rng):
+    journal = Journal(os.path.join(case.workdir, "modlogs"))
+    for guild, entries in data.items():
+        for entry in entries:
+            journal.append(guild, entry)
+    guilds = list(data)
+    yield "load", case.run(lambda: Journal(journal.root).latest(rng.choice(guilds), 10))
+    yield "write", case.run(lambda: journal.append(rng.choice(guilds), modlog_entry(rng)))
+    journal.close()
+
+
+def bench_backend(kind, name, data, case, rng):
+    root = os.path.join(case.workdir, kind)
+    make = (lambda: storage.SQLiteBackend(os.path.join(root, "bot.db"))) if kind == "sqlite" \
+        else (lambda: storage.JSONBackend(root))
+    # Backends keep what they're given; hand over copies as utils.storage.Dataset does
+    backend = make()
+    backend.set_many(name, copy.deepcopy(data))
+    backend.flush()
+    backend.close()
+
+    def cold_load():
+        fresh = make()
+        fresh.get(name, rng.choice(keys))
+        fresh.close()
+
+    keys = list(data)
+    yield "load", case.run(cold_load)
+    backend = make()
+    if name == "stats":
+        def op():
+            touched = mutate(name, data, rng)
+            backend.set_many(name, copy.deepcopy({k: data[k] for k in touched}))
+    else:
+        def op():
+            touched = mutate(name, data, rng)
+            for key in touched:
+                backend.set(name, key, copy.deepcopy(data[key]))
+    yield "write", case.run(op, finish=backend.flush)
+    if kind == "json":
+        def durable_op():
+            op()
+            backend.flush()
+        yield "write+flush", case.run(durable_op)
+    backend.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1000,100000,1000000", help="comma separated entry counts")
+    parser.add_argument("--datasets", default=",".join(DATASETS))
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--ops", type=int, default=200, help="operations timed per case")
+    parser.add_argument("--budget", type=float, default=20.0, help="seconds per case before stopping early")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    print(f"{'scale':>8} {'dataset':<13} {'backend':<7} {'op':<11} {'n':>5} {'p50 ms':>10} {'p99 ms':>10} {'bytes/op':>12}")
+    for scale in (int(s) for s in args.scales.split(",")):
+        for name in args.datasets.split(","):
+            kinds = args.backends.split(",")
+            if name == "modlogs":
+                # Mod logs live in the journal whichever backend is configured: one row, not one per backend
+                kinds = [k for k in kinds if k == "legacy"] + ["journal"]
+            for kind in kinds:
+                rng = random.Random(args.seed)
+                data = generate(name, scale, rng)
+                workdir = tempfile.mkdtemp(prefix="storage-bench-")
+                try:
+                    case = Case(workdir, args.ops, args.budget)
+                    if kind == "legacy":
+                        runner = bench_legacy(name, data, case, rng)
+                    elif kind == "journal":
+                        runner = bench_journal(name, data, case, rng)
+                    else:
+                        runner = bench_backend(kind, name, data, case, rng)
+                    for op, (samples, written) in runner:
+                        print(f"{scale:>8} {name:<13} {kind:<7} {op:<11} {len(samples):>5} "
+                              f"{percentile(samples, 0.50) * 1000:>10.3f} {percentile(samples, 0.99) * 1000:>10.3f} "
+                              f"{written // len(samples):>12}", flush=True)
+                finally:
+                    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
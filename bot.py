@@ -5,22 +5,10 @@ from discord.ext import commands
 import os
 import asyncio
 from dotenv import load_dotenv
+from utils import http, storage
 
-# Ensure required data files exist
-required_files = [
-    "data/modroles.json",
-    "data/modlogs.json",
-    "data/muteroles.json",
-    "data/active_mutes.json",
-    "data/warnings.json"
-]
-for file in required_files:
-    dir_path = os.path.dirname(file)
-    if not os.path.exists(dir_path):
-        os.makedirs(dir_path, exist_ok=True)
-    if not os.path.exists(file):
-        with open(file, "w") as f:
-            f.write("{}" if file.endswith(".json") else "")
+# Ensure the data directory exists (datasets live in utils.storage)
+os.makedirs("data", exist_ok=True)
 
 load_dotenv()
 BOT_TOKEN = os.getenv("TOKEN")
@@ -153,6 +141,8 @@ async def main():
             await bot.load_extension("cogs.expressions")
             print("[Startup] Loading cogs.stats")
             await bot.load_extension("cogs.stats")
+            print("[Startup] Loading cogs.maintenance")
+            await bot.load_extension("cogs.maintenance")
             print("[Startup] All cogs loaded. Starting bot event loop...")
             assert BOT_TOKEN is not None, "TOKEN is not set. Please check your environment variables."
             await bot.start(BOT_TOKEN)
@@ -160,6 +150,9 @@ async def main():
         import traceback
         print("[Startup Error]", e)
         traceback.print_exc()
+    finally:
+        await http.close_session()
+        storage.close()
 
 asyncio.run(main())
 bot.run(BOT_TOKEN)
\ No newline at end of file
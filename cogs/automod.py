@@ -1,145 +1,136 @@
+import io
 import discord
 from discord.ext import commands
 from discord import ui
+from utils import storage
+from utils.automod import ACTIONS, PIPELINE_STATS, RULES, STATS, TERM_RULES, build_matcher, compile_pipeline, reset_stats
+
+
+AUTOMOD = storage.dataset("automod")
+BLOCKLIST_FILE_KB = 256  # largest term file read from an attachment
 
 
 class Automod(commands.Cog):
+    def __init__(self):
+        self.configs = {}  # guild id -> {feature: {'delete': bool, 'warn': bool, 'mute': bool}}
+        self.pipelines = {}  # guild id -> compiled rule Pipeline
+        self.matchers = {}  # guild id -> {term rule: Matcher}, shared with the compiled pipeline
+
+    @commands.Cog.listener()
     async def on_message(self, message):
         if not message.guild or message.author.bot:
             return
-        guild_id = message.guild.id
-        config = self.get_guild_config(guild_id)
+        # Staff are exempt, which also keeps blocklist edits from tripping the blocklist
+        if isinstance(message.author, discord.Member) and message.author.guild_permissions.manage_guild:
+            return
+        pipeline = self.pipelines.get(message.guild.id)
+        if pipeline is None:
+            pipeline = await self.get_pipeline(message.guild.id)
+        if not pipeline:
+            return
+        rule = pipeline.run(message)
+        if rule is None:
+            return
+        if rule.actions.get('delete'):
+            try:
+                await message.delete()
+            except Exception:
+                pass
+        if rule.actions.get('warn'):
+            await self.do_warn(message, rule.name)
+        if rule.actions.get('mute'):
+            await self.do_mute(message, rule.name)
+
+    async def do_warn(self, message, feature):
         member = message.author
-        triggered_features = []
+        try:
+            embed = discord.Embed(
+                title="Automod Warning",
+                description=f"{member.mention}, you triggered automod: **{feature.replace('_',' ').title()}**.",
+                color=discord.Color.orange()
+            )
+            embed.set_footer(text=f"Requested by {message.author.display_name}", icon_url=message.author.display_avatar.url if hasattr(message.author, 'display_avatar') else message.author.avatar.url if message.author.avatar else None)
+            embed.timestamp = discord.utils.utcnow()
+            await message.channel.send(embed=embed, delete_after=8)
+        except Exception:
+            pass
 
-        # Helper functions
-        async def do_warn(feature):
+    async def do_mute(self, message, feature):
+        member = message.author
+        mute_role = discord.utils.get(message.guild.roles, name="Muted")
+        if not mute_role:
+            embed = discord.Embed(
+                title="Mute Role Not Found",
+                description="No mute role named 'Muted' found. Please set up a mute role for automod to work.",
+                color=discord.Color.red()
+            )
+            embed.set_footer(text=f"Requested by {message.author.display_name}", icon_url=message.author.display_avatar.url if hasattr(message.author, 'display_avatar') else message.author.avatar.url if message.author.avatar else None)
+            embed.timestamp = discord.utils.utcnow()
+            await message.channel.send(embed=embed)
+            return
+        if mute_role not in member.roles:
             try:
+                await member.add_roles(mute_role, reason=f"Automod mute ({feature})")
                 embed = discord.Embed(
-                    title="Automod Warning",
-                    description=f"{member.mention}, you triggered automod: **{feature.replace('_',' ').title()}**.",
-                    color=discord.Color.orange()
+                    title="User Muted",
+                    description=f"{member.mention} has been muted for **{feature.replace('_',' ').title()}**.",
+                    color=discord.Color.blurple()
                 )
                 embed.set_footer(text=f"Requested by {message.author.display_name}", icon_url=message.author.display_avatar.url if hasattr(message.author, 'display_avatar') else message.author.avatar.url if message.author.avatar else None)
                 embed.timestamp = discord.utils.utcnow()
-                await message.channel.send(embed=embed, delete_after=8)
+                await message.channel.send(embed=embed)
             except Exception:
-                pass
-
-        async def do_mute(feature):
-            mute_role = discord.utils.get(message.guild.roles, name="Muted")
-            if not mute_role:
                 embed = discord.Embed(
-                    title="Mute Role Not Found",
-                    description="No mute role named 'Muted' found. Please set up a mute role for automod to work.",
+                    title="Mute Failed",
+                    description=f"Failed to mute {member.mention} for **{feature.replace('_',' ').title()}**.",
                     color=discord.Color.red()
                 )
                 embed.set_footer(text=f"Requested by {message.author.display_name}", icon_url=message.author.display_avatar.url if hasattr(message.author, 'display_avatar') else message.author.avatar.url if message.author.avatar else None)
                 embed.timestamp = discord.utils.utcnow()
                 await message.channel.send(embed=embed)
-                return
-            if mute_role not in member.roles:
-                try:
-                    await member.add_roles(mute_role, reason=f"Automod mute ({feature})")
-                    embed = discord.Embed(
-                        title="User Muted",
-                        description=f"{member.mention} has been muted for **{feature.replace('_',' ').title()}**.",
-                        color=discord.Color.blurple()
-                    )
-                    embed.set_footer(text=f"Requested by {message.author.display_name}", icon_url=message.author.display_avatar.url if hasattr(message.author, 'display_avatar') else message.author.avatar.url if message.author.avatar else None)
-                    embed.timestamp = discord.utils.utcnow()
-                    await message.channel.send(embed=embed)
-                except Exception:
-                    embed = discord.Embed(
-                        title="Mute Failed",
-                        description=f"Failed to mute {member.mention} for **{feature.replace('_',' ').title()}**.",
-                        color=discord.Color.red()
-                    )
-                    embed.set_footer(text=f"Requested by {message.author.display_name}", icon_url=message.author.display_avatar.url if hasattr(message.author, 'display_avatar') else message.author.avatar.url if message.author.avatar else None)
-                    embed.timestamp = discord.utils.utcnow()
-                    await message.channel.send(embed=embed)
-
-        # Feature checks
-        content = message.content
-        import re
-        # antiinvite
-        if config.get('antiinvite', {}).get('delete') and ("discord.gg/" in content or "discord.com/invite/" in content):
-            triggered_features.append('antiinvite')
-        # antilink
-        if config.get('antilink', {}).get('delete') and ("http://" in content or "https://" in content):
-            triggered_features.append('antilink')
-        # antispam (simple: repeated chars or words)
-        if config.get('antispam', {}).get('delete') and (len(content) > 200 or any(content.count(w) > 5 for w in content.split())):
-            triggered_features.append('antispam')
-        # antimention (mass mention)
-        if config.get('antimention', {}).get('delete') and (len(message.mentions) >= 5):
-            triggered_features.append('antimention')
-        # antitoken (discord token regex)
-        token_regex = r"[MN][A-Za-z\d]{23}\.[\w-]{6}\.[\w-]{27}"
-        if config.get('antitoken', {}).get('delete') and re.search(token_regex, content):
-            triggered_features.append('antitoken')
-        # antinsfw (simple: nsfw words)
-        nsfw_words = ["porn", "sex", "nude", "boobs", "nsfw"]
-        if config.get('antinsfw', {}).get('delete') and any(w in content.lower() for w in nsfw_words):
-            triggered_features.append('antinsfw')
-        # antiattachment (block files)
-        if config.get('antiattachment', {}).get('delete') and message.attachments:
-            triggered_features.append('antiattachment')
-        # antiemoji (block excessive emojis)
-        emoji_count = sum(1 for c in content if c in [chr(i) for i in range(0x1F600, 0x1F64F)])
-        if config.get('antiemoji', {}).get('delete') and emoji_count > 5:
-            triggered_features.append('antiemoji')
-        # antizalgo (zalgo text)
-        zalgo_chars = [chr(i) for i in range(0x0300, 0x036F)]
-        if config.get('antizalgo', {}).get('delete') and any(c in zalgo_chars for c in content):
-            triggered_features.append('antizalgo')
-        # antiwords (custom block words)
-        block_words = ["badword1", "badword2"] # You can make this configurable
-        if config.get('antiwords', {}).get('delete') and any(w in content.lower() for w in block_words):
-            triggered_features.append('antiwords')
-        # anticaps (excessive caps)
-        if config.get('anticaps', {}).get('delete') and sum(1 for c in content if c.isupper()) > 30:
-            triggered_features.append('anticaps')
-        # antiunicode (excessive unicode)
-        if config.get('antiunicode', {}).get('delete') and sum(1 for c in content if ord(c) > 1000) > 10:
-            triggered_features.append('antiunicode')
-        # antiservers (server invite)
-        if config.get('antiservers', {}).get('delete') and ("discord.gg/" in content or "discord.com/invite/" in content):
-            triggered_features.append('antiservers')
-        # antiurl (any url)
-        url_regex = r"https?://[\w.-]+"
-        if config.get('antiurl', {}).get('delete') and re.search(url_regex, content):
-            triggered_features.append('antiurl')
-
-        # Apply actions for each triggered feature
-        for feature in triggered_features:
-            actions = config.get(feature, {})
-            if actions.get('delete'):
-                try:
-                    await message.delete()
-                except Exception:
-                    pass
-            if actions.get('warn'):
-                await do_warn(feature)
-            if actions.get('mute'):
-                await do_mute(feature)
-
-    # In-memory config: {guild_id: {feature: {'delete': bool, 'warn': bool, 'mute': bool}}}
-    automod_config = {}
-
-    def get_guild_config(self, guild_id):
-        if guild_id not in self.automod_config:
-            self.automod_config[guild_id] = {}
-        return self.automod_config[guild_id]
-
-    def set_feature_action(self, guild_id, feature, action, value):
-        config = self.get_guild_config(guild_id)
+
+    async def get_guild_config(self, guild_id):
+        config = self.configs.get(guild_id)
+        if config is None:
+            config = self.configs[guild_id] = await AUTOMOD.aget(guild_id, {})
+        return config
+
+    async def get_pipeline(self, guild_id):
+        pipeline = self.pipelines.get(guild_id)
+        if pipeline is None:
+            pipeline = self.pipelines[guild_id] = compile_pipeline(await self.get_guild_config(guild_id), self.matchers.setdefault(guild_id, {}))
+        return pipeline
+
+    async def save_guild_config(self, guild_id, config):
+        # Recompile once per config change, not per message
+        self.configs[guild_id] = config
+        self.pipelines[guild_id] = compile_pipeline(config, self.matchers.setdefault(guild_id, {}))
+        await AUTOMOD.aset(guild_id, config)
+
+    async def set_feature_action(self, guild_id, feature, action, value):
+        config = await self.get_guild_config(guild_id)
         if feature not in config:
             config[feature] = {'delete': False, 'warn': False, 'mute': False}
         config[feature][action] = value
-
-    def get_feature_actions(self, guild_id, feature):
-        config = self.get_guild_config(guild_id)
+        await self.save_guild_config(guild_id, config)
+
+    async def get_matcher(self, guild_id, feature):
+        """The guild's matcher for a term rule and that rule's config entry."""
+        config = await self.get_guild_config(guild_id)
+        conf = config.setdefault(feature, {'delete': False, 'warn': False, 'mute': False})
+        matchers = self.matchers.setdefault(guild_id, {})
+        if feature not in matchers:
+            matchers[feature] = build_matcher(feature, conf)
+        return config, conf, matchers[feature]
+
+    async def save_terms(self, guild_id, config, conf, matcher):
+        # The pipeline holds this matcher, so term edits apply without recompiling
+        conf["terms"] = matcher.terms()
+        conf["boundary"] = matcher.word_boundary
+        await AUTOMOD.aset(guild_id, config)
+
+    async def get_feature_actions(self, guild_id, feature):
+        config = await self.get_guild_config(guild_id)
         return config.get(feature, {'delete': False, 'warn': False, 'mute': False})
 
     def make_status_embed(self, ctx, feature, actions):
@@ -161,7 +152,7 @@ class Automod(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def antiinvite(self, ctx):
         """Show or configure anti-invite actions."""
-        actions = self.get_feature_actions(ctx.guild.id, 'antiinvite')
+        actions = await self.get_feature_actions(ctx.guild.id, 'antiinvite')
         embed = self.make_status_embed(ctx, 'antiinvite', actions)
         await ctx.send(embed=embed)
 
@@ -170,8 +161,8 @@ class Automod(commands.Cog):
     async def delete_antiinvite(self, ctx, on_off: str):
         """Enable/disable message deletion for invite links."""
         value = on_off.lower() == 'on'
-        self.set_feature_action(ctx.guild.id, 'antiinvite', 'delete', value)
-        actions = self.get_feature_actions(ctx.guild.id, 'antiinvite')
+        await self.set_feature_action(ctx.guild.id, 'antiinvite', 'delete', value)
+        actions = await self.get_feature_actions(ctx.guild.id, 'antiinvite')
         embed = self.make_status_embed(ctx, 'antiinvite', actions)
         await ctx.send(embed=embed)
 
@@ -180,8 +171,8 @@ class Automod(commands.Cog):
     async def warn_antiinvite(self, ctx, on_off: str):
         """Enable/disable warning for invite links."""
         value = on_off.lower() == 'on'
-        self.set_feature_action(ctx.guild.id, 'antiinvite', 'warn', value)
-        actions = self.get_feature_actions(ctx.guild.id, 'antiinvite')
+        await self.set_feature_action(ctx.guild.id, 'antiinvite', 'warn', value)
+        actions = await self.get_feature_actions(ctx.guild.id, 'antiinvite')
         embed = self.make_status_embed(ctx, 'antiinvite', actions)
         await ctx.send(embed=embed)
 
@@ -190,8 +181,8 @@ class Automod(commands.Cog):
     async def mute_antiinvite(self, ctx, on_off: str):
         """Enable/disable muting for invite links."""
         value = on_off.lower() == 'on'
-        self.set_feature_action(ctx.guild.id, 'antiinvite', 'mute', value)
-        actions = self.get_feature_actions(ctx.guild.id, 'antiinvite')
+        await self.set_feature_action(ctx.guild.id, 'antiinvite', 'mute', value)
+        actions = await self.get_feature_actions(ctx.guild.id, 'antiinvite')
         embed = self.make_status_embed(ctx, 'antiinvite', actions)
         await ctx.send(embed=embed)
 
@@ -199,7 +190,7 @@ class Automod(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def antilink(self, ctx):
         """Show or configure anti-link actions."""
-        actions = self.get_feature_actions(ctx.guild.id, 'antilink')
+        actions = await self.get_feature_actions(ctx.guild.id, 'antilink')
         embed = self.make_status_embed(ctx, 'antilink', actions)
         await ctx.send(embed=embed)
 
@@ -207,8 +198,8 @@ class Automod(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def delete_antilink(self, ctx, on_off: str):
         value = on_off.lower() == 'on'
-        self.set_feature_action(ctx.guild.id, 'antilink', 'delete', value)
-        actions = self.get_feature_actions(ctx.guild.id, 'antilink')
+        await self.set_feature_action(ctx.guild.id, 'antilink', 'delete', value)
+        actions = await self.get_feature_actions(ctx.guild.id, 'antilink')
         embed = self.make_status_embed(ctx, 'antilink', actions)
         await ctx.send(embed=embed)
 
@@ -216,8 +207,8 @@ class Automod(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def warn_antilink(self, ctx, on_off: str):
         value = on_off.lower() == 'on'
-        self.set_feature_action(ctx.guild.id, 'antilink', 'warn', value)
-        actions = self.get_feature_actions(ctx.guild.id, 'antilink')
+        await self.set_feature_action(ctx.guild.id, 'antilink', 'warn', value)
+        actions = await self.get_feature_actions(ctx.guild.id, 'antilink')
         embed = self.make_status_embed(ctx, 'antilink', actions)
         await ctx.send(embed=embed)
 
@@ -225,8 +216,8 @@ class Automod(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def mute_antilink(self, ctx, on_off: str):
         value = on_off.lower() == 'on'
-        self.set_feature_action(ctx.guild.id, 'antilink', 'mute', value)
-        actions = self.get_feature_actions(ctx.guild.id, 'antilink')
+        await self.set_feature_action(ctx.guild.id, 'antilink', 'mute', value)
+        actions = await self.get_feature_actions(ctx.guild.id, 'antilink')
         embed = self.make_status_embed(ctx, 'antilink', actions)
         await ctx.send(embed=embed)
 
@@ -234,7 +225,7 @@ class Automod(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def antispam(self, ctx):
         """Show or configure anti-spam actions."""
-        actions = self.get_feature_actions(ctx.guild.id, 'antispam')
+        actions = await self.get_feature_actions(ctx.guild.id, 'antispam')
         embed = self.make_status_embed(ctx, 'antispam', actions)
         await ctx.send(embed=embed)
 
@@ -242,8 +233,8 @@ class Automod(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def delete_antispam(self, ctx, on_off: str):
         value = on_off.lower() == 'on'
-        self.set_feature_action(ctx.guild.id, 'antispam', 'delete', value)
-        actions = self.get_feature_actions(ctx.guild.id, 'antispam')
+        await self.set_feature_action(ctx.guild.id, 'antispam', 'delete', value)
+        actions = await self.get_feature_actions(ctx.guild.id, 'antispam')
         embed = self.make_status_embed(ctx, 'antispam', actions)
         await ctx.send(embed=embed)
 
@@ -251,8 +242,8 @@ class Automod(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def warn_antispam(self, ctx, on_off: str):
         value = on_off.lower() == 'on'
-        self.set_feature_action(ctx.guild.id, 'antispam', 'warn', value)
-        actions = self.get_feature_actions(ctx.guild.id, 'antispam')
+        await self.set_feature_action(ctx.guild.id, 'antispam', 'warn', value)
+        actions = await self.get_feature_actions(ctx.guild.id, 'antispam')
         embed = self.make_status_embed(ctx, 'antispam', actions)
         await ctx.send(embed=embed)
 
@@ -260,8 +251,8 @@ class Automod(commands.Cog):
     @commands.has_permissions(manage_guild=True)
     async def mute_antispam(self, ctx, on_off: str):
         value = on_off.lower() == 'on'
-        self.set_feature_action(ctx.guild.id, 'antispam', 'mute', value)
-        actions = self.get_feature_actions(ctx.guild.id, 'antispam')
+        await self.set_feature_action(ctx.guild.id, 'antispam', 'mute', value)
+        actions = await self.get_feature_actions(ctx.guild.id, 'antispam')
         embed = self.make_status_embed(ctx, 'antispam', actions)
         await ctx.send(embed=embed)
 
@@ -284,13 +275,124 @@ class Automod(commands.Cog):
         except Exception:
             await ctx.send("Invalid duration format. Use e.g. 10s, 5m, 2h.")
             return
-        config = self.get_guild_config(ctx.guild.id)
+        config = await self.get_guild_config(ctx.guild.id)
         if feature not in config:
             await ctx.send(f"Feature '{feature}' not found or not configured.")
             return
         config[feature]['mute_duration'] = seconds
+        await self.save_guild_config(ctx.guild.id, config)
         await ctx.send(f"Mute duration for **{feature.replace('_',' ').title()}** set to **{duration}**.")
 
+    @commands.command(name="automodrule")
+    @commands.has_permissions(manage_guild=True)
+    async def automodrule(self, ctx, feature: str = None, action: str = None, on_off: str = None):
+        """Show all rules, or set one: automodrule <feature> <delete|warn|mute> <on|off>"""
+        if feature is None:
+            config = await self.get_guild_config(ctx.guild.id)
+            lines = []
+            for name in sorted(RULES):
+                enabled = [a for a in ACTIONS if config.get(name, {}).get(a)]
+                lines.append(f"**{name}:** {', '.join(enabled) if enabled else 'off'}")
+            embed = discord.Embed(title="🛡️ Automod Rules", description="\n".join(lines), color=discord.Color.blurple())
+            return await ctx.send(embed=embed)
+        feature = feature.lower()
+        if feature not in RULES or action not in ACTIONS or on_off not in ("on", "off"):
+            return await ctx.send(f"Usage: `automodrule <feature> <{'|'.join(ACTIONS)}> <on|off>`. Features: {', '.join(sorted(RULES))}")
+        await self.set_feature_action(ctx.guild.id, feature, action, on_off == "on")
+        actions = await self.get_feature_actions(ctx.guild.id, feature)
+        await ctx.send(embed=self.make_status_embed(ctx, feature, actions))
+
+    @commands.command(name="automodstats")
+    @commands.has_permissions(manage_guild=True)
+    async def automodstats(self, ctx, reset: str = None):
+        """Per-rule check counts, hits and average cost since start (all servers). Pass 'reset' to clear."""
+        if reset == "reset":
+            reset_stats()
+            return await ctx.send("✅ Automod counters reset.")
+        lines = []
+        for name, stats in sorted(STATS.items(), key=lambda kv: -kv[1].ns):
+            if stats.calls:
+                lines.append(f"**{name}:** {stats.calls} checks, {stats.hits} hits, {stats.ns / stats.calls / 1000:.1f} µs avg")
+        per_message = PIPELINE_STATS.ns / PIPELINE_STATS.calls / 1000 if PIPELINE_STATS.calls else 0
+        desc = f"**Messages checked:** {PIPELINE_STATS.calls} ({PIPELINE_STATS.hits} tripped a rule)\n"
+        desc += f"**Cost per message:** {per_message:.1f} µs avg\n\n"
+        desc += "\n".join(lines) or "No rules have run yet."
+        await ctx.send(embed=discord.Embed(title="🛡️ Automod Stats", description=desc, color=discord.Color.blurple()))
+
+    @commands.group(name="blocklist", invoke_without_command=True)
+    @commands.has_permissions(manage_guild=True)
+    async def blocklist(self, ctx):
+        """Show the blocked term lists. Subcommands: add, remove, list, boundary"""
+        lines = []
+        for feature in sorted(TERM_RULES):
+            _, _, matcher = await self.get_matcher(ctx.guild.id, feature)
+            lines.append(f"**{feature}:** {len(matcher)} term(s), whole words only: {'on' if matcher.word_boundary else 'off'}")
+        await ctx.send(embed=discord.Embed(title="🛡️ Blocklists", description="\n".join(lines), color=discord.Color.blurple()))
+
+    def parse_terms(self, text):
+        return [t.strip() for t in text.replace("\n", ",").split(",") if t.strip()]
+
+    async def read_terms(self, ctx, text):
+        """Terms from a comma-separated argument and/or an attached text file (one per line)."""
+        terms = self.parse_terms(text or "")
+        for attachment in ctx.message.attachments:
+            if attachment.size > BLOCKLIST_FILE_KB * 1024:
+                await ctx.send(f"⚠️ Skipped `{attachment.filename}`: term files are limited to {BLOCKLIST_FILE_KB} KB.")
+                continue
+            terms.extend(self.parse_terms((await attachment.read()).decode("utf-8", "ignore")))
+        return terms
+
+    @blocklist.command(name="add")
+    @commands.has_permissions(manage_guild=True)
+    async def blocklist_add(self, ctx, feature: str, *, terms: str = None):
+        """Add terms: blocklist add <antiwords|antinsfw> term1, term2 (or attach a .txt, one per line)"""
+        feature = feature.lower()
+        if feature not in TERM_RULES:
+            return await ctx.send(f"Feature must be one of: {', '.join(sorted(TERM_RULES))}")
+        config, conf, matcher = await self.get_matcher(ctx.guild.id, feature)
+        added = sum(matcher.add(t) for t in await self.read_terms(ctx, terms))
+        await self.save_terms(ctx.guild.id, config, conf, matcher)
+        await ctx.send(f"✅ Added {added} term(s) to **{feature}** ({len(matcher)} total).")
+
+    @blocklist.command(name="remove")
+    @commands.has_permissions(manage_guild=True)
+    async def blocklist_remove(self, ctx, feature: str, *, terms: str = None):
+        """Remove terms: blocklist remove <antiwords|antinsfw> term1, term2"""
+        feature = feature.lower()
+        if feature not in TERM_RULES:
+            return await ctx.send(f"Feature must be one of: {', '.join(sorted(TERM_RULES))}")
+        config, conf, matcher = await self.get_matcher(ctx.guild.id, feature)
+        removed = sum(matcher.remove(t) for t in await self.read_terms(ctx, terms))
+        await self.save_terms(ctx.guild.id, config, conf, matcher)
+        await ctx.send(f"✅ Removed {removed} term(s) from **{feature}** ({len(matcher)} left).")
+
+    @blocklist.command(name="list")
+    @commands.has_permissions(manage_guild=True)
+    async def blocklist_list(self, ctx, feature: str):
+        """List the terms of one blocklist."""
+        feature = feature.lower()
+        if feature not in TERM_RULES:
+            return await ctx.send(f"Feature must be one of: {', '.join(sorted(TERM_RULES))}")
+        _, _, matcher = await self.get_matcher(ctx.guild.id, feature)
+        text = "\n".join(matcher.terms())
+        if not text:
+            return await ctx.send(f"**{feature}** has no terms.")
+        if len(text) > 1900:
+            return await ctx.send(f"**{feature}**: {len(matcher)} terms", file=discord.File(io.BytesIO(text.encode("utf-8")), filename=f"{feature}.txt"))
+        await ctx.send(f"**{feature}** ({len(matcher)} terms):\n```\n{text}\n```")
+
+    @blocklist.command(name="boundary")
+    @commands.has_permissions(manage_guild=True)
+    async def blocklist_boundary(self, ctx, feature: str, on_off: str):
+        """Match whole words only (on) or anywhere inside words (off)."""
+        feature = feature.lower()
+        if feature not in TERM_RULES or on_off not in ("on", "off"):
+            return await ctx.send(f"Usage: `blocklist boundary <{'|'.join(sorted(TERM_RULES))}> <on|off>`")
+        config, conf, matcher = await self.get_matcher(ctx.guild.id, feature)
+        matcher.word_boundary = on_off == "on"
+        await self.save_terms(ctx.guild.id, config, conf, matcher)
+        await ctx.send(f"✅ **{feature}** now matches {'whole words only' if matcher.word_boundary else 'anywhere in a word'}.")
+
     @commands.command()
     @commands.has_permissions(manage_guild=True)
     async def automod(self, ctx):
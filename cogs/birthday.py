@@ -1,24 +1,20 @@
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
-import json
 import datetime
 import pytz
-import os
+from utils import storage
 
-BIRTHDAYS_FILE = "data/birthdays.json"
-CONFIG_FILE = "data/birthday_config.json"
-EMBED_FILE = "data/birthday_embeds.json"
-
-def load_json(path): return json.load(open(path, "r", encoding="utf-8")) if os.path.exists(path) else {}
-def save_json(path, data): json.dump(data, open(path, "w", encoding="utf-8"), indent=4)
+BIRTHDAYS = storage.dataset("birthdays")
+CONFIG = storage.dataset("birthday_config")
+EMBEDS = storage.dataset("birthday_embeds")
 
 class Birthday(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.birthdays = load_json(BIRTHDAYS_FILE)
-        self.config = load_json(CONFIG_FILE)
-        self.embeds = load_json(EMBED_FILE)
+        self.birthdays = BIRTHDAYS.all()
+        self.config = CONFIG.all()
+        self.embeds = EMBEDS.all()
         self.check_birthdays.start()
 
     def cog_unload(self):
@@ -32,7 +28,7 @@ class Birthday(commands.Cog):
             day, month = map(int, date.split("-"))
             datetime.datetime(2000, month, day)  # validate
             self.birthdays[str(interaction.user.id)] = {"day": day, "month": month}
-            save_json(BIRTHDAYS_FILE, self.birthdays)
+            await BIRTHDAYS.aset(interaction.user.id, self.birthdays[str(interaction.user.id)])
             embed = discord.Embed(
                 title="🎉 Birthday Set!",
                 description=f"Your birthday is set to `{day:02d}-{month:02d}`.",
@@ -74,7 +70,7 @@ class Birthday(commands.Cog):
     async def reset_birthday(self, interaction: discord.Interaction):
         if str(interaction.user.id) in self.birthdays:
             del self.birthdays[str(interaction.user.id)]
-            save_json(BIRTHDAYS_FILE, self.birthdays)
+            await BIRTHDAYS.adelete(interaction.user.id)
             embed = discord.Embed(
                 title="🔄 Birthday Reset",
                 description="Your birthday has been reset.",
@@ -132,7 +128,7 @@ class Birthday(commands.Cog):
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         self.config[str(interaction.guild.id)] = self.config.get(str(interaction.guild.id), {})
         self.config[str(interaction.guild.id)]["channel"] = channel.id
-        save_json(CONFIG_FILE, self.config)
+        await CONFIG.aset(interaction.guild.id, self.config[str(interaction.guild.id)])
         embed = discord.Embed(
             title="✅ Birthday Channel Set",
             description=f"Birthday channel set to {channel.mention}.",
@@ -162,7 +158,7 @@ class Birthday(commands.Cog):
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         self.config[str(interaction.guild.id)] = self.config.get(str(interaction.guild.id), {})
         self.config[str(interaction.guild.id)]["timezone"] = timezone
-        save_json(CONFIG_FILE, self.config)
+        await CONFIG.aset(interaction.guild.id, self.config[str(interaction.guild.id)])
         embed = discord.Embed(
             title="🕒 Timezone Set",
             description=f"Timezone set to `{timezone}`.",
@@ -185,7 +181,7 @@ class Birthday(commands.Cog):
         self.embeds[str(interaction.guild.id)] = {
             "title": title, "description": message, "color": color
         }
-        save_json(EMBED_FILE, self.embeds)
+        await EMBEDS.aset(interaction.guild.id, self.embeds[str(interaction.guild.id)])
         embed = discord.Embed(
             title="✅ Birthday Embed Updated",
             description="Birthday embed updated!",
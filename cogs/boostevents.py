@@ -1,19 +1,11 @@
 import discord
 from discord.ext import commands
-import json
-import os
+from utils import storage
 
-CONFIG_FILE = "boostconfig.json"
+BOOST_CONFIG = storage.dataset("boostconfig")
 
 def load_config():
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "r") as f:
-            return json.load(f)
-    return {}
-
-def save_config(data):
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+    return BOOST_CONFIG.all()
 
 class BoostEvents(commands.Cog):
     def __init__(self, bot):
@@ -77,7 +69,7 @@ class BoostEvents(commands.Cog):
         guild_id = str(ctx.guild.id)
         self.config.setdefault(guild_id, {})
         self.config[guild_id]["boost_channel"] = channel.id
-        save_config(self.config)
+        await BOOST_CONFIG.aset(guild_id, self.config[guild_id])
         embed = discord.Embed(
             title="✅ Boost Log Channel Set",
             description=f"Boost log channel set to {channel.mention}.",
@@ -95,7 +87,7 @@ class BoostEvents(commands.Cog):
         self.config.setdefault(guild_id, {})
         self.config[guild_id].setdefault("boost_embed", {})
         self.config[guild_id]["boost_embed"][field.lower()] = value
-        save_config(self.config)
+        await BOOST_CONFIG.aset(guild_id, self.config[guild_id])
         embed = discord.Embed(
             title="✅ Boost Embed Updated",
             description=f"Boost embed `{field}` set to: {value}",
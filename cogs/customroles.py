@@ -1,21 +1,12 @@
 import discord
 import typing
 from discord.ext import commands
-import json
-import os
+from utils import storage
 
-CUSTOM_ROLE_FILE = "data/customroles.json"
+CUSTOM_ROLES = storage.dataset("customroles")
 
 def load_custom_roles():
-    if not os.path.exists(CUSTOM_ROLE_FILE):
-        with open(CUSTOM_ROLE_FILE, "w") as f:
-            json.dump({}, f)
-    with open(CUSTOM_ROLE_FILE, "r") as f:
-        return json.load(f)
-
-def save_custom_roles(data):
-    with open(CUSTOM_ROLE_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+    return CUSTOM_ROLES.all()
 
 class CustomRoles(commands.Cog):
     def __init__(self, bot):
@@ -25,16 +16,16 @@ class CustomRoles(commands.Cog):
     def get_guild_roles(self, guild_id):
         return self.custom_roles.get(str(guild_id), {})
 
-    def set_guild_roles(self, guild_id, data):
+    async def set_guild_roles(self, guild_id, data):
         self.custom_roles[str(guild_id)] = data
-        save_custom_roles(self.custom_roles)
+        await CUSTOM_ROLES.aset(guild_id, data)
 
     @commands.command(name="addcustomrole")
     @commands.has_permissions(administrator=True)
     async def add_custom_role(self, ctx, keyword: str, *, role: discord.Role):
         guild_roles = self.get_guild_roles(ctx.guild.id)
         guild_roles[keyword.lower()] = role.id
-        self.set_guild_roles(ctx.guild.id, guild_roles)
+        await self.set_guild_roles(ctx.guild.id, guild_roles)
         embed = discord.Embed(
             title="✅ Custom Role Mapping Added",
             description=f"`{keyword}` → {role.mention}",
@@ -50,7 +41,7 @@ class CustomRoles(commands.Cog):
         guild_roles = self.get_guild_roles(ctx.guild.id)
         if keyword.lower() in guild_roles:
             del guild_roles[keyword.lower()]
-            self.set_guild_roles(ctx.guild.id, guild_roles)
+            await self.set_guild_roles(ctx.guild.id, guild_roles)
             embed = discord.Embed(
                 title="❌ Custom Role Mapping Removed",
                 description=f"Removed mapping for `{keyword}`.",
@@ -1,88 +1,372 @@
 import discord
-from discord.ext import commands
-import json
-from typing import Optional
-from utils.modutils import log_mod_action
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from discord import app_commands, ui
+from discord.ext import commands, tasks
+from typing import List, Optional
+from utils.modutils import queue_mod_action, compact_modlogs, get_log_config, update_log_config, invalidate_log_config, MODLOGS, MODLOG_INDEX, LOG_BATCHER, LOG_QUEUE, LOG_SINKS, invalidate_log_channel
+from utils.modutils import event_bit, event_mask, wants_event, load_event_masks, combined_event_mask, COMMAND_ACTIONS
+from utils import aio
+from utils.archive import AttachmentArchive
+from utils.audit import AuditCache
+from utils.coalesce import Coalescer
+from utils.diffs import clip, escape, flag_diff, listing, set_diff, text_diff, value_changes
+from utils.modexport import EXPORT_FORMATS, aexport
+from utils.msgcache import CachedMessage, MessageCache, write_transcript
+
+# Log actions each listener can produce. Listeners whose actions no guild
+# wants are detached from the bot until some guild enables one again.
+LISTENER_ACTIONS = {
+    "on_voice_state_update": ("voice_leave", "voice_join", "voice_move", "voice_self_mute", "voice_self_deaf", "voice_update", "voice_digest"),
+    "on_thread_create": ("thread_create",),
+    "on_thread_delete": ("thread_delete",),
+    "on_thread_update": ("thread_update",),
+    "on_guild_integrations_update": ("integrations_update",),
+    "on_webhooks_update": ("webhook_update",),
+    "on_scheduled_event_create": ("scheduled_event_create",),
+    "on_scheduled_event_delete": ("scheduled_event_delete",),
+    "on_scheduled_event_update": ("scheduled_event_update",),
+    "on_member_ban": ("ban",),
+    "on_member_unban": ("unban",),
+    "on_member_update": ("nickname", "roleadd", "roleremove", "boost", "unboost", "timeout", "untimeout"),
+    "on_guild_update": ("guild_update",),
+    "on_guild_emojis_update": ("emoji_add", "emoji_remove"),
+    "on_guild_stickers_update": ("sticker_add", "sticker_remove"),
+    "on_invite_create": ("invite_create",),
+    "on_invite_delete": ("invite_delete",),
+    "on_member_join": ("member_join",),
+    "on_member_remove": ("member_leave",),
+    "on_message": ("message_delete", "message_edit", "message_bulk_delete"),
+    "on_raw_message_delete": ("message_delete",),
+    "on_raw_message_edit": ("message_edit",),
+    "on_raw_bulk_message_delete": ("message_bulk_delete",),
+    "on_guild_role_create": ("role_create",),
+    "on_guild_role_delete": ("role_delete",),
+    "on_guild_role_update": ("role_update",),
+}
+LISTENER_MASKS = {name: event_mask(*actions) for name, actions in LISTENER_ACTIONS.items()}
+# Everything a guild can enable or disable: the listeners above, the channel
+# listeners (always attached), moderation commands and queue overflow notices
+LOG_EVENTS = sorted(
+    {action for actions in LISTENER_ACTIONS.values() for action in actions}
+    | {"channel_create", "channel_delete", "channel_update", "log_overflow"}
+    | set(COMMAND_ACTIONS)
+)
+DIFF_LIMIT = 800  # leaves room in the 1024-char reason field for the header and audit reason
+VOICE_DIGEST_LABELS = {
+    "voice_join": "join(s)",
+    "voice_leave": "leave(s)",
+    "voice_move": "move(s)",
+    "voice_self_mute": "mute toggle(s)",
+    "voice_self_deaf": "deafen toggle(s)",
+}
+
+SEARCH_PAGE_SIZE = 10
+
+
+def _entry_line(e):
+    return f"`{e.get('timestamp', '')[:19]}` **{e.get('action')}** – {e.get('target')} by {e.get('moderator')}"
+
+
+def _parse_when(text: str) -> Optional[float]:
+    """Epoch seconds for a relative duration ("7d", "2h30m") ago or an ISO date/time (UTC)."""
+    parts = re.findall(r"(\d+)([dhms])", text.lower())
+    if parts and "".join(a + u for a, u in parts) == text.lower().replace(" ", ""):
+        units = {"d": 86400, "h": 3600, "m": 60, "s": 1}
+        return time.time() - sum(int(a) * units[u] for a, u in parts)
+    try:
+        when = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+
+def _search_keys(guild, text: str) -> List[str]:
+    """Index keys for a user given as a mention, id or name; known members match by both."""
+    match = re.fullmatch(r"<@!?(\d+)>|(\d{15,})", text.strip())
+    if match:
+        user_id = int(match.group(1) or match.group(2))
+        member = guild.get_member(user_id)
+        return [str(user_id)] + ([str(member).lower()] if member else [])
+    member = guild.get_member_named(text)
+    return [text.lower()] + ([str(member.id), str(member).lower()] if member else [])
+
+
+def _search_filters(guild, target=None, moderator=None, action=None, since=None, until=None):
+    """Index filters from command options; returns (error, filters)."""
+    filters = {}
+    if target:
+        filters["targets"] = _search_keys(guild, target)
+    if moderator:
+        filters["moderators"] = _search_keys(guild, moderator)
+    if action:
+        filters["action"] = action.lower()
+    for name, text in (("since", since), ("until", until)):
+        if text:
+            when = _parse_when(text)
+            if when is None:
+                return f"❌ Invalid `{name}`: use a duration like `7d`/`12h` or a date like `2024-05-01`.", None
+            filters[name] = when
+    return None, filters
+
+
+class ModlogSearchFlags(commands.FlagConverter, delimiter=":", case_insensitive=True):
+    target: Optional[str] = None
+    moderator: Optional[str] = None
+    action: Optional[str] = None
+    since: Optional[str] = None
+    until: Optional[str] = None
+
+
+class ModlogExportFlags(ModlogSearchFlags):
+    format: str = "jsonl"
+
+
+class ModlogSearchView(ui.View):
+    def __init__(self, author_id, guild_id, positions, title, timeout=120):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.guild_id = guild_id
+        self.positions = positions
+        self.title = title
+        self.page = 0
+        self.pages = max(1, -(-len(positions) // SEARCH_PAGE_SIZE))
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.previous.disabled = self.page == 0
+        self.next.disabled = self.page >= self.pages - 1
+
+    async def render(self) -> discord.Embed:
+        start = self.page * SEARCH_PAGE_SIZE
+        entries = await MODLOG_INDEX.fetch(self.guild_id, self.positions[start:start + SEARCH_PAGE_SIZE])
+        lines = []
+        for e in entries:
+            line = _entry_line(e)
+            if e.get("reason") and e["reason"] != "No reason provided":
+                line += f"\n> {e['reason'][:200]}"
+            lines.append(line)
+        embed = discord.Embed(title=self.title, description="\n".join(lines) or "No entries on this page.", color=discord.Color.blurple())
+        embed.set_footer(text=f"Page {self.page + 1}/{self.pages} • {len(self.positions)} match(es)")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Only the person who ran the search can page through it.", ephemeral=True)
+            return False
+        return True
+
+    async def turn(self, interaction: discord.Interaction, step: int):
+        self.page = max(0, min(self.page + step, self.pages - 1))
+        self.update_buttons()
+        await interaction.response.edit_message(embed=await self.render(), view=self)
+
+    @ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: ui.Button):
+        await self.turn(interaction, -1)
+
+    @ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: ui.Button):
+        await self.turn(interaction, 1)
 
-MODLOGS_FILE = "data/modlogs.json"
 
 class Events(commands.Cog):
     # Voice state updates (join/leave/move/mute/deafen)
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
+        if not wants_event(member.guild.id, LISTENER_MASKS["on_voice_state_update"]):
+            return
+        changes = []
         if before.channel != after.channel:
             if before.channel and not after.channel:
-                await log_mod_action(member.guild, "voice_leave", member, member, f"Left voice channel: {before.channel.name}")
+                changes.append(("voice_leave", f"Left voice channel: {before.channel.name}"))
             elif not before.channel and after.channel:
-                await log_mod_action(member.guild, "voice_join", member, member, f"Joined voice channel: {after.channel.name}")
+                changes.append(("voice_join", f"Joined voice channel: {after.channel.name}"))
             elif before.channel and after.channel and before.channel != after.channel:
-                await log_mod_action(member.guild, "voice_move", member, member, f"Moved: {before.channel.name} → {after.channel.name}")
+                changes.append(("voice_move", f"Moved: {before.channel.name} → {after.channel.name}"))
         if before.self_mute != after.self_mute:
             state = "Muted" if after.self_mute else "Unmuted"
-            await log_mod_action(member.guild, "voice_self_mute", member, member, f"{state} themselves in voice.")
+            changes.append(("voice_self_mute", f"{state} themselves in voice."))
         if before.self_deaf != after.self_deaf:
             state = "Deafened" if after.self_deaf else "Undeafened"
-            await log_mod_action(member.guild, "voice_self_deaf", member, member, f"{state} themselves in voice.")
-
+            changes.append(("voice_self_deaf", f"{state} themselves in voice."))
+        conf = await get_log_config(member.guild.id)
+        # Changes of a type the guild turned off are neither logged nor counted in the digest
+        changes = [change for change in changes if conf.wants(change[0])]
+        if not changes:
+            return
+        if conf.voice_digest and conf.wants("voice_digest"):
+            digest = self.voice_digests.setdefault(member.guild.id, {"guild": member.guild, "since": time.monotonic(), "members": {}})
+            counts = digest["members"].setdefault(member.id, [member, Counter()])[1]
+            counts.update(action for action, _ in changes)
+            return
+        for change in changes:
+            self.voice_coalescer.add((member.guild.id, member.id), (member.guild, member), change)
+
+    def emit_voice(self, key, context, changes):
+        # One entry per burst, e.g. a reconnect's leave + join + mute + deafen
+        guild, member = context
+        if len(changes) == 1:
+            action, reason = changes[0]
+        else:
+            action = "voice_update"
+            reason = f"{len(changes)} voice changes: " + " → ".join(text for _, text in changes)
+        queue_mod_action(guild, action, member, member, reason[:1000])
+
+    def flush_voice_digest(self, guild_id):
+        digest = self.voice_digests.pop(guild_id, None)
+        if not digest or not digest["members"]:
+            return
+        guild = digest["guild"]
+        minutes = max(1, round((time.monotonic() - digest["since"]) / 60))
+        ranked = sorted(digest["members"].values(), key=lambda mc: sum(mc[1].values()), reverse=True)
+        total = sum(sum(counts.values()) for _, counts in ranked)
+        lines = []
+        for member, counts in ranked:
+            parts = ", ".join(f"{n} {VOICE_DIGEST_LABELS.get(action, action)}" for action, n in counts.most_common())
+            line = f"{member.display_name}: {parts}"
+            if sum(len(l) + 1 for l in lines) + len(line) > 900:
+                lines.append(f"…and {len(ranked) - len(lines)} more member(s)")
+                break
+            lines.append(line)
+        summary = f"{total} voice change(s) by {len(ranked)} member(s) in the last {minutes} min\n" + "\n".join(lines)
+        queue_mod_action(guild, "voice_digest", guild.me, guild.me, summary)
+
+    @tasks.loop(minutes=1)
+    async def voice_digest_task(self):
+        now = time.monotonic()
+        for guild_id, digest in list(self.voice_digests.items()):
+            conf = await get_log_config(guild_id)
+            if not conf.voice_digest or now - digest["since"] >= conf.voice_digest * 60:
+                self.flush_voice_digest(guild_id)
+
+    @commands.command(name="voicedigest", help="Post a voice activity summary every N minutes instead of one log per change (0 turns it off).")
+    @commands.has_permissions(administrator=True)
+    async def voicedigest(self, ctx, minutes: int):
+        conf = (await get_log_config(ctx.guild.id)).to_dict()
+        if minutes <= 0:
+            conf.pop("voice_digest", None)
+            self.flush_voice_digest(ctx.guild.id)
+            await self.save_log_config(ctx.guild.id, conf)
+            return await ctx.send("✅ Voice digest turned off; voice changes are logged as they happen.")
+        conf["voice_digest"] = minutes
+        if conf.get("enabled_events") is not None and "voice_digest" not in conf["enabled_events"]:
+            conf["enabled_events"] = list(conf["enabled_events"]) + ["voice_digest"]
+        await self.save_log_config(ctx.guild.id, conf)
+        await ctx.send(f"✅ Voice activity will be summarised every {minutes} minute(s).")
+
+
+    @commands.group(name="archive", invoke_without_command=True, help="Show which channels have their attachments archived for delete logs.")
+    @commands.has_permissions(administrator=True)
+    async def archive_group(self, ctx):
+        conf = await get_log_config(ctx.guild.id)
+        used = await self.archive.usage()
+        desc = f"**Channels:** {', '.join(f'<#{c}>' for c in conf.archive_channels) or 'None'}\n"
+        desc += f"**Store:** {used / 1048576:.1f} / {self.archive.quota / 1048576:.0f} MB (shared by all servers)\n"
+        desc += f"**Since start:** {self.archive.stored} stored, {self.archive.deduplicated} deduplicated, {self.archive.evicted} evicted"
+        await ctx.send(embed=discord.Embed(title="Attachment Archive", description=desc, color=discord.Color.blurple()))
+
+    @archive_group.command(name="add", help="Archive attachments posted in a channel. Usage: archive add #channel")
+    @commands.has_permissions(administrator=True)
+    async def archive_add(self, ctx, channel: discord.TextChannel):
+        conf = (await get_log_config(ctx.guild.id)).to_dict()
+        channels = set(conf.get("archive_channels", []))
+        channels.add(channel.id)
+        conf["archive_channels"] = sorted(channels)
+        await self.save_log_config(ctx.guild.id, conf)
+        await ctx.send(f"✅ Attachments in {channel.mention} will be archived and attached to delete logs.")
+
+    @archive_group.command(name="remove", help="Stop archiving attachments in a channel. Usage: archive remove #channel")
+    @commands.has_permissions(administrator=True)
+    async def archive_remove(self, ctx, channel: discord.TextChannel):
+        conf = (await get_log_config(ctx.guild.id)).to_dict()
+        channels = set(conf.get("archive_channels", []))
+        channels.discard(channel.id)
+        if channels:
+            conf["archive_channels"] = sorted(channels)
+        else:
+            conf.pop("archive_channels", None)
+        await self.save_log_config(ctx.guild.id, conf)
+        await ctx.send(f"✅ Stopped archiving attachments in {channel.mention}.")
 
     # Thread events
     @commands.Cog.listener()
     async def on_thread_create(self, thread):
-        await log_mod_action(thread.guild, "thread_create", thread.owner or thread.guild.me, thread.guild.me, f"Thread created: {thread.name}")
+        queue_mod_action(thread.guild, "thread_create", thread.owner or thread.guild.me, thread.guild.me, f"Thread created: {thread.name}")
 
     @commands.Cog.listener()
     async def on_thread_delete(self, thread):
-        await log_mod_action(thread.guild, "thread_delete", thread.owner or thread.guild.me, thread.guild.me, f"Thread deleted: {thread.name}")
+        if not wants_event(thread.guild.id, LISTENER_MASKS["on_thread_delete"]):
+            return
+        moderator, why = await self.attribute(thread.guild, thread.id, "thread_delete", default=thread.owner)
+        queue_mod_action(thread.guild, "thread_delete", moderator, thread.guild.me, f"Thread deleted: {thread.name}{why}")
 
     @commands.Cog.listener()
     async def on_thread_update(self, before, after):
-        await log_mod_action(after.guild, "thread_update", after.owner or after.guild.me, after.guild.me, f"Thread updated: {before.name} → {after.name}")
+        if not wants_event(after.guild.id, LISTENER_MASKS["on_thread_update"]):
+            return
+        changes = value_changes([
+            ("Name", before.name, after.name),
+            ("Archived", before.archived, after.archived),
+            ("Locked", before.locked, after.locked),
+            ("Slowmode", before.slowmode_delay, after.slowmode_delay),
+        ])
+        if not changes:
+            return
+        moderator, why = await self.attribute(after.guild, after.id, "thread_update", default=after.owner)
+        queue_mod_action(after.guild, "thread_update", moderator, after.guild.me,
+                         f"Thread updated: {after.mention}\n" + listing(changes, DIFF_LIMIT, sep="\n") + why)
 
     # Integration events
     @commands.Cog.listener()
     async def on_guild_integrations_update(self, guild):
-        await log_mod_action(guild, "integrations_update", guild.me, guild.me, "Guild integrations updated.")
+        queue_mod_action(guild, "integrations_update", guild.me, guild.me, "Guild integrations updated.")
 
     # Webhook events
     @commands.Cog.listener()
     async def on_webhooks_update(self, channel):
-        await log_mod_action(channel.guild, "webhook_update", channel.guild.me, channel.guild.me, f"Webhooks updated in {channel.mention}")
+        queue_mod_action(channel.guild, "webhook_update", channel.guild.me, channel.guild.me, f"Webhooks updated in {channel.mention}")
 
     # Scheduled event events
     @commands.Cog.listener()
     async def on_scheduled_event_create(self, event):
-        await log_mod_action(event.guild, "scheduled_event_create", event.creator or event.guild.me, event.guild.me, f"Scheduled event created: {event.name}")
+        queue_mod_action(event.guild, "scheduled_event_create", event.creator or event.guild.me, event.guild.me, f"Scheduled event created: {event.name}")
 
     @commands.Cog.listener()
     async def on_scheduled_event_delete(self, event):
-        await log_mod_action(event.guild, "scheduled_event_delete", event.creator or event.guild.me, event.guild.me, f"Scheduled event deleted: {event.name}")
+        queue_mod_action(event.guild, "scheduled_event_delete", event.creator or event.guild.me, event.guild.me, f"Scheduled event deleted: {event.name}")
 
     @commands.Cog.listener()
     async def on_scheduled_event_update(self, before, after):
-        await log_mod_action(after.guild, "scheduled_event_update", after.creator or after.guild.me, after.guild.me, f"Scheduled event updated: {before.name} → {after.name}")
+        queue_mod_action(after.guild, "scheduled_event_update", after.creator or after.guild.me, after.guild.me, f"Scheduled event updated: {before.name} → {after.name}")
 
-    # Audit log entry create (if privileged intent enabled)
+    # Audit log entries attribute the events above; they are not logged themselves
     @commands.Cog.listener()
-    async def on_audit_log_entry_create(self, entry, guild):
-        await log_mod_action(guild, "audit_log_entry", entry.user or guild.me, guild.me, f"Audit log action: {entry.action}")
+    async def on_audit_log_entry_create(self, entry):
+        self.audit.add(entry)
+
+    async def attribute(self, guild, target_id, *actions, default=None, since=None):
+        """(moderator, reason suffix) for an event on ``target_id``, from audit log entries made
+        since the event (``since``, a ``time.time()`` taken when it arrived; defaults to now)."""
+        default = default or guild.me
+        if target_id is None or not guild.me.guild_permissions.view_audit_log:
+            return default, ""
+        record = await self.audit.lookup(guild.id, target_id, *actions, since=since)
+        if record is None:
+            return default, ""
+        return record.user, f" (reason: {record.reason})" if record.reason else ""
     @commands.command(name="logevents", help="List all loggable event types.")
     async def logevents(self, ctx):
-        events = [
-            "member_join", "member_leave", "message_delete", "message_edit", "channel_create", "channel_delete", "channel_update",
-            "role_create", "role_delete", "role_update", "ban", "unban", "nickname", "roleadd", "roleremove", "guild_update",
-            "emoji_add", "emoji_remove", "sticker_add", "sticker_remove", "invite_create", "invite_delete", "mute", "unmute", "warn"
-        ]
-        await ctx.send(embed=discord.Embed(title="Loggable Events", description="\n".join(events), color=discord.Color.blurple()))
+        await ctx.send(embed=discord.Embed(title="Loggable Events", description="\n".join(LOG_EVENTS), color=discord.Color.blurple()))
 
     @commands.command(name="logembedset", help="Set embed color/title/icon for a specific event type.")
     @commands.has_permissions(administrator=True)
     async def logembedset(self, ctx, event: str, color: Optional[str] = None, *, title: Optional[str] = None):
-        try:
-            with open(MODLOGS_FILE, "r") as f:
-                data = json.load(f)
-        except Exception:
-            data = {}
-        conf = data.setdefault(str(ctx.guild.id), {})
+        conf = (await get_log_config(ctx.guild.id)).to_dict()
         event_embeds = conf.setdefault("event_embeds", {})
         event_conf = event_embeds.setdefault(event, {})
         if color:
@@ -92,197 +376,191 @@ class Events(commands.Cog):
                 return await ctx.send("❌ Invalid color. Use hex (e.g. #7289da)")
         if title:
             event_conf["title"] = title
-        with open(MODLOGS_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        await self.save_log_config(ctx.guild.id, conf)
         await ctx.send(f"✅ Embed config updated for `{event}`.")
 
     @commands.command(name="logembedreset", help="Reset embed customization for a specific event type.")
     @commands.has_permissions(administrator=True)
     async def logembedreset(self, ctx, event: str):
-        try:
-            with open(MODLOGS_FILE, "r") as f:
-                data = json.load(f)
-        except Exception:
-            data = {}
-        conf = data.setdefault(str(ctx.guild.id), {})
+        conf = (await get_log_config(ctx.guild.id)).to_dict()
         event_embeds = conf.setdefault("event_embeds", {})
         if event in event_embeds:
             del event_embeds[event]
-        with open(MODLOGS_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        await self.save_log_config(ctx.guild.id, conf)
         await ctx.send(f"♻️ Embed config reset for `{event}`.")
     # Member banned
     @commands.Cog.listener()
     async def on_member_ban(self, guild, user):
-        await log_mod_action(guild, "ban", user, user, "User was banned from the server.")
+        if not wants_event(guild.id, LISTENER_MASKS["on_member_ban"]):
+            return
+        moderator, why = await self.attribute(guild, user.id, "ban", default=user)
+        queue_mod_action(guild, "ban", moderator, user, f"User was banned from the server.{why}")
 
     # Member unbanned
     @commands.Cog.listener()
     async def on_member_unban(self, guild, user):
-        await log_mod_action(guild, "unban", user, user, "User was unbanned from the server.")
+        if not wants_event(guild.id, LISTENER_MASKS["on_member_unban"]):
+            return
+        moderator, why = await self.attribute(guild, user.id, "unban", default=user)
+        queue_mod_action(guild, "unban", moderator, user, f"User was unbanned from the server.{why}")
 
     # Member update (nickname, roles)
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
+        if not wants_event(after.guild.id, LISTENER_MASKS["on_member_update"]):
+            return
+        # Taken before the first lookup, which may wait
+        since = time.time()
         # Nickname change
         if before.nick != after.nick:
-            await log_mod_action(after.guild, "nickname", after, after, f"Nickname changed: {before.nick} → {after.nick}")
+            moderator, why = await self.attribute(after.guild, after.id, "member_update", default=after, since=since)
+            queue_mod_action(after.guild, "nickname", moderator, after, f"Nickname changed: {before.nick} → {after.nick}{why}")
         # Role changes
         if set(before.roles) != set(after.roles):
             before_roles = set(before.roles)
             after_roles = set(after.roles)
             added = after_roles - before_roles
             removed = before_roles - after_roles
+            moderator, why = await self.attribute(after.guild, after.id, "member_role_update", default=after, since=since)
             if added:
-                await log_mod_action(after.guild, "roleadd", after, after, f"Roles added: {', '.join(r.name for r in added)}")
+                queue_mod_action(after.guild, "roleadd", moderator, after, f"Roles added: {listing([r.name for r in added], DIFF_LIMIT)}{why}")
             if removed:
-                await log_mod_action(after.guild, "roleremove", after, after, f"Roles removed: {', '.join(r.name for r in removed)}")
+                queue_mod_action(after.guild, "roleremove", moderator, after, f"Roles removed: {listing([r.name for r in removed], DIFF_LIMIT)}{why}")
         # Boost/unboost
         if before.premium_since != after.premium_since:
             if after.premium_since:
-                await log_mod_action(after.guild, "boost", after, after, f"Started boosting the server!")
+                queue_mod_action(after.guild, "boost", after, after, f"Started boosting the server!")
             else:
-                await log_mod_action(after.guild, "unboost", after, after, f"Stopped boosting the server.")
+                queue_mod_action(after.guild, "unboost", after, after, f"Stopped boosting the server.")
         # Timeout
         if getattr(before, 'timed_out_until', None) != getattr(after, 'timed_out_until', None):
+            moderator, why = await self.attribute(after.guild, after.id, "member_update", default=after, since=since)
             if getattr(after, 'timed_out_until', None):
-                await log_mod_action(after.guild, "timeout", after, after, f"Timed out until {after.timed_out_until}")
+                queue_mod_action(after.guild, "timeout", moderator, after, f"Timed out until {after.timed_out_until}{why}")
             else:
-                await log_mod_action(after.guild, "untimeout", after, after, f"Timeout removed.")
+                queue_mod_action(after.guild, "untimeout", moderator, after, f"Timeout removed.{why}")
 
     # Guild update (name, icon, etc)
     @commands.Cog.listener()
     async def on_guild_update(self, before, after):
-        changes = []
-        if before.name != after.name:
-            changes.append(f"Name: {before.name} → {after.name}")
+        if not wants_event(after.id, LISTENER_MASKS["on_guild_update"]):
+            return
+        changes = value_changes([
+            ("Name", before.name, after.name),
+            ("Verification", before.verification_level, after.verification_level),
+            ("AFK channel", before.afk_channel, after.afk_channel),
+            ("System channel", before.system_channel, after.system_channel),
+        ])
         if before.icon != after.icon:
             changes.append("Icon changed.")
         if before.owner_id != after.owner_id:
             changes.append(f"Owner: <@{before.owner_id}> → <@{after.owner_id}>")
+        if before.description != after.description:
+            changes.append("Description: " + text_diff(before.description or "", after.description or "", limit=DIFF_LIMIT // 2))
         if changes:
-            await log_mod_action(after, "guild_update", after.me, after.me, " | ".join(changes))
+            moderator, why = await self.attribute(after, after.id, "guild_update")
+            queue_mod_action(after, "guild_update", moderator, after.me, listing(changes, DIFF_LIMIT, sep="\n") + why)
 
     # Emoji events
     @commands.Cog.listener()
     async def on_guild_emojis_update(self, guild, before, after):
+        if not wants_event(guild.id, LISTENER_MASKS["on_guild_emojis_update"]):
+            return
+        # Taken before the first lookup, which may wait
+        since = time.time()
         before_set = set(e.id for e in before)
         after_set = set(e.id for e in after)
         added = [e for e in after if e.id not in before_set]
         removed = [e for e in before if e.id not in after_set]
         if added:
-            await log_mod_action(guild, "emoji_add", guild.me, guild.me, f"Emojis added: {', '.join(e.name for e in added)}")
+            moderator, why = await self.attribute(guild, added[0].id, "emoji_create", since=since)
+            queue_mod_action(guild, "emoji_add", moderator, guild.me, f"Emojis added: {', '.join(e.name for e in added)}{why}")
         if removed:
-            await log_mod_action(guild, "emoji_remove", guild.me, guild.me, f"Emojis removed: {', '.join(e.name for e in removed)}")
+            moderator, why = await self.attribute(guild, removed[0].id, "emoji_delete", since=since)
+            queue_mod_action(guild, "emoji_remove", moderator, guild.me, f"Emojis removed: {', '.join(e.name for e in removed)}{why}")
 
     # Sticker events
     @commands.Cog.listener()
     async def on_guild_stickers_update(self, guild, before, after):
+        if not wants_event(guild.id, LISTENER_MASKS["on_guild_stickers_update"]):
+            return
+        # Taken before the first lookup, which may wait
+        since = time.time()
         before_set = set(s.id for s in before)
         after_set = set(s.id for s in after)
         added = [s for s in after if s.id not in before_set]
         removed = [s for s in before if s.id not in after_set]
         if added:
-            await log_mod_action(guild, "sticker_add", guild.me, guild.me, f"Stickers added: {', '.join(s.name for s in added)}")
+            moderator, why = await self.attribute(guild, added[0].id, "sticker_create", since=since)
+            queue_mod_action(guild, "sticker_add", moderator, guild.me, f"Stickers added: {', '.join(s.name for s in added)}{why}")
         if removed:
-            await log_mod_action(guild, "sticker_remove", guild.me, guild.me, f"Stickers removed: {', '.join(s.name for s in removed)}")
+            moderator, why = await self.attribute(guild, removed[0].id, "sticker_delete", since=since)
+            queue_mod_action(guild, "sticker_remove", moderator, guild.me, f"Stickers removed: {', '.join(s.name for s in removed)}{why}")
 
     # Invite events
     @commands.Cog.listener()
     async def on_invite_create(self, invite):
-        await log_mod_action(invite.guild, "invite_create", invite.inviter or invite.guild.me, invite.guild.me, f"Invite created: {invite.url}")
+        queue_mod_action(invite.guild, "invite_create", invite.inviter or invite.guild.me, invite.guild.me, f"Invite created: {invite.url}")
 
     @commands.Cog.listener()
     async def on_invite_delete(self, invite):
-        await log_mod_action(invite.guild, "invite_delete", invite.inviter or invite.guild.me, invite.guild.me, f"Invite deleted: {invite.url}")
+        queue_mod_action(invite.guild, "invite_delete", invite.inviter or invite.guild.me, invite.guild.me, f"Invite deleted: {invite.url}")
     @commands.command(name="stoplogs", help="Stop logging all events.")
     @commands.has_permissions(administrator=True)
     async def stoplogs(self, ctx):
-        try:
-            with open(MODLOGS_FILE, "r") as f:
-                data = json.load(f)
-        except Exception:
-            data = {}
-        conf = data.setdefault(str(ctx.guild.id), {})
+        conf = (await get_log_config(ctx.guild.id)).to_dict()
         conf["logging_enabled"] = False
-        with open(MODLOGS_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        await self.save_log_config(ctx.guild.id, conf)
         await ctx.send("🛑 Logging is now disabled for this server.")
 
     @commands.command(name="removelogs", help="Remove the log channel setting.")
     @commands.has_permissions(administrator=True)
     async def removelogs(self, ctx):
-        try:
-            with open(MODLOGS_FILE, "r") as f:
-                data = json.load(f)
-        except Exception:
-            data = {}
-        conf = data.setdefault(str(ctx.guild.id), {})
+        conf = (await get_log_config(ctx.guild.id)).to_dict()
         conf.pop("log_channel", None)
-        with open(MODLOGS_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        await self.save_log_config(ctx.guild.id, conf)
         await ctx.send("❌ Log channel removed. Logging will not be sent to any channel until set again.")
 
     @commands.command(name="enablelog", help="Enable logging for a specific event type.")
     @commands.has_permissions(administrator=True)
     async def enablelog(self, ctx, event: str):
-        try:
-            with open(MODLOGS_FILE, "r") as f:
-                data = json.load(f)
-        except Exception:
-            data = {}
-        conf = data.setdefault(str(ctx.guild.id), {})
+        conf = (await get_log_config(ctx.guild.id)).to_dict()
         enabled = set(conf.get("enabled_events", []))
         enabled.add(event)
         conf["enabled_events"] = list(enabled)
-        with open(MODLOGS_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        await self.save_log_config(ctx.guild.id, conf)
         await ctx.send(f"✅ Logging enabled for event: `{event}`.")
 
     @commands.command(name="disablelog", help="Disable logging for a specific event type.")
     @commands.has_permissions(administrator=True)
     async def disablelog(self, ctx, event: str):
-        try:
-            with open(MODLOGS_FILE, "r") as f:
-                data = json.load(f)
-        except Exception:
-            data = {}
-        conf = data.setdefault(str(ctx.guild.id), {})
+        conf = (await get_log_config(ctx.guild.id)).to_dict()
         enabled = set(conf.get("enabled_events", []))
         if event in enabled:
             enabled.remove(event)
         conf["enabled_events"] = list(enabled)
-        with open(MODLOGS_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        await self.save_log_config(ctx.guild.id, conf)
         await ctx.send(f"🚫 Logging disabled for event: `{event}`.")
 
     @commands.command(name="logconfig", help="Show current log settings.")
     @commands.has_permissions(administrator=True)
     async def logconfig(self, ctx):
-        try:
-            with open(MODLOGS_FILE, "r") as f:
-                data = json.load(f)
-        except Exception:
-            data = {}
-        conf = data.get(str(ctx.guild.id), {})
-        channel_id = conf.get("log_channel")
-        enabled = conf.get("enabled_events", [])
-        logging_enabled = conf.get("logging_enabled", True)
+        conf = await get_log_config(ctx.guild.id)
+        channel_id = conf.log_channel
+        enabled = sorted(conf.enabled_events or [])
+        logging_enabled = conf.logging_enabled
         channel = ctx.guild.get_channel(channel_id) if channel_id else None
         desc = f"**Log Channel:** {channel.mention if channel else 'Not set'}\n"
         desc += f"**Logging Enabled:** {logging_enabled}\n"
-        desc += f"**Enabled Events:** {', '.join(enabled) if enabled else 'All'}"
+        desc += f"**Enabled Events:** {', '.join(enabled) if enabled else 'All'}\n"
+        desc += f"**Delivery:** {conf.sink}\n"
+        desc += f"**Attachment Archive:** {', '.join(f'<#{c}>' for c in conf.archive_channels) or 'Off'}"
         await ctx.send(embed=discord.Embed(title="Log Config", description=desc, color=discord.Color.blurple()))
 
     @commands.command(name="logembed", help="Customize log embed color and title.")
     @commands.has_permissions(administrator=True)
     async def logembed(self, ctx, color: Optional[str] = None, *, title: Optional[str] = None):
-        try:
-            with open(MODLOGS_FILE, "r") as f:
-                data = json.load(f)
-        except Exception:
-            data = {}
-        conf = data.setdefault(str(ctx.guild.id), {})
+        conf = (await get_log_config(ctx.guild.id)).to_dict()
         if color:
             try:
                 conf["embed_color"] = int(color.strip("#"), 16)
@@ -290,9 +568,19 @@ class Events(commands.Cog):
                 return await ctx.send("❌ Invalid color. Use hex (e.g. #7289da)")
         if title:
             conf["embed_title"] = title
-        with open(MODLOGS_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        await self.save_log_config(ctx.guild.id, conf)
         await ctx.send("✅ Log embed updated.")
+    @commands.command(name="logsink", help="Choose how logs are delivered: channel or webhook.")
+    @commands.has_permissions(administrator=True)
+    async def logsink(self, ctx, sink: str):
+        sink = sink.lower()
+        if sink not in LOG_SINKS:
+            return await ctx.send(f"❌ Unknown sink. Use one of: {', '.join(LOG_SINKS)}")
+        conf = (await get_log_config(ctx.guild.id)).to_dict()
+        conf["sink"] = sink
+        await self.save_log_config(ctx.guild.id, conf)
+        await ctx.send(f"✅ Logs will be delivered via `{sink}`.")
+
     @commands.command(name="setlogs", help="Set the channel for all event logs.")
     @commands.has_permissions(administrator=True)
     async def setlogs(self, ctx, channel: Optional[discord.TextChannel] = None):
@@ -304,23 +592,161 @@ class Events(commands.Cog):
         if channel is None:
             await ctx.send("❌ Please specify a text channel.")
             return
-        # Load or create modlogs.json
-        try:
-            with open(MODLOGS_FILE, "r") as f:
-                data = json.load(f)
-        except Exception:
-            data = {}
-        data[str(ctx.guild.id)] = {"log_channel": channel.id}
-        with open(MODLOGS_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        conf = (await get_log_config(ctx.guild.id)).to_dict()
+        conf["log_channel"] = channel.id
+        await self.save_log_config(ctx.guild.id, conf)
         await ctx.send(f"✅ Log channel set to {channel.mention} for all events.")
+
+    @commands.group(name="modlogs", invoke_without_command=True, help="Show the most recent log entries.")
+    @commands.has_permissions(administrator=True)
+    async def modlogs(self, ctx, count: int = 10):
+        entries = await MODLOGS.alatest(ctx.guild.id, max(1, min(count, 25)))
+        if not entries:
+            return await ctx.send("No log entries recorded for this server yet.")
+        lines = []
+        for e in entries:
+            line = _entry_line(e)
+            if sum(len(l) + 1 for l in lines) + len(line) > 4000:
+                break
+            lines.append(line)
+        await ctx.send(embed=discord.Embed(title="Recent Log Entries", description="\n".join(lines), color=discord.Color.blurple()))
+
+    async def search_modlogs(self, guild, author_id, target=None, moderator=None, action=None, since=None, until=None):
+        """Run a modlog search; returns (error, embed, view)."""
+        error, filters = _search_filters(guild, target, moderator, action, since, until)
+        if error:
+            return error, None, None
+        positions = await MODLOG_INDEX.search(guild.id, **filters)
+        if not positions:
+            return "No log entries match that search.", None, None
+        view = ModlogSearchView(author_id, guild.id, positions, "Log Search Results")
+        return None, await view.render(), view
+
+    @modlogs.command(name="search", help="Search log entries. Usage: modlogs search target: @user moderator: @mod action: ban since: 7d until: 2024-05-01")
+    @commands.has_permissions(administrator=True)
+    async def modlogs_search(self, ctx, *, flags: ModlogSearchFlags):
+        error, embed, view = await self.search_modlogs(ctx.guild, ctx.author.id, flags.target, flags.moderator, flags.action, flags.since, flags.until)
+        if error:
+            return await ctx.send(error)
+        await ctx.send(embed=embed, view=view)
+
+    @modlogs.command(name="export", help="Export log history as a gzipped file. Usage: modlogs export format: csv target: @user since: 30d")
+    @commands.has_permissions(administrator=True)
+    @commands.cooldown(1, 60, commands.BucketType.guild)
+    async def modlogs_export(self, ctx, *, flags: ModlogExportFlags):
+        fmt = flags.format.lower()
+        if fmt not in EXPORT_FORMATS:
+            return await ctx.send(f"❌ Format must be one of: {', '.join(EXPORT_FORMATS)}")
+        error, filters = _search_filters(ctx.guild, flags.target, flags.moderator, flags.action, flags.since, flags.until)
+        if error:
+            return await ctx.send(error)
+        async with ctx.typing():
+            fp, count, size = await aexport(MODLOGS, ctx.guild.id, fmt, **filters)
+        with fp:
+            if not count:
+                return await ctx.send("No log entries match that export.")
+            if size > ctx.guild.filesize_limit:
+                return await ctx.send(f"❌ Export is {size / 1048576:.1f} MB, over this server's upload limit. Narrow it with `since:`/`until:` or other filters.")
+            await ctx.send(f"📦 Exported {count} log entries.", file=discord.File(fp, filename=f"modlogs-{ctx.guild.id}.{fmt}.gz"))
+
+    @app_commands.command(name="modlogsearch", description="Search this server's moderation log")
+    @app_commands.describe(since="Duration ago (7d, 12h) or date (2024-05-01)", until="Duration ago (7d, 12h) or date (2024-05-01)")
+    @app_commands.guild_only()
+    @app_commands.checks.has_permissions(administrator=True)
+    async def modlogsearch_slash(self, interaction: discord.Interaction, target: Optional[discord.User] = None,
+                                 moderator: Optional[discord.User] = None, action: Optional[str] = None,
+                                 since: Optional[str] = None, until: Optional[str] = None):
+        error, embed, view = await self.search_modlogs(
+            interaction.guild, interaction.user.id,
+            str(target.id) if target else None, str(moderator.id) if moderator else None, action, since, until,
+        )
+        if error:
+            return await interaction.response.send_message(error, ephemeral=True)
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+    @commands.command(name="logqueue", help="Show log queue depth and delivery lag.")
+    @commands.has_permissions(administrator=True)
+    async def logqueue(self, ctx):
+        m = LOG_QUEUE.metrics(ctx.guild.id)
+        totals = LOG_QUEUE.totals()
+        desc = f"**Queued:** {m['depth']} / {LOG_QUEUE.maxsize} (oldest {m['oldest']:.1f}s)\n"
+        desc += f"**Lag:** last {m['last_lag']:.2f}s, max {m['max_lag']:.2f}s\n"
+        desc += f"**Delivered:** {m['processed']}\n"
+        desc += f"**Dropped:** {m['dropped']} (policy: {LOG_QUEUE.policy})\n"
+        desc += f"**All servers:** {totals['depth']} queued in {totals['guilds']} server(s)"
+        await ctx.send(embed=discord.Embed(title="Log Queue", description=desc, color=discord.Color.blurple()))
+
     def __init__(self, bot):
         self.bot = bot
+        self.detached = set()  # listener names currently removed from the bot
+        self.voice_coalescer = Coalescer(self.emit_voice)
+        self.voice_digests = {}  # guild id -> {"guild", "since", "members": {member id: [member, Counter]}}
+        self.message_cache = MessageCache()
+        self.audit = AuditCache()
+        self.archive = AttachmentArchive()
+        self.compact_task.start()
+        self.message_cache_task.start()
+        self.voice_digest_task.start()
+
+    async def save_log_config(self, guild_id, conf):
+        await update_log_config(guild_id, conf)
+        self.refresh_listeners()
+
+    def refresh_listeners(self):
+        wanted = combined_event_mask(g.id for g in self.bot.guilds)
+        for name, mask in LISTENER_MASKS.items():
+            if wanted & mask and name in self.detached:
+                self.bot.add_listener(getattr(self, name), name)
+                self.detached.discard(name)
+            elif not wanted & mask and name not in self.detached:
+                self.bot.remove_listener(getattr(self, name), name)
+                self.detached.add(name)
+        if self.detached:
+            print(f"[Events] Listeners detached (no server logs them): {', '.join(sorted(self.detached))}")
+
+    async def cog_unload(self):
+        self.compact_task.cancel()
+        self.voice_digest_task.cancel()
+        self.message_cache_task.cancel()
+        self.voice_coalescer.flush_all()
+        for guild_id in list(self.voice_digests):
+            self.flush_voice_digest(guild_id)
+        await LOG_QUEUE.drain()
+        await LOG_BATCHER.flush()
+        invalidate_log_config()
+
+    # Drop cached log settings for guilds the bot leaves
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        invalidate_log_config(guild.id)
+        LOG_QUEUE.forget(guild.id)
+        self.message_cache.forget(guild.id)
+        self.audit.forget(guild.id)
+        self.refresh_listeners()
+
+    # A new guild logs everything until configured
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.refresh_listeners()
+
+    # Gzip sealed modlog segments and apply the retention policy
+    @tasks.loop(hours=6)
+    async def compact_task(self):
+        try:
+            result = await compact_modlogs()
+        except OSError as e:
+            print(f"[Events] Modlog compaction failed: {e}")
+            return
+        if result["compressed"] or result["removed"]:
+            print(f"[Events] Modlog compaction: {result['compressed']} segments compressed, "
+                  f"{result['removed']} removed, {result['bytes_freed']} bytes freed")
 
     # When bot is ready
     @commands.Cog.listener()
     async def on_ready(self):
         print(f"{self.bot.user} is now online!")
+        await load_event_masks()
+        self.refresh_listeners()
         try:
             synced = await self.bot.tree.sync()
             print(f"✅ Synced {len(synced)} slash commands.")
@@ -331,70 +757,200 @@ class Events(commands.Cog):
     @commands.Cog.listener()
     async def on_member_join(self, member):
         # Use member as both moderator and target if needed
-        await log_mod_action(member.guild, "member_join", member, member, "Joined the server")
+        queue_mod_action(member.guild, "member_join", member, member, "Joined the server")
 
     # Member leaves
     @commands.Cog.listener()
     async def on_member_remove(self, member):
-        await log_mod_action(member.guild, "member_leave", member, member, "Left the server")
+        queue_mod_action(member.guild, "member_leave", member, member, "Left the server")
+
+    # Messages are cached compactly so raw delete/edit events can be logged
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.guild and not message.author.bot:
+            self.message_cache.add(message)
+            if message.attachments and message.channel.id in (await get_log_config(message.guild.id)).archive_channels:
+                self.archive.archive(message)
+
+    def message_author(self, guild, author_id, fallback):
+        return guild.get_member(author_id) or fallback
 
     # Message deleted
     @commands.Cog.listener()
-    async def on_message_delete(self, message):
-        if message.author.bot:
+    async def on_raw_message_delete(self, payload):
+        if not payload.guild_id or not wants_event(payload.guild_id, LISTENER_MASKS["on_raw_message_delete"]):
+            return
+        guild = self.bot.get_guild(payload.guild_id)
+        if guild is None:
             return
-        await log_mod_action(message.guild, "message_delete", message.author, message.author, f"Deleted message: `{message.content}`")
+        record = self.message_cache.pop(payload.guild_id, payload.message_id)
+        if record is None and payload.cached_message is not None:
+            if payload.cached_message.author.bot:
+                return
+            record = CachedMessage.from_message(payload.cached_message)
+        if record is None:
+            queue_mod_action(guild, "message_delete", "Unknown", "Unknown",
+                             f"Deleted message {payload.message_id} in <#{payload.channel_id}> (content not cached)")
+            return
+        author = self.message_author(guild, record.author_id, record.author)
+        reason = f"Deleted message in <#{record.channel_id}>: {clip(escape(record.content), DIFF_LIMIT)}"
+        file = None
+        if record.attachments:
+            reason += "\nAttachments: " + ", ".join(name for name, _, _ in record.attachments)
+            refs = await self.archive.refs(record.id)
+            total = sum(size for _, _, size in refs)
+            if refs and total <= guild.filesize_limit:
+                fp, name = await aio.run(self.archive.bundle, refs)
+                file = discord.File(fp, filename=name)
+                reason += "\nArchived copy attached."
+            elif refs:
+                reason += f"\nArchived copy too large to attach ({total / 1048576:.1f} MB)."
+        queue_mod_action(guild, "message_delete", author, author, reason, file)
 
     # Message edited
     @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        if before.author.bot or before.content == after.content:
+    async def on_raw_message_edit(self, payload):
+        if not payload.guild_id or not wants_event(payload.guild_id, LISTENER_MASKS["on_raw_message_edit"]):
+            return
+        data = payload.data
+        after = data.get("content")
+        author_data = data.get("author") or {}
+        # Embed unfurls also arrive as edits, without an edited_timestamp
+        if after is None or not data.get("edited_timestamp") or author_data.get("bot"):
+            return
+        guild = self.bot.get_guild(payload.guild_id)
+        if guild is None:
+            return
+        record = self.message_cache.get(payload.guild_id, payload.message_id)
+        if record is not None:
+            before = record.content
+        elif payload.cached_message is not None:
+            before = payload.cached_message.content
+        else:
+            before = None
+        if before == after:
+            return
+        self.message_cache.update_content(payload.guild_id, payload.message_id, after)
+        author_id = int(author_data["id"]) if "id" in author_data else None
+        author = self.message_author(guild, author_id, author_data.get("username", "Unknown"))
+        if before is None:
+            change = f"*Before not cached.* **After:** {clip(escape(after), DIFF_LIMIT)}"
+        else:
+            change = text_diff(before, after, limit=DIFF_LIMIT)
+        queue_mod_action(guild, "message_edit", author, author, f"Edited message in <#{payload.channel_id}>:\n{change}")
+
+    # Messages purged in bulk
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        if not payload.guild_id or not wants_event(payload.guild_id, LISTENER_MASKS["on_raw_bulk_message_delete"]):
             return
-        await log_mod_action(before.guild, "message_edit", before.author, before.author,
-                             f"Edited message:\n**Before:** {before.content}\n**After:** {after.content}")
+        guild = self.bot.get_guild(payload.guild_id)
+        if guild is None:
+            return
+        records = self.message_cache.pop_many(payload.guild_id, payload.message_ids)
+        channel = guild.get_channel(payload.channel_id)
+        header = f"Bulk delete in #{channel.name if channel else payload.channel_id} ({payload.channel_id}), " \
+                 f"{discord.utils.utcnow():%Y-%m-%d %H:%M} UTC"
+        transcript = write_transcript(records, payload.message_ids, header)
+        file = discord.File(transcript, filename=f"purge-{payload.channel_id}-{int(time.time())}.txt")
+        queue_mod_action(guild, "message_bulk_delete", guild.me, guild.me,
+                         f"{len(payload.message_ids)} messages deleted in <#{payload.channel_id}> "
+                         f"({len(records)} cached, transcript attached)", file)
+
+    @tasks.loop(minutes=10)
+    async def message_cache_task(self):
+        self.message_cache.expire()
 
     # Channel created
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel):
-        # Use the bot's member as dummy moderator if available
-        bot_member = channel.guild.get_member(self.bot.user.id) if hasattr(self, 'bot') and self.bot.user else None
-        if bot_member:
-            await log_mod_action(channel.guild, "channel_create", bot_member, bot_member, f"Channel created: {channel.name}")
+        # The mod-logs channel may have appeared, gone away or been renamed
+        invalidate_log_channel(channel.guild.id)
+        if not wants_event(channel.guild.id, event_bit("channel_create")):
+            return
+        moderator, why = await self.attribute(channel.guild, channel.id, "channel_create")
+        queue_mod_action(channel.guild, "channel_create", moderator, channel.guild.me, f"Channel created: {channel.name}{why}")
 
     # Channel deleted
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel):
-        bot_member = channel.guild.get_member(self.bot.user.id) if hasattr(self, 'bot') and self.bot.user else None
-        if bot_member:
-            await log_mod_action(channel.guild, "channel_delete", bot_member, bot_member, f"Channel deleted: {channel.name}")
+        invalidate_log_channel(channel.guild.id)
+        if not wants_event(channel.guild.id, event_bit("channel_delete")):
+            return
+        moderator, why = await self.attribute(channel.guild, channel.id, "channel_delete")
+        queue_mod_action(channel.guild, "channel_delete", moderator, channel.guild.me, f"Channel deleted: {channel.name}{why}")
 
     # Channel updated
     @commands.Cog.listener()
     async def on_guild_channel_update(self, before, after):
-        bot_member = before.guild.get_member(self.bot.user.id) if hasattr(self, 'bot') and self.bot.user else None
-        if bot_member:
-            await log_mod_action(before.guild, "channel_update", bot_member, bot_member, f"Channel updated: {before.name}  {after.name}")
+        invalidate_log_channel(after.guild.id)
+        if not wants_event(after.guild.id, event_bit("channel_update")):
+            return
+        changes = value_changes([
+            ("Name", before.name, after.name),
+            ("Category", before.category, after.category),
+            ("NSFW", getattr(before, "nsfw", None), getattr(after, "nsfw", None)),
+            ("Slowmode", getattr(before, "slowmode_delay", None), getattr(after, "slowmode_delay", None)),
+            ("Bitrate", getattr(before, "bitrate", None), getattr(after, "bitrate", None)),
+            ("User limit", getattr(before, "user_limit", None), getattr(after, "user_limit", None)),
+        ])
+        if getattr(before, "topic", None) != getattr(after, "topic", None):
+            changes.append("Topic: " + text_diff(before.topic or "", after.topic or "", limit=DIFF_LIMIT // 2))
+        if before.overwrites != after.overwrites:
+            changes.extend(self.overwrite_changes(before.overwrites, after.overwrites))
+        if not changes:
+            return  # position-only moves fire for every sibling channel
+        moderator, why = await self.attribute(after.guild, after.id, "channel_update", "overwrite_create", "overwrite_update", "overwrite_delete")
+        queue_mod_action(after.guild, "channel_update", moderator, after.guild.me,
+                         f"Channel updated: {after.mention}\n" + listing(changes, DIFF_LIMIT, sep="\n") + why)
+
+    @staticmethod
+    def overwrite_changes(before, after):
+        """One line per role/member whose permission overwrite changed."""
+        def rules(overwrite):
+            return {f"{name}:{'allow' if value else 'deny'}" for name, value in overwrite if value is not None}
+        lines = []
+        for target in set(before) | set(after):
+            old = rules(before[target]) if target in before else set()
+            new = rules(after[target]) if target in after else set()
+            if old != new:
+                lines.append(f"Overwrite {escape(getattr(target, 'name', str(target)))}: {set_diff(old, new, limit=200)}")
+        return lines
 
     # Role created
     @commands.Cog.listener()
     async def on_guild_role_create(self, role):
-        bot_member = role.guild.get_member(self.bot.user.id) if hasattr(self, 'bot') and self.bot.user else None
-        if bot_member:
-            await log_mod_action(role.guild, "role_create", bot_member, bot_member, f"Role created: {role.name}")
+        if not wants_event(role.guild.id, LISTENER_MASKS["on_guild_role_create"]):
+            return
+        moderator, why = await self.attribute(role.guild, role.id, "role_create")
+        queue_mod_action(role.guild, "role_create", moderator, role.guild.me, f"Role created: {role.name}{why}")
 
     # Role deleted
     @commands.Cog.listener()
     async def on_guild_role_delete(self, role):
-        bot_member = role.guild.get_member(self.bot.user.id) if hasattr(self, 'bot') and self.bot.user else None
-        if bot_member:
-            await log_mod_action(role.guild, "role_delete", bot_member, bot_member, f"Role deleted: {role.name}")
+        if not wants_event(role.guild.id, LISTENER_MASKS["on_guild_role_delete"]):
+            return
+        moderator, why = await self.attribute(role.guild, role.id, "role_delete")
+        queue_mod_action(role.guild, "role_delete", moderator, role.guild.me, f"Role deleted: {role.name}{why}")
 
     # Role updated
     @commands.Cog.listener()
     async def on_guild_role_update(self, before, after):
-        bot_member = before.guild.get_member(self.bot.user.id) if hasattr(self, 'bot') and self.bot.user else None
-        if bot_member:
-            await log_mod_action(before.guild, "role_update", bot_member, bot_member, f"Role updated: {before.name}  {after.name}")
+        if not wants_event(after.guild.id, LISTENER_MASKS["on_guild_role_update"]):
+            return
+        changes = value_changes([
+            ("Name", before.name, after.name),
+            ("Color", before.color, after.color),
+            ("Hoisted", before.hoist, after.hoist),
+            ("Mentionable", before.mentionable, after.mentionable),
+        ])
+        if before.permissions != after.permissions:
+            changes.append("Permissions: " + flag_diff(before.permissions, after.permissions, limit=DIFF_LIMIT // 2))
+        if not changes:
+            return  # position-only moves fire for every role below the moved one
+        moderator, why = await self.attribute(after.guild, after.id, "role_update")
+        queue_mod_action(after.guild, "role_update", moderator, after.guild.me,
+                         f"Role updated: {escape(after.name)}\n" + listing(changes, DIFF_LIMIT, sep="\n") + why)
 
 async def setup(bot):
     await bot.add_cog(Events(bot))
@@ -3,12 +3,11 @@ from discord.ext import commands, tasks
 from discord import app_commands
 
 import asyncio
-import json
 import time
 import random
-from utils import modutils
+from utils import modutils, storage
 
-GIVEAWAYS_FILE = "giveaways.json"
+GIVEAWAYS = storage.dataset("giveaways")
 
 class Giveaways(commands.Cog):
     def __init__(self, bot):
@@ -18,20 +17,9 @@ class Giveaways(commands.Cog):
     def cog_unload(self):
         self.check_giveaways.cancel()
 
-    def load_giveaways(self):
-        try:
-            with open(GIVEAWAYS_FILE, "r") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-
-    def save_giveaways(self, data):
-        with open(GIVEAWAYS_FILE, "w") as f:
-            json.dump(data, f, indent=4)
-
     @tasks.loop(seconds=30)
     async def check_giveaways(self):
-        data = self.load_giveaways()
+        data = await GIVEAWAYS.aall()
         ended = []
         for msg_id, g in data.items():
             if time.time() >= g["end_time"]:
@@ -49,8 +37,7 @@ class Giveaways(commands.Cog):
                         print(f"Error ending giveaway: {e}")
                 ended.append(msg_id)
         for msg_id in ended:
-            data.pop(msg_id)
-        self.save_giveaways(data)
+            await GIVEAWAYS.adelete(msg_id)
 
     @app_commands.command(name="start_giveaway", description="Start a giveaway")
     @app_commands.describe(
@@ -59,7 +46,7 @@ class Giveaways(commands.Cog):
         channel="Channel where to host the giveaway"
     )
     async def start_giveaway(self, interaction: discord.Interaction, duration: int, prize: str, channel: discord.TextChannel):
-        if not isinstance(interaction.user, discord.Member) or not modutils.is_mod_user(interaction.user):
+        if not isinstance(interaction.user, discord.Member) or not await modutils.is_mod_user(interaction.user):
             embed = discord.Embed(
                 title="❌ Permission Denied",
                 description="You don't have permission to start a giveaway.",
@@ -80,13 +67,11 @@ class Giveaways(commands.Cog):
         message = await channel.send(embed=embed)
         await message.add_reaction("🎉")
 
-        data = self.load_giveaways()
-        data[str(message.id)] = {
+        await GIVEAWAYS.aset(message.id, {
             "prize": prize,
             "channel_id": channel.id,
             "end_time": end_time
-        }
-        self.save_giveaways(data)
+        })
 
         confirm_embed = discord.Embed(
             title="✅ Giveaway Created",
@@ -98,7 +83,7 @@ class Giveaways(commands.Cog):
 
     @app_commands.command(name="end_giveaway", description="End a giveaway early")
     async def end_giveaway(self, interaction: discord.Interaction, message_id: str):
-        if not isinstance(interaction.user, discord.Member) or not modutils.is_mod_user(interaction.user):
+        if not isinstance(interaction.user, discord.Member) or not await modutils.is_mod_user(interaction.user):
             embed = discord.Embed(
                 title="❌ Permission Denied",
                 description="You don't have permission to end giveaways.",
@@ -107,8 +92,8 @@ class Giveaways(commands.Cog):
             )
             return await interaction.response.send_message(embed=embed, ephemeral=True)
 
-        data = self.load_giveaways()
-        if message_id not in data:
+        g = await GIVEAWAYS.aget(message_id)
+        if g is None:
             embed = discord.Embed(
                 title="❌ Not Found",
                 description="No giveaway found with that message ID.",
@@ -117,8 +102,7 @@ class Giveaways(commands.Cog):
             )
             return await interaction.response.send_message(embed=embed, ephemeral=True)
 
-        g = data.pop(message_id)
-        self.save_giveaways(data)
+        await GIVEAWAYS.adelete(message_id)
 
         channel = self.bot.get_channel(g["channel_id"])
         if channel:
@@ -154,7 +138,7 @@ class Giveaways(commands.Cog):
 
     @app_commands.command(name="cancel_giveaway", description="Cancel a giveaway without winner")
     async def cancel_giveaway(self, interaction: discord.Interaction, message_id: str):
-        if not isinstance(interaction.user, discord.Member) or not modutils.is_mod_user(interaction.user):
+        if not isinstance(interaction.user, discord.Member) or not await modutils.is_mod_user(interaction.user):
             embed = discord.Embed(
                 title="❌ Permission Denied",
                 description="You don't have permission to cancel giveaways.",
@@ -163,8 +147,8 @@ class Giveaways(commands.Cog):
             )
             return await interaction.response.send_message(embed=embed, ephemeral=True)
 
-        data = self.load_giveaways()
-        if message_id not in data:
+        g = await GIVEAWAYS.aget(message_id)
+        if g is None:
             embed = discord.Embed(
                 title="❌ Not Found",
                 description="No giveaway found with that message ID.",
@@ -173,8 +157,7 @@ class Giveaways(commands.Cog):
             )
             return await interaction.response.send_message(embed=embed, ephemeral=True)
 
-        g = data.pop(message_id)
-        self.save_giveaways(data)
+        await GIVEAWAYS.adelete(message_id)
 
         channel = self.bot.get_channel(g["channel_id"])
         if channel:
@@ -195,7 +178,7 @@ class Giveaways(commands.Cog):
 
     @app_commands.command(name="reroll_giveaway", description="Reroll a giveaway winner")
     async def reroll_giveaway(self, interaction: discord.Interaction, message_id: str):
-        if not isinstance(interaction.user, discord.Member) or not modutils.is_mod_user(interaction.user):
+        if not isinstance(interaction.user, discord.Member) or not await modutils.is_mod_user(interaction.user):
             embed = discord.Embed(
                 title="❌ Permission Denied",
                 description="You don't have permission to reroll giveaways.",
@@ -204,8 +187,7 @@ class Giveaways(commands.Cog):
             )
             return await interaction.response.send_message(embed=embed, ephemeral=True)
 
-        data = self.load_giveaways()
-        g = data.get(message_id)
+        g = await GIVEAWAYS.aget(message_id)
         if not g:
             embed = discord.Embed(
                 title="❌ Not Found",
@@ -0,0 +1,46 @@
+import discord
+from discord.ext import commands
+from typing import Optional
+
+from utils import aio, storage
+
+
+class Maintenance(commands.Cog):
+    """Owner-only upkeep of the bot's stored data."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.group(name="storage", invoke_without_command=True)
+    @commands.is_owner()
+    async def storage_group(self, ctx):
+        store = storage.get_store()
+        names = await aio.run(store.datasets)
+        embed = discord.Embed(title="🗄️ Storage", color=discord.Color.blurple())
+        embed.add_field(name="Backend", value=type(store).__name__, inline=False)
+        embed.add_field(
+            name="Datasets",
+            value="\n".join(f"`{name}` — {storage.codec_for(name)}" for name in names) or "None",
+            inline=False,
+        )
+        await ctx.send(embed=embed)
+
+    @storage_group.command(name="migrate")
+    @commands.is_owner()
+    async def storage_migrate(self, ctx, dataset: Optional[str] = None):
+        """Rewrite datasets in the codec configured by STORAGE_CODECS."""
+        names = [dataset] if dataset else await aio.run(storage.get_store().datasets)
+        lines = []
+        for name in names:
+            before, after = await storage.dataset(name).arecode()
+            lines.append(f"`{name}` → {storage.codec_for(name)}: {before / 1024:.1f} KB → {after / 1024:.1f} KB")
+        embed = discord.Embed(
+            title="✅ Storage migrated",
+            description="\n".join(lines) or "Nothing to migrate.",
+            color=discord.Color.green(),
+        )
+        await ctx.send(embed=embed)
+
+
+async def setup(bot):
+    await bot.add_cog(Maintenance(bot))
@@ -4,7 +4,7 @@ from discord.ext import commands
 from discord import app_commands
 from datetime import timedelta
 import datetime
-import json, os
+import os
 
 # Safe dynamic import of muterole.py for persistent Muted role logic
 import sys
@@ -16,45 +16,49 @@ if muterole_spec is None or muterole_spec.loader is None:
 muterole_mod = importlib.util.module_from_spec(muterole_spec)
 sys.modules["muterole"] = muterole_mod
 muterole_spec.loader.exec_module(muterole_mod)
-load_muteroles = muterole_mod.load_muteroles
+MUTEROLES = muterole_mod.MUTEROLES
 
 from typing import Optional
+from utils import storage
 from utils.modutils import is_mod_user, log_mod_action
 
 # Custom exception for mod check
 class NotModError(commands.CheckFailure):
     pass
 
-WARN_FILE = "data/warnings.json"
-if not os.path.exists(WARN_FILE):
-    with open(WARN_FILE, "w") as f:
-        json.dump({}, f)
+WARNINGS = storage.dataset("warnings")
+ACTIVE_MUTES = storage.dataset("active_mutes")
+
+# Changes go through aupdate so concurrent commands can't overwrite each other's edits
+async def add_warning(guild_id, member_id, reason):
+    def apply(data):
+        data.setdefault(str(member_id), []).append(reason)
+        return data
+    await WARNINGS.aupdate(guild_id, apply, {})
 
 class Moderation(commands.Cog):
-    def load_active_mutes(self):
-        import json, os
-        path = os.path.join(os.path.dirname(__file__), '..', 'data', 'active_mutes.json')
-        if not os.path.exists(path):
-            with open(path, 'w') as f:
-                json.dump({}, f)
-        with open(path, 'r') as f:
-            return json.load(f)
-
-    def save_active_mutes(self, mutes):
-        import json, os
-        path = os.path.join(os.path.dirname(__file__), '..', 'data', 'active_mutes.json')
-        with open(path, 'w') as f:
-            json.dump(mutes, f, indent=2)
+    async def set_active_mute(self, guild_id, member_id, info):
+        def apply(members):
+            members[str(member_id)] = info
+            return members
+        await ACTIVE_MUTES.aupdate(guild_id, apply, {})
+
+    async def clear_active_mutes(self, guild_id, member_ids):
+        def apply(members):
+            for member_id in member_ids:
+                members.pop(str(member_id), None)
+            return members or None
+        await ACTIVE_MUTES.aupdate(guild_id, apply, {})
 
     async def unmute_expired(self):
         import time
-        mutes = self.load_active_mutes()
-        changed = False
-        for guild_id, members in list(mutes.items()):
+        mutes = await ACTIVE_MUTES.aall()
+        for guild_id, members in mutes.items():
             guild = self.bot.get_guild(int(guild_id))
             if not guild:
                 continue
-            role = self.get_muted_role(guild)
+            role = await self.get_muted_role(guild)
+            expired = []
             for user_id, mute_info in list(members.items()):
                 if mute_info['until'] <= time.time():
                     member = guild.get_member(int(user_id))
@@ -64,12 +68,10 @@ class Moderation(commands.Cog):
                             await log_mod_action(guild, "unmute", member, member, "Mute duration expired.")
                         except Exception:
                             pass
-                    del mutes[guild_id][user_id]
-                    changed = True
-            if not mutes[guild_id]:
-                del mutes[guild_id]
-        if changed:
-            self.save_active_mutes(mutes)
+                    expired.append(user_id)
+            if expired:
+                # Only drop what expired; mutes added meanwhile are kept
+                await self.clear_active_mutes(guild_id, expired)
 
     async def mute_watcher(self):
         import asyncio
@@ -80,9 +82,8 @@ class Moderation(commands.Cog):
     async def cog_load(self):
         # Start mute watcher on cog load
         self.bot.loop.create_task(self.mute_watcher())
-    def get_muted_role(self, guild: discord.Guild):
-        data = load_muteroles()
-        role_id = data.get(str(guild.id))
+    async def get_muted_role(self, guild: discord.Guild):
+        role_id = await MUTEROLES.aget(guild.id)
         if role_id:
             return guild.get_role(role_id)
         return discord.utils.get(guild.roles, name="Muted")
@@ -93,7 +94,7 @@ class Moderation(commands.Cog):
     async def slash_ban(self, interaction: discord.Interaction, member: discord.Member, reason: Optional[str] = None):
         guild = interaction.guild
         moderator = interaction.user if isinstance(interaction.user, discord.Member) else None
-        if not guild or not moderator or not is_mod_user(moderator):
+        if not guild or not moderator or not await is_mod_user(moderator):
             return await interaction.response.send_message("❌ No permission", ephemeral=True)
         await member.ban(reason=reason)
         await log_mod_action(guild, "ban", moderator, member, reason)
@@ -111,7 +112,7 @@ class Moderation(commands.Cog):
     async def slash_unban(self, interaction: discord.Interaction, user: str):
         guild = interaction.guild
         moderator = interaction.user if isinstance(interaction.user, discord.Member) else None
-        if not guild or not moderator or not is_mod_user(moderator):
+        if not guild or not moderator or not await is_mod_user(moderator):
             return await interaction.response.send_message("❌ No permission", ephemeral=True)
         name, discrim = user.split("#")
         async for entry in guild.bans():
@@ -140,15 +141,9 @@ class Moderation(commands.Cog):
     async def slash_warn(self, interaction: discord.Interaction, member: discord.Member, reason: Optional[str] = None):
         guild = interaction.guild
         moderator = interaction.user if isinstance(interaction.user, discord.Member) else None
-        if not guild or not moderator or not is_mod_user(moderator):
+        if not guild or not moderator or not await is_mod_user(moderator):
             return await interaction.response.send_message("❌ No permission", ephemeral=True)
-        guild_id = str(guild.id)
-        who = str(member.id)
-        with open(WARN_FILE, "r") as f:
-            data = json.load(f)
-        data.setdefault(guild_id, {}).setdefault(who, []).append(reason or "No reason")
-        with open(WARN_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        await add_warning(guild.id, member.id, reason or "No reason")
         await log_mod_action(guild, "warn", moderator, member, reason)
         embed = discord.Embed(
             title="⚠️ Member Warned",
@@ -165,9 +160,8 @@ class Moderation(commands.Cog):
         guild = interaction.guild
         if not guild:
             return await interaction.response.send_message("❌ No permission", ephemeral=True)
-        with open(WARN_FILE, "r") as f:
-            data = json.load(f)
-        warnings = data.get(str(guild.id), {}).get(str(member.id), [])
+        data = await WARNINGS.aget(guild.id, {})
+        warnings = data.get(str(member.id), [])
         msg = "\n".join(warnings) if warnings else "No warnings."
         embed = discord.Embed(
             title="📋 Warnings",
@@ -202,17 +196,15 @@ class Moderation(commands.Cog):
     async def slash_mute(self, interaction: discord.Interaction, member: discord.Member, reason: Optional[str] = None):
         guild = interaction.guild
         moderator = interaction.user if isinstance(interaction.user, discord.Member) else None
-        if not guild or not moderator or not is_mod_user(moderator):
+        if not guild or not moderator or not await is_mod_user(moderator):
             return await interaction.response.send_message("❌ No permission", ephemeral=True)
-        role = self.get_muted_role(guild)
+        role = await self.get_muted_role(guild)
         if not role:
             role = await guild.create_role(name="Muted")
             for ch in guild.channels:
                 await ch.set_permissions(role, send_messages=False, speak=False)
             # Save to persistent storage
-            data = load_muteroles()
-            data[str(guild.id)] = role.id
-            muterole_mod.save_muteroles(data)
+            await MUTEROLES.aset(guild.id, role.id)
         await member.add_roles(role, reason=reason)
         await log_mod_action(guild, "mute", moderator, member, reason)
         embed = discord.Embed(
@@ -229,9 +221,9 @@ class Moderation(commands.Cog):
     async def slash_unmute(self, interaction: discord.Interaction, member: discord.Member):
         guild = interaction.guild
         moderator = interaction.user if isinstance(interaction.user, discord.Member) else None
-        if not guild or not moderator or not is_mod_user(moderator):
+        if not guild or not moderator or not await is_mod_user(moderator):
             return await interaction.response.send_message("❌ No permission", ephemeral=True)
-        role = self.get_muted_role(guild)
+        role = await self.get_muted_role(guild)
         if role:
             await member.remove_roles(role)
         await log_mod_action(guild, "unmute", moderator, member)
@@ -306,7 +298,7 @@ class Moderation(commands.Cog):
     async def slash_timeout(self, interaction: discord.Interaction, member: discord.Member, seconds: int, reason: Optional[str] = "No reason"):
         guild = interaction.guild
         moderator = interaction.user if isinstance(interaction.user, discord.Member) else None
-        if not guild or not moderator or not is_mod_user(moderator):
+        if not guild or not moderator or not await is_mod_user(moderator):
             return await interaction.response.send_message("❌ No permission", ephemeral=True)
         until = discord.utils.utcnow() + timedelta(seconds=seconds)
         await member.edit(timed_out_until=until, reason=reason)
@@ -325,7 +317,7 @@ class Moderation(commands.Cog):
     async def slash_untimeout(self, interaction: discord.Interaction, member: discord.Member):
         guild = interaction.guild
         moderator = interaction.user if isinstance(interaction.user, discord.Member) else None
-        if not guild or not moderator or not is_mod_user(moderator):
+        if not guild or not moderator or not await is_mod_user(moderator):
             return await interaction.response.send_message("❌ No permission", ephemeral=True)
         await member.edit(timed_out_until=None)
         await log_mod_action(guild, "untimeout", moderator, member)
@@ -343,7 +335,7 @@ class Moderation(commands.Cog):
     async def slash_nickname(self, interaction: discord.Interaction, member: discord.Member, nickname: Optional[str] = None):
         guild = interaction.guild
         moderator = interaction.user if isinstance(interaction.user, discord.Member) else None
-        if not guild or not moderator or not is_mod_user(moderator):
+        if not guild or not moderator or not await is_mod_user(moderator):
             return await interaction.response.send_message("❌ No permission", ephemeral=True)
         await member.edit(nick=nickname)
         await log_mod_action(guild, "nickname", moderator, member, nickname)
@@ -361,7 +353,7 @@ class Moderation(commands.Cog):
     async def slash_roleadd(self, interaction: discord.Interaction, member: discord.Member, role: discord.Role):
         guild = interaction.guild
         moderator = interaction.user if isinstance(interaction.user, discord.Member) else None
-        if not guild or not moderator or not is_mod_user(moderator):
+        if not guild or not moderator or not await is_mod_user(moderator):
             return await interaction.response.send_message("❌ No permission", ephemeral=True)
         await member.add_roles(role)
         await log_mod_action(guild, "roleadd", moderator, member, role.name)
@@ -379,7 +371,7 @@ class Moderation(commands.Cog):
     async def slash_roleremove(self, interaction: discord.Interaction, member: discord.Member, role: discord.Role):
         guild = interaction.guild
         moderator = interaction.user if isinstance(interaction.user, discord.Member) else None
-        if not guild or not moderator or not is_mod_user(moderator):
+        if not guild or not moderator or not await is_mod_user(moderator):
             return await interaction.response.send_message("❌ No permission", ephemeral=True)
         await member.remove_roles(role)
         await log_mod_action(guild, "roleremove", moderator, member, role.name)
@@ -397,8 +389,8 @@ class Moderation(commands.Cog):
 
     @staticmethod
     def mod_check():
-        def predicate(ctx):
-            if not is_mod_user(ctx.author):
+        async def predicate(ctx):
+            if not await is_mod_user(ctx.author):
                 raise NotModError()
             return True
         return commands.check(predicate)
@@ -500,13 +492,7 @@ class Moderation(commands.Cog):
         if not resolved:
             await ctx.send("❌ Could not resolve member.")
             return
-        with open(WARN_FILE, "r") as f:
-            data = json.load(f)
-        guild = str(ctx.guild.id)
-        who = str(resolved.id)
-        data.setdefault(guild, {}).setdefault(who, []).append(reason or "No reason")
-        with open(WARN_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        await add_warning(ctx.guild.id, resolved.id, reason or "No reason")
 
         await log_mod_action(ctx.guild, "warn", ctx.author, resolved, reason)
         embed = discord.Embed(
@@ -521,9 +507,8 @@ class Moderation(commands.Cog):
     @commands.command()
     @mod_check()
     async def warnings(self, ctx, member: discord.Member):
-        with open(WARN_FILE, "r") as f:
-            data = json.load(f)
-        warnings = data.get(str(ctx.guild.id), {}).get(str(member.id), [])
+        data = await WARNINGS.aget(ctx.guild.id, {})
+        warnings = data.get(str(member.id), [])
         msg = "\n".join(warnings) if warnings else "No warnings."
         embed = discord.Embed(
             title="📋 Warnings",
@@ -557,15 +542,13 @@ class Moderation(commands.Cog):
         Mute a member for a duration (e.g., 1d, 2h, 30m). If no duration, mute is indefinite.
         """
         import re, time
-        role = self.get_muted_role(ctx.guild)
+        role = await self.get_muted_role(ctx.guild)
         if not role:
             role = await ctx.guild.create_role(name="Muted")
             for ch in ctx.guild.channels:
                 await ch.set_permissions(role, send_messages=False, speak=False)
             # Save to persistent storage
-            data = load_muteroles()
-            data[str(ctx.guild.id)] = role.id
-            muterole_mod.save_muteroles(data)
+            await MUTEROLES.aset(ctx.guild.id, role.id)
         await member.add_roles(role, reason=reason)
         await log_mod_action(ctx.guild, "mute", ctx.author, member, reason)
         desc = f"{member.mention} was muted."
@@ -596,19 +579,13 @@ class Moderation(commands.Cog):
                 elif unit == 's':
                     seconds += amount
             if seconds > 0:
-                mutes = self.load_active_mutes()
-                guild_id = str(ctx.guild.id)
-                user_id = str(member.id)
                 until = time.time() + seconds
-                if guild_id not in mutes:
-                    mutes[guild_id] = {}
-                mutes[guild_id][user_id] = {"until": until, "reason": reason or "Mute duration"}
-                self.save_active_mutes(mutes)
+                await self.set_active_mute(ctx.guild.id, member.id, {"until": until, "reason": reason or "Mute duration"})
 
     @commands.command()
     @mod_check()
     async def unmute(self, ctx, member: discord.Member):
-        role = self.get_muted_role(ctx.guild)
+        role = await self.get_muted_role(ctx.guild)
         if role:
             await member.remove_roles(role)
         await log_mod_action(ctx.guild, "unmute", ctx.author, member)
@@ -621,17 +598,7 @@ class Moderation(commands.Cog):
         embed.set_footer(text=f"Action by {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url if hasattr(ctx.author, 'display_avatar') else ctx.author.avatar.url if ctx.author.avatar else None)
         await ctx.send(embed=embed)
         # Remove from persistent mutes if present
-        mutes = self.load_active_mutes()
-        guild_id = str(ctx.guild.id)
-        user_id = str(member.id)
-        changed = False
-        if guild_id in mutes and user_id in mutes[guild_id]:
-            del mutes[guild_id][user_id]
-            if not mutes[guild_id]:
-                del mutes[guild_id]
-            changed = True
-        if changed:
-            self.save_active_mutes(mutes)
+        await self.clear_active_mutes(ctx.guild.id, [member.id])
 
     @commands.command()
     @mod_check()
@@ -693,7 +660,7 @@ class Moderation(commands.Cog):
     @commands.command(name="unmute_member")
     @mod_check()
     async def unmute_member(self, ctx, member: discord.Member):
-        role = self.get_muted_role(ctx.guild)
+        role = await self.get_muted_role(ctx.guild)
         if role:
             await member.remove_roles(role)
         await log_mod_action(ctx.guild, "unmute", ctx.author, member)
@@ -754,7 +721,7 @@ class Moderation(commands.Cog):
     @app_commands.checks.has_permissions(kick_members=True)
     async def slash_kick(self, interaction: discord.Interaction, member: discord.Member, reason: Optional[str] = None):
         guild = interaction.guild
-        if not guild or not isinstance(interaction.user, discord.Member) or not is_mod_user(interaction.user):
+        if not guild or not isinstance(interaction.user, discord.Member) or not await is_mod_user(interaction.user):
             return await interaction.response.send_message("❌ No permission", ephemeral=True)
         await member.kick(reason=reason)
         await log_mod_action(guild, "kick", interaction.user, member, reason)
@@ -1,31 +1,17 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from utils import modutils
+from utils import modutils, storage
 from discord.utils import get
 import datetime
-import json
-import os
 
-MUTEROLE_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'muteroles.json')
-
-def load_muteroles():
-    if not os.path.exists(MUTEROLE_FILE):
-        with open(MUTEROLE_FILE, 'w') as f:
-            json.dump({}, f)
-    with open(MUTEROLE_FILE, 'r') as f:
-        return json.load(f)
-
-def save_muteroles(data):
-    with open(MUTEROLE_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+MUTEROLES = storage.dataset("muteroles")
 
 
 class MuteRole(commands.Cog):
 
-    def get_muted_role(self, guild: discord.Guild):
-        data = load_muteroles()
-        role_id = data.get(str(guild.id))
+    async def get_muted_role(self, guild: discord.Guild):
+        role_id = await MUTEROLES.aget(guild.id)
         if role_id:
             return guild.get_role(role_id)
         return discord.utils.get(guild.roles, name="Muted")
@@ -41,15 +27,13 @@ class MuteRole(commands.Cog):
         guild = ctx.guild
         if not guild:
             return await ctx.send("This command can only be used in a server.")
-        data = load_muteroles()
-        existing = self.get_muted_role(guild)
+        existing = await self.get_muted_role(guild)
         if existing:
             return await ctx.send(f"A Muted role already exists: {existing.mention}")
         muted_role = await guild.create_role(name="Muted", reason="Mute role setup")
         for channel in guild.channels:
             await channel.set_permissions(muted_role, send_messages=False, speak=False, add_reactions=False)
-        data[str(guild.id)] = muted_role.id
-        save_muteroles(data)
+        await MUTEROLES.aset(guild.id, muted_role.id)
         await ctx.send(f"✅ Created Muted role: {muted_role.mention}, set permissions, and saved persistently.")
 
     @muterole_group.command(name="set")
@@ -58,9 +42,7 @@ class MuteRole(commands.Cog):
         guild = ctx.guild
         if not guild:
             return await ctx.send("This command can only be used in a server.")
-        data = load_muteroles()
-        data[str(guild.id)] = role.id
-        save_muteroles(data)
+        await MUTEROLES.aset(guild.id, role.id)
         await ctx.send(f"✅ Set {role.mention} as the Muted role and saved persistently.")
 
     @muterole_group.command(name="info")
@@ -69,7 +51,7 @@ class MuteRole(commands.Cog):
         guild = ctx.guild
         if not guild:
             return await ctx.send("This command can only be used in a server.")
-        muted_role = self.get_muted_role(guild)
+        muted_role = await self.get_muted_role(guild)
         if not muted_role:
             return await ctx.send("No Muted role found.")
         perms = muted_role.permissions
@@ -81,15 +63,13 @@ class MuteRole(commands.Cog):
         guild = interaction.guild
         if not guild:
             return await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
-        data = load_muteroles()
-        existing = self.get_muted_role(guild)
+        existing = await self.get_muted_role(guild)
         if existing:
             return await interaction.response.send_message(f"A Muted role already exists: {existing.mention}", ephemeral=True)
         muted_role = await guild.create_role(name="Muted", reason="Mute role setup")
         for channel in guild.channels:
             await channel.set_permissions(muted_role, send_messages=False, speak=False, add_reactions=False)
-        data[str(guild.id)] = muted_role.id
-        save_muteroles(data)
+        await MUTEROLES.aset(guild.id, muted_role.id)
         await interaction.response.send_message(f"✅ Created Muted role: {muted_role.mention}, set permissions, and saved persistently.", ephemeral=True)
 
     @app_commands.command(name="muterole_set", description="Set an existing role as the Muted role.")
@@ -97,9 +77,7 @@ class MuteRole(commands.Cog):
         guild = interaction.guild
         if not guild:
             return await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
-        data = load_muteroles()
-        data[str(guild.id)] = role.id
-        save_muteroles(data)
+        await MUTEROLES.aset(guild.id, role.id)
         await interaction.response.send_message(f"✅ Set {role.mention} as the Muted role and saved persistently.", ephemeral=True)
 
     @app_commands.command(name="muterole_info", description="Show info about the current Muted role.")
@@ -107,7 +85,7 @@ class MuteRole(commands.Cog):
         guild = interaction.guild
         if not guild:
             return await interaction.response.send_message("This command can only be used in a server.", ephemeral=True)
-        muted_role = self.get_muted_role(guild)
+        muted_role = await self.get_muted_role(guild)
         if not muted_role:
             return await interaction.response.send_message("No Muted role found.", ephemeral=True)
         perms = muted_role.permissions
@@ -1,27 +1,17 @@
 
 import discord
 from discord.ext import commands
-import json
-import os
 import typing
+from utils import storage
 
 
 
-PREFIX_FILE = "data/prefixes.json"
-NOPREFIX_FILE = "data/noprefix.json"
+PREFIXES = storage.dataset("prefixes")
+NOPREFIX = storage.dataset("noprefix")
 DEFAULT_PREFIX = "!"
 
-try:
-    with open(PREFIX_FILE, "r") as f:
-        prefix_db = json.load(f)
-except Exception:
-    prefix_db = {}
-
-try:
-    with open(NOPREFIX_FILE, "r") as f:
-        no_prefix_users = json.load(f)
-except Exception:
-    no_prefix_users = []
+prefix_db = PREFIXES.all()
+no_prefix_users = [int(user_id) for user_id in NOPREFIX.all()]
 
 
 def get_prefix(bot, message):
@@ -42,9 +32,7 @@ class Prefix(commands.Cog):
     async def setprefix(self, ctx, prefix: str):
         guild_id = str(ctx.guild.id)
         prefix_db[guild_id] = prefix
-
-        with open(PREFIX_FILE, "w") as f:
-            json.dump(prefix_db, f, indent=2)
+        await PREFIXES.aset(guild_id, prefix)
 
         embed = discord.Embed(
             title="✅ Prefix Set",
@@ -99,6 +87,7 @@ class Prefix(commands.Cog):
                 await ctx.send(embed=embed)
                 return
             no_prefix_users.append(resolved.id)
+            await NOPREFIX.aset(resolved.id, True)
         else:
             if resolved.id not in no_prefix_users:
                 embed = discord.Embed(
@@ -110,16 +99,14 @@ class Prefix(commands.Cog):
                 await ctx.send(embed=embed)
                 return
             no_prefix_users.remove(resolved.id)
+            await NOPREFIX.adelete(resolved.id)
 
-        with open(NOPREFIX_FILE, "w") as f:
-            json.dump(no_prefix_users, f, indent=2)
-
-            embed = discord.Embed(
-                title=f"✅ {action.title()}ed No-Prefix List",
-                description=f"{resolved.mention} has been {action}ed to the no-prefix list.",
-                color=discord.Color.green(),
-                timestamp=discord.utils.utcnow()
-            )
+        embed = discord.Embed(
+            title=f"✅ {action.title()}ed No-Prefix List",
+            description=f"{resolved.mention} has been {action}ed to the no-prefix list.",
+            color=discord.Color.green(),
+            timestamp=discord.utils.utcnow()
+        )
         embed.set_footer(text=f"Requested by {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url if hasattr(ctx.author, 'display_avatar') else ctx.author.avatar.url if ctx.author.avatar else None)
         await ctx.send(embed=embed)
 
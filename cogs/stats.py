@@ -2,22 +2,32 @@ import discord
 from discord.ext import commands, tasks
 from datetime import datetime, timedelta
 
-import json, os
+import asyncio
+import copy
 import typing
+import os
 from collections import defaultdict
+from utils import aio, storage
+from utils.shards import ShardCache, estimate_size
+from utils.wal import WriteAheadLog
 
-STATS_FILE = "data/stats.json"
-
-def load_stats():
-    if not os.path.exists(STATS_FILE):
-        with open(STATS_FILE, "w") as f:
-            json.dump({}, f)
-    with open(STATS_FILE, "r") as f:
-        return json.load(f)
-
-def save_stats(data):
-    with open(STATS_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+STATS = storage.dataset("stats")
+IGNORED_CHANNELS = storage.dataset("stats_ignored")
+# Guild shards are loaded on first use and the least recently used ones are
+# dropped from memory once the resident total goes over this budget.
+STATS_MEMORY_BUDGET = int(float(os.getenv("STATS_MEMORY_BUDGET_MB", "64")) * 1024 * 1024)
+# Counter changes are fsynced to the write-ahead log every STATS_WAL_INTERVAL
+# seconds; full shards are written and the log truncated every snapshot.
+STATS_WAL_FILE = "data/stats.wal"
+STATS_WAL_INTERVAL = float(os.getenv("STATS_WAL_INTERVAL", "2"))
+STATS_SNAPSHOT_MINUTES = float(os.getenv("STATS_SNAPSHOT_MINUTES", "5"))
+# Retention for period buckets. Expired daily buckets are rolled into their
+# monthly total before being dropped; 0 keeps a period forever.
+STATS_KEEP_DAILY_DAYS = int(os.getenv("STATS_KEEP_DAILY_DAYS", "35"))
+STATS_KEEP_WEEKLY_WEEKS = int(os.getenv("STATS_KEEP_WEEKLY_WEEKS", "12"))
+STATS_KEEP_MONTHLY_MONTHS = int(os.getenv("STATS_KEEP_MONTHLY_MONTHS", "0"))
+STATS_COMPACT_HOURS = float(os.getenv("STATS_COMPACT_HOURS", "24"))
+STATS_COMPACT_DELAY_MINUTES = float(os.getenv("STATS_COMPACT_DELAY_MINUTES", "10"))  # after startup
 
 def get_period_key(period):
     now = datetime.utcnow()
@@ -30,20 +40,72 @@ def get_period_key(period):
     else:
         return "all"
 
+def _bucket_start(period, key):
+    try:
+        if period == "daily":
+            return datetime.strptime(key, "%Y-%m-%d")
+        if period == "weekly":
+            return datetime.strptime(key + "-0", "%Y-W%U-%w")
+        if period == "monthly":
+            return datetime.strptime(key, "%Y-%m")
+    except ValueError:
+        pass
+    return None
+
+def _month_index(dt):
+    return dt.year * 12 + dt.month - 1
+
+def compact_buckets(buckets, now):
+    """Roll up and expire one ``{period: {key: value}}`` mapping. Returns keys removed."""
+    removed = 0
+    daily = buckets.get("daily")
+    if daily and STATS_KEEP_DAILY_DAYS:
+        cutoff = now - timedelta(days=STATS_KEEP_DAILY_DAYS)
+        expired = [k for k in daily if (_bucket_start("daily", k) or now) < cutoff]
+        if expired:
+            monthly = buckets.setdefault("monthly", {})
+            sums = {}
+            for key, value in daily.items():
+                sums[key[:7]] = sums.get(key[:7], 0) + value
+            for key in expired:
+                month = key[:7]
+                monthly[month] = max(monthly.get(month, 0), sums[month])
+                del daily[key]
+            removed += len(expired)
+    weekly = buckets.get("weekly")
+    if weekly and STATS_KEEP_WEEKLY_WEEKS:
+        cutoff = now - timedelta(weeks=STATS_KEEP_WEEKLY_WEEKS)
+        expired = [k for k in weekly if (_bucket_start("weekly", k) or now) < cutoff]
+        for key in expired:
+            del weekly[key]
+        removed += len(expired)
+    monthly = buckets.get("monthly")
+    if monthly and STATS_KEEP_MONTHLY_MONTHS:
+        cutoff = _month_index(now) - STATS_KEEP_MONTHLY_MONTHS
+        expired = [k for k in monthly if _month_index(_bucket_start("monthly", k) or now) < cutoff]
+        for key in expired:
+            del monthly[key]
+        removed += len(expired)
+    return removed
+
+def compact_guild_stats(gstats, now=None):
+    """Apply the retention policy to every counter in one guild's stats."""
+    now = now or datetime.utcnow()
+    removed = 0
+    for owner, data in gstats.items():
+        # owner is a user id, or "channels" for the per-channel totals
+        for stat, value in data.items():
+            if stat in ("channels", "vc_channels") or owner == "channels":
+                for buckets in value.values():
+                    removed += compact_buckets(buckets, now)
+            else:
+                removed += compact_buckets(value, now)
+    return removed
+
 class Stats(commands.Cog):
 
     def load_ignored_channels(self):
-        ignore_file = "data/ignored_channels.json"
-        if os.path.exists(ignore_file):
-            with open(ignore_file, "r") as f:
-                self.ignored_channels = set(json.load(f))
-        else:
-            self.ignored_channels = set()
-
-    def save_ignored_channels(self):
-        ignore_file = "data/ignored_channels.json"
-        with open(ignore_file, "w") as f:
-            json.dump(list(self.ignored_channels), f, indent=2)
+        self.ignored_channels = set(IGNORED_CHANNELS.all())
 
     # --- Ignore Channel Commands ---
 
@@ -53,7 +115,7 @@ class Stats(commands.Cog):
     async def ignore_channel(self, ctx, channel: typing.Optional[discord.TextChannel] = None):
         channel = channel or ctx.channel
         self.ignored_channels.add(str(channel.id))
-        self.save_ignored_channels()
+        await IGNORED_CHANNELS.aset(channel.id, True)
         await ctx.send(f"✅ Channel {channel.mention} is now ignored in stats.")
 
     @commands.command(name="unignore_channel")
@@ -61,7 +123,7 @@ class Stats(commands.Cog):
     async def unignore_channel(self, ctx, channel: typing.Optional[discord.TextChannel] = None):
         channel = channel or ctx.channel
         self.ignored_channels.discard(str(channel.id))
-        self.save_ignored_channels()
+        await IGNORED_CHANNELS.adelete(channel.id)
         await ctx.send(f"✅ Channel {channel.mention} is no longer ignored in stats.")
 
     # --- Leaderboard Commands ---
@@ -72,7 +134,7 @@ class Stats(commands.Cog):
     @leaderboard.command(name="messages")
     async def leaderboard_messages(self, ctx, period: str = "all"):
         guild_id = str(ctx.guild.id)
-        gstats = self.stats_data.get(guild_id, {})
+        gstats = await self.shards.get(guild_id)
         leaderboard = []
         key = get_period_key(period)
         for user_id, udata in gstats.items():
@@ -91,7 +153,7 @@ class Stats(commands.Cog):
     @leaderboard.command(name="vc")
     async def leaderboard_vc(self, ctx, period: str = "all"):
         guild_id = str(ctx.guild.id)
-        gstats = self.stats_data.get(guild_id, {})
+        gstats = await self.shards.get(guild_id)
         leaderboard = []
         key = get_period_key(period)
         for user_id, udata in gstats.items():
@@ -109,19 +171,167 @@ class Stats(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.stats_data = load_stats()
+        self.shards = ShardCache(STATS, STATS_MEMORY_BUDGET, on_evict=self.keep_deltas)
+        self.wal = WriteAheadLog(STATS_WAL_FILE)
+        self.wal_lock = asyncio.Lock()
+        self.pending = set()  # (guild_id, path) counters changed since the last WAL write
+        self.evicted = {}  # guild_id -> [[*path, value]] of pending counters captured at eviction
         self.voice_sessions = {}  # user_id: (channel_id, join_time)
         self.ignored_channels = set()
         self.load_ignored_channels()
+
+    async def cog_load(self):
+        await self.replay_wal()
+        self.wal_task.start()
         self.save_task.start()
+        self.compact_task.start()
 
-    def cog_unload(self):
+    async def cog_unload(self):
+        self.wal_task.cancel()
         self.save_task.cancel()
-        save_stats(self.stats_data)
+        self.compact_task.cancel()
+        await self.snapshot()
+
+    def bump(self, guild_id, gstats, path, amount):
+        node = gstats
+        for part in path[:-1]:
+            node = node.setdefault(part, {})
+        node[path[-1]] = node.get(path[-1], 0) + amount
+        self.pending.add((guild_id, path))
+        self.shards.mark_dirty(guild_id)
+
+    @staticmethod
+    def counter(gstats, path):
+        node = gstats
+        for part in path:
+            node = node.get(part) if isinstance(node, dict) else None
+        return node
+
+    def keep_deltas(self, guild_id, gstats):
+        # An evicted shard may only have reached the write-behind buffer, so its
+        # pending counters still go to the WAL; the log is truncated only after
+        # the backend flush in snapshot().
+        mine = [p for p in self.pending if p[0] == guild_id]
+        if not mine:
+            return
+        self.pending.difference_update(mine)
+        sets = self.evicted.setdefault(guild_id, [])
+        for _, path in mine:
+            value = self.counter(gstats, path)
+            if value is not None:
+                sets.append([*path, value])
+
+    async def write_deltas(self):
+        # Logs the current value of every counter touched since the last
+        # write, so replaying the log more than once is harmless.
+        pending, self.pending = self.pending, set()
+        evicted, self.evicted = self.evicted, {}
+        # Values captured at eviction go first, so a shard reloaded since then replays its newer counts last
+        changes = {gid: list(sets) for gid, sets in evicted.items()}
+        for guild_id, path in pending:
+            node = self.counter(self.shards.peek(guild_id), path)
+            if node is not None:
+                changes.setdefault(guild_id, []).append([*path, node])
+        if changes:
+            try:
+                await self.wal.aappend({"g": gid, "set": sets} for gid, sets in changes.items())
+            except Exception:
+                self.pending |= pending
+                for gid, sets in evicted.items():
+                    self.evicted[gid] = sets + self.evicted.get(gid, [])
+                raise
 
-    @tasks.loop(minutes=5)
+    async def snapshot(self):
+        async with self.wal_lock:
+            await self.write_deltas()
+            await self.shards.flush()
+            await STATS.aflush()
+            await self.wal.atruncate()
+
+    async def replay_wal(self):
+        records = await self.wal.areplay()
+        for record in records:
+            gstats = await self.shards.get(record["g"])
+            for *path, value in record["set"]:
+                node = gstats
+                for part in path[:-1]:
+                    node = node.setdefault(part, {})
+                node[path[-1]] = value
+            self.shards.mark_dirty(record["g"])
+        if records:
+            print(f"[Stats] Replayed {len(records)} write-ahead log record(s)")
+        await self.snapshot()
+
+    @tasks.loop(seconds=STATS_WAL_INTERVAL)
+    async def wal_task(self):
+        async with self.wal_lock:
+            await self.write_deltas()
+
+    @tasks.loop(minutes=STATS_SNAPSHOT_MINUTES)
     async def save_task(self):
-        save_stats(self.stats_data)
+        try:
+            await self.snapshot()
+        except Exception as e:
+            # Dirty shards stay dirty and the WAL isn't truncated; the next snapshot retries
+            print(f"[Stats] Snapshot failed: {e!r}")
+
+    async def compact_guild(self, guild_id):
+        """Compact a guild's stats in memory if its shard is loaded, otherwise in storage."""
+        guild_id = str(guild_id)
+        gstats = self.shards.peek(guild_id)
+        if gstats is None:
+            return await self.compact_stored(guild_id)
+        # Nothing is awaited between compacting and marking dirty, so eviction can't drop the result
+        before = self.shards.size(guild_id)
+        removed = compact_guild_stats(gstats)
+        if not removed:
+            return 0, 0
+        self.shards.mark_dirty(guild_id)
+        # Measure a copy; listeners keep changing the live shard meanwhile
+        after = await aio.run(estimate_size, copy.deepcopy(gstats))
+        return removed, max(0, before - after)
+
+    async def compact_stored(self, guild_id):
+        """Compact a stored shard without loading it into the cache."""
+        now = datetime.utcnow()
+        stored = await STATS.aget(guild_id)
+        if not stored:
+            return 0, 0
+
+        def measure():
+            before = estimate_size(stored)
+            removed = compact_guild_stats(stored, now)
+            return removed, before - estimate_size(stored)
+
+        removed, freed = await aio.run(measure)
+        if not removed:
+            return 0, 0
+        if self.shards.peek(guild_id) is not None:
+            # Loaded while we read it; the resident copy is the one that gets written
+            return await self.compact_guild(guild_id)
+
+        def apply(gstats):
+            compact_guild_stats(gstats, now)
+            return gstats
+
+        await STATS.aupdate(guild_id, apply, {})
+        return removed, freed
+
+    @tasks.loop(hours=STATS_COMPACT_HOURS)
+    async def compact_task(self):
+        keys = bytes_freed = 0
+        for guild_id in await STATS.akeys():
+            removed, freed = await self.compact_guild(guild_id)
+            keys += removed
+            bytes_freed += freed
+        if keys:
+            print(f"[Stats] Compaction removed {keys} bucket(s), reclaimed {bytes_freed} bytes")
+
+    @compact_task.before_loop
+    async def before_compact(self):
+        await self.bot.wait_until_ready()
+        # Leave startup (WAL replay, shard loads) alone before the first pass
+        await asyncio.sleep(STATS_COMPACT_DELAY_MINUTES * 60)
 
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -134,15 +344,13 @@ class Stats(commands.Cog):
         if channel_id in self.ignored_channels:
             return
         now = datetime.utcnow()
+        gstats = await self.shards.get(guild_id)
         for period in ["daily", "weekly", "monthly", "all"]:
             key = get_period_key(period)
-            self.stats_data.setdefault(guild_id, {}).setdefault(user_id, {}).setdefault("messages", {}).setdefault(period, {}).setdefault(key, 0)
-            self.stats_data[guild_id][user_id]["messages"][period][key] += 1
-            self.stats_data[guild_id][user_id].setdefault("channels", {}).setdefault(channel_id, {}).setdefault(period, {}).setdefault(key, 0)
-            self.stats_data[guild_id][user_id]["channels"][channel_id][period][key] += 1
+            self.bump(guild_id, gstats, (user_id, "messages", period, key), 1)
+            self.bump(guild_id, gstats, (user_id, "channels", channel_id, period, key), 1)
             # Per-channel stats
-            self.stats_data.setdefault(guild_id, {}).setdefault("channels", {}).setdefault(channel_id, {}).setdefault("messages", {}).setdefault(period, {}).setdefault(key, 0)
-            self.stats_data[guild_id]["channels"][channel_id]["messages"][period][key] += 1
+            self.bump(guild_id, gstats, ("channels", channel_id, "messages", period, key), 1)
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
@@ -164,15 +372,13 @@ class Stats(commands.Cog):
             if user_id in self.voice_sessions:
                 join_channel, join_time = self.voice_sessions.pop(user_id)
                 duration = (now - join_time).total_seconds()
+                gstats = await self.shards.get(guild_id)
                 for period in ["daily", "weekly", "monthly", "all"]:
                     key = get_period_key(period)
-                    self.stats_data.setdefault(guild_id, {}).setdefault(user_id, {}).setdefault("vc_time", {}).setdefault(period, {}).setdefault(key, 0)
-                    self.stats_data[guild_id][user_id]["vc_time"][period][key] += duration
-                    self.stats_data[guild_id][user_id].setdefault("vc_channels", {}).setdefault(str(join_channel), {}).setdefault(period, {}).setdefault(key, 0)
-                    self.stats_data[guild_id][user_id]["vc_channels"][str(join_channel)][period][key] += duration
+                    self.bump(guild_id, gstats, (user_id, "vc_time", period, key), duration)
+                    self.bump(guild_id, gstats, (user_id, "vc_channels", str(join_channel), period, key), duration)
                     # Per-channel stats
-                    self.stats_data.setdefault(guild_id, {}).setdefault("channels", {}).setdefault(str(join_channel), {}).setdefault("vc_time", {}).setdefault(period, {}).setdefault(key, 0)
-                    self.stats_data[guild_id]["channels"][str(join_channel)]["vc_time"][period][key] += duration
+                    self.bump(guild_id, gstats, ("channels", str(join_channel), "vc_time", period, key), duration)
 
     # --- Commands ---
     @commands.group(invoke_without_command=True)
@@ -191,7 +397,7 @@ class Stats(commands.Cog):
     async def me(self, ctx):
         user_id = str(ctx.author.id)
         guild_id = str(ctx.guild.id)
-        user_stats = self.stats_data.get(guild_id, {}).get(user_id, {})
+        user_stats = (await self.shards.get(guild_id)).get(user_id, {})
         embed = discord.Embed(title=f"📈 Stats for {ctx.author.display_name}", color=discord.Color.green())
         for period in ["daily", "weekly", "monthly", "all"]:
             key = get_period_key(period)
@@ -218,7 +424,7 @@ class Stats(commands.Cog):
             return
         user_id = str(resolved.id)
         guild_id = str(ctx.guild.id)
-        user_stats = self.stats_data.get(guild_id, {}).get(user_id, {})
+        user_stats = (await self.shards.get(guild_id)).get(user_id, {})
         display_name = resolved.display_name if hasattr(resolved, 'display_name') else str(resolved)
         embed = discord.Embed(title=f"📈 Stats for {display_name}", color=discord.Color.green())
         for period in ["daily", "weekly", "monthly", "all"]:
@@ -234,7 +440,7 @@ class Stats(commands.Cog):
         channel = channel or ctx.channel
         channel_id = str(channel.id)
         guild_id = str(ctx.guild.id)
-        ch_stats = self.stats_data.get(guild_id, {}).get("channels", {}).get(channel_id, {})
+        ch_stats = (await self.shards.get(guild_id)).get("channels", {}).get(channel_id, {})
         embed = discord.Embed(title=f"#️⃣ Stats for {channel.name}", color=discord.Color.blurple())
         for period in ["daily", "weekly", "monthly", "all"]:
             key = get_period_key(period)
@@ -247,7 +453,7 @@ class Stats(commands.Cog):
     @stats.command()
     async def server(self, ctx):
         guild_id = str(ctx.guild.id)
-        gstats = self.stats_data.get(guild_id, {})
+        gstats = await self.shards.get(guild_id)
         total_msgs = 0
         total_vc = 0
         for user_id, udata in gstats.items():
@@ -262,10 +468,16 @@ class Stats(commands.Cog):
         embed.add_field(name="Total VC Time (all)", value=f"{int(total_vc//60)} min")
         await ctx.send(embed=embed)
 
+    @stats.command()
+    @commands.has_permissions(administrator=True)
+    async def compact(self, ctx):
+        removed, freed = await self.compact_guild(str(ctx.guild.id))
+        await ctx.send(f"🧹 Removed {removed} expired stat bucket(s), reclaimed {freed / 1024:.1f} KB.")
+
     @stats.command()
     async def top(self, ctx, stat_type: str = "messages", period: str = "all"):
         guild_id = str(ctx.guild.id)
-        gstats = self.stats_data.get(guild_id, {})
+        gstats = await self.shards.get(guild_id)
         leaderboard = []
         key = get_period_key(period)
         for user_id, udata in gstats.items():
@@ -2,22 +2,17 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import json
-import os
+from utils import storage
 
-WELCOME_CONFIG_FILE = "data/welcome_config.json"
+WELCOME_CONFIG = storage.dataset("welcome_config")
 
 # Helper functions for config
 
 def load_welcome_config():
-    if not os.path.exists(WELCOME_CONFIG_FILE):
-        with open(WELCOME_CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump({}, f)
-    with open(WELCOME_CONFIG_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return WELCOME_CONFIG.all()
 
-def save_welcome_config(data):
-    with open(WELCOME_CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+async def save_welcome_config(data, guild_id):
+    await WELCOME_CONFIG.aset(guild_id, data[str(guild_id)])
 
 
 def format_placeholders(text, member):
@@ -91,7 +86,7 @@ class Welcome(commands.Cog):
         gid = str(interaction.guild.id)
         self.config.setdefault(gid, {})
         self.config[gid]["channel"] = channel.id
-        save_welcome_config(self.config)
+        await save_welcome_config(self.config, gid)
         embed = discord.Embed(
             title="✅ Welcome Channel Set",
             description=f"Welcome channel set to {channel.mention}.",
@@ -108,7 +103,7 @@ class Welcome(commands.Cog):
         gid = str(interaction.guild.id)
         self.config.setdefault(gid, {})
         self.config[gid]["message"] = message
-        save_welcome_config(self.config)
+        await save_welcome_config(self.config, gid)
         embed = discord.Embed(
             title="✅ Welcome Message Set",
             description=f"Welcome message set!",
@@ -128,7 +123,7 @@ class Welcome(commands.Cog):
         try:
             embed_conf = json.loads(embed_json)
             self.config[gid]["embed"] = embed_conf
-            save_welcome_config(self.config)
+            await save_welcome_config(self.config, gid)
             embed = discord.Embed(
                 title="✅ Welcome Embed Updated",
                 description="Welcome embed updated!",
@@ -152,7 +147,7 @@ class Welcome(commands.Cog):
         gid = str(interaction.guild.id)
         self.config.setdefault(gid, {})
         self.config[gid]["dm_enabled"] = enabled
-        save_welcome_config(self.config)
+        await save_welcome_config(self.config, gid)
         embed = discord.Embed(
             title="✅ Welcome DM Toggled",
             description=f"Welcome DMs are now {'enabled' if enabled else 'disabled'}.",
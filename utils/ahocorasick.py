@@ -0,0 +1,152 @@
+# utils/ahocorasick.py
+"""
+Multi-term matcher for blocklists (Aho-Corasick).
+
+Terms go into one trie with failure links, so a message is scanned once,
+in time linear in its length, however many terms there are. Terms and
+text are normalized first: accents stripped, case folded, and common
+leetspeak and look-alike letters mapped to plain ASCII, so "ƀ4đ" and
+"bad" match the same term. Adding or removing a term edits the trie in
+place; failure links are recomputed on the next search.
+"""
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Only symbols that rarely end a word, so word-boundary matching still sees "bad!" as "bad"
+_LEET = {"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "@": "a", "$": "s"}
+_HOMOGLYPHS = {
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h", "о": "o", "р": "p",
+    "с": "c", "т": "t", "у": "y", "х": "x", "ѕ": "s", "і": "i", "ї": "i", "ј": "j", "ԁ": "d", "ɡ": "g",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p",
+    "τ": "t", "υ": "u", "χ": "x",
+    # Latin letters NFKD leaves alone
+    "ł": "l", "đ": "d", "ø": "o", "ƀ": "b", "ı": "i", "ß": "ss",
+}
+_FOLD = str.maketrans({**_LEET, **_HOMOGLYPHS})
+_COMBINING = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+
+
+def normalize(text: str) -> str:
+    if not text.isascii():
+        text = _COMBINING.sub("", unicodedata.normalize("NFKD", text))
+    return text.casefold().translate(_FOLD)
+
+
+class Matcher:
+    def __init__(self, terms: Iterable[str] = (), word_boundary: bool = False):
+        self.word_boundary = word_boundary
+        self._terms: Dict[str, str] = {}  # normalized -> as entered
+        self._reset()
+        for term in terms:
+            self.add(term)
+
+    def _reset(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[Optional[str]] = [None]  # normalized term ending at each node
+        self._fail: List[int] = [0]
+        self._next_out: List[int] = [0]  # nearest node on the failure chain with an output
+        self._dirty = False
+        self._dead = 0
+
+    def __len__(self):
+        return len(self._terms)
+
+    def __contains__(self, term: str):
+        return normalize(term).strip() in self._terms
+
+    def terms(self) -> List[str]:
+        return sorted(self._terms.values(), key=str.lower)
+
+    # --- edits ---
+
+    def add(self, term: str) -> bool:
+        key = normalize(term).strip()
+        if not key or key in self._terms:
+            return False
+        self._terms[key] = term
+        node = 0
+        for ch in key:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = self._goto[node][ch] = len(self._goto)
+                self._goto.append({})
+                self._out.append(None)
+            node = nxt
+        self._out[node] = key
+        self._dirty = True
+        return True
+
+    def remove(self, term: str) -> bool:
+        key = normalize(term).strip()
+        if self._terms.pop(key, None) is None:
+            return False
+        node = 0
+        for ch in key:
+            node = self._goto[node][ch]
+        self._out[node] = None
+        self._dead += len(key)
+        if self._dead > len(self._goto) // 2:
+            # Mostly unused nodes: rebuild the trie from what's left
+            terms = list(self._terms.values())
+            self._terms.clear()
+            self._reset()
+            for t in terms:
+                self.add(t)
+        self._dirty = True
+        return True
+
+    def _link(self):
+        """Recompute failure and output links breadth-first."""
+        goto, out = self._goto, self._out
+        fail = [0] * len(goto)
+        next_out = [0] * len(goto)
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[child] = target if target != child else 0
+                next_out[child] = target if out[target] else next_out[target]
+                queue.append(child)
+        self._fail, self._next_out = fail, next_out
+        self._dirty = False
+
+    # --- matching ---
+
+    def _bounded(self, text: str, start: int, end: int) -> bool:
+        return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+    def finditer(self, text: str):
+        """``(start, end, term)`` for each match in the normalized text, in order of end position."""
+        if not self._terms:
+            return
+        if self._dirty:
+            self._link()
+        text = normalize(text)
+        goto, fail, out, next_out = self._goto, self._fail, self._out, self._next_out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            node = state if out[state] else next_out[state]
+            while node:
+                key = out[node]
+                start = i + 1 - len(key)
+                if not self.word_boundary or self._bounded(text, start, i + 1):
+                    yield start, i + 1, self._terms[key]
+                node = next_out[node]
+
+    def search(self, text: str) -> Optional[str]:
+        """The first term found in ``text``, or None."""
+        for _, _, term in self.finditer(text):
+            return term
+        return None
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        return list(self.finditer(text))
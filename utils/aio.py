@@ -0,0 +1,37 @@
+# utils/aio.py
+"""
+Runs blocking disk work off the event loop on one bounded thread pool.
+
+``run_ordered`` takes a resource name (normally a file path): calls that
+share a resource execute one at a time, in the order they were submitted.
+"""
+import asyncio
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+async def run(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+
+
+async def run_ordered(resource: str, fn, *args, **kwargs):
+    lock = _locks.get(resource)
+    if lock is None:
+        lock = _locks[resource] = asyncio.Lock()
+    async with lock:
+        loop = asyncio.get_running_loop()
+        fut = loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+        try:
+            return await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            # Keep the resource locked until the worker has really finished.
+            await asyncio.wait([fut])
+            raise
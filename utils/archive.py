@@ -0,0 +1,193 @@
+# utils/archive.py
+"""
+Content-addressed archive of message attachments.
+
+Attachments posted in watched channels are downloaded through the shared
+HTTP session and stored once per distinct content under
+``data/attachments/<sha256[:2]>/<sha256>``; reposting the same file only
+adds a reference. Each message's references are kept in memory so a
+delete log can attach the archived copies. When the store grows past its
+quota the least recently stored or reused blobs are evicted.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+import zipfile
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from utils import aio, http
+
+ARCHIVE_DIR = "data/attachments"
+ARCHIVE_QUOTA_MB = float(os.getenv("ARCHIVE_QUOTA_MB", "1024"))
+ARCHIVE_MAX_FILE_MB = float(os.getenv("ARCHIVE_MAX_FILE_MB", "8"))
+ARCHIVE_CONCURRENCY = int(os.getenv("ARCHIVE_CONCURRENCY", "4"))
+ARCHIVE_REFS = int(os.getenv("ARCHIVE_REFS", "20000"))  # messages whose references are remembered
+CHUNK = 64 * 1024
+WRITE_BATCH = 1024 * 1024  # bytes collected before each write on the I/O pool
+
+Ref = Tuple[str, str, int]  # (sha256, filename, size)
+
+
+class AttachmentArchive:
+    def __init__(self, root: str = ARCHIVE_DIR, quota_mb: float = ARCHIVE_QUOTA_MB,
+                 max_file_mb: float = ARCHIVE_MAX_FILE_MB, max_refs: int = ARCHIVE_REFS):
+        self.root = root
+        self.quota = int(quota_mb * 1024 * 1024)
+        self.max_file = int(max_file_mb * 1024 * 1024)
+        self.max_refs = max_refs
+        self._refs: "OrderedDict[int, List[Ref]]" = OrderedDict()
+        self._pending: Dict[int, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bytes: Optional[int] = None  # stored bytes, counted on first use
+        self.stored = 0
+        self.deduplicated = 0
+        self.evicted = 0
+
+    def path(self, sha: str) -> str:
+        return os.path.join(self.root, sha[:2], sha)
+
+    # --- storing ---
+
+    def archive(self, message):
+        """Start archiving ``message``'s attachments in the background."""
+        wanted = [a for a in message.attachments if a.size <= self.max_file]
+        if not wanted:
+            return
+        task = asyncio.ensure_future(self._archive(message.id, wanted))
+        self._pending[message.id] = task
+        task.add_done_callback(lambda _: self._pending.pop(message.id, None))
+
+    async def _archive(self, message_id: int, attachments):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(ARCHIVE_CONCURRENCY)
+        refs = []
+        for attachment in attachments:
+            try:
+                async with self._semaphore:
+                    sha, size = await self._download(attachment.url)
+            except Exception as e:
+                print(f"[Archive] Failed to archive {attachment.filename} from message {message_id}: {e}")
+                continue
+            if sha:
+                refs.append((sha, attachment.filename, size))
+        if refs:
+            self._refs[message_id] = refs
+            while len(self._refs) > self.max_refs:
+                self._refs.popitem(last=False)
+
+    def _open_part(self):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".part")
+        return os.fdopen(fd, "wb"), tmp
+
+    @staticmethod
+    def _write(f, chunks: List[bytes]):
+        f.writelines(chunks)
+
+    @staticmethod
+    def _discard(f, tmp: str):
+        f.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    async def _download(self, url: str) -> Tuple[Optional[str], int]:
+        # File work runs on the I/O pool; chunks are handed over WRITE_BATCH bytes at a time
+        f, tmp = await aio.run(self._open_part)
+        digest, size = hashlib.sha256(), 0
+        buffered, buffered_bytes = [], 0
+        try:
+            async with http.get_session().get(url) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.content.iter_chunked(CHUNK):
+                    size += len(chunk)
+                    if size > self.max_file:
+                        return None, size
+                    digest.update(chunk)
+                    buffered.append(chunk)
+                    buffered_bytes += len(chunk)
+                    if buffered_bytes >= WRITE_BATCH:
+                        await aio.run(self._write, f, buffered)
+                        buffered, buffered_bytes = [], 0
+            if buffered:
+                await aio.run(self._write, f, buffered)
+            await aio.run(f.close)
+            sha = digest.hexdigest()
+            await aio.run_ordered(self.root, self._commit, tmp, sha, size)
+            return sha, size
+        finally:
+            await aio.run(self._discard, f, tmp)
+
+    def _commit(self, tmp: str, sha: str, size: int):
+        if self._bytes is None:
+            self._bytes = self._usage()
+        path = self.path(sha)
+        if os.path.exists(path):
+            os.utime(path)  # reused content counts as recent for eviction
+            self.deduplicated += 1
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp, path)
+        self._bytes += size
+        self.stored += 1
+        if self._bytes > self.quota:
+            self._evict()
+
+    def _blobs(self) -> List[Tuple[float, int, str]]:
+        """``(mtime, size, path)`` of every stored blob."""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for bucket in os.scandir(self.root):
+            if bucket.is_dir():
+                for blob in os.scandir(bucket.path):
+                    st = blob.stat()
+                    found.append((st.st_mtime, st.st_size, blob.path))
+        return found
+
+    def _usage(self) -> int:
+        return sum(size for _, size, _ in self._blobs())
+
+    def _evict(self):
+        # Evict down to 90% of the quota so every new file doesn't trigger another scan
+        target = self.quota * 0.9
+        for _, size, path in sorted(self._blobs()):
+            if self._bytes <= target:
+                break
+            os.remove(path)
+            self._bytes -= size
+            self.evicted += 1
+
+    # --- lookup ---
+
+    async def refs(self, message_id: int, wait: float = 10) -> List[Ref]:
+        """Archived copies for a message, waiting briefly for a download still in progress."""
+        task = self._pending.get(message_id)
+        if task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(task), wait)
+            except asyncio.TimeoutError:
+                pass
+        return [ref for ref in self._refs.pop(message_id, []) if os.path.exists(self.path(ref[0]))]
+
+    def bundle(self, refs: List[Ref]):
+        """A readable file object and name for ``refs``: the file itself, or a zip of several."""
+        if len(refs) == 1:
+            sha, name, _ = refs[0]
+            return open(self.path(sha), "rb"), name
+        spool = tempfile.SpooledTemporaryFile(max_size=self.max_file)
+        with zipfile.ZipFile(spool, "w", zipfile.ZIP_STORED) as zf:
+            used = set()
+            for i, (sha, name, _) in enumerate(refs):
+                arcname = name if name not in used else f"{i}_{name}"
+                used.add(arcname)
+                zf.write(self.path(sha), arcname)
+        spool.seek(0)
+        return spool, "attachments.zip"
+
+    async def usage(self) -> int:
+        if self._bytes is None:
+            self._bytes = await aio.run_ordered(self.root, self._usage)
+        return self._bytes
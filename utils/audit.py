@@ -0,0 +1,118 @@
+# utils/audit.py
+"""
+Short-lived index of audit log entries for attributing gateway events.
+
+Events like channel deletes or role updates don't say who caused them.
+``on_audit_log_entry_create`` feeds entries in here, keyed per guild by
+(target id, action name); listeners look the actor up instead of calling
+the audit log endpoint. Entries usually arrive just after the event they
+explain, so lookups can wait briefly for one to show up. An entry only
+explains events that happened around or before its creation time, so a
+lookup ignores entries made before the event (less a little clock skew);
+otherwise a change made seconds earlier would be credited to whoever made
+that one.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+AUDIT_CACHE_SECONDS = float(os.getenv("AUDIT_CACHE_SECONDS", "30"))
+AUDIT_WAIT_SECONDS = float(os.getenv("AUDIT_WAIT_SECONDS", "2"))
+AUDIT_CACHE_PER_GUILD = int(os.getenv("AUDIT_CACHE_PER_GUILD", "500"))
+AUDIT_SKEW_SECONDS = float(os.getenv("AUDIT_SKEW_SECONDS", "2"))  # allowance between our clock and Discord's
+
+
+class Attribution:
+    __slots__ = ("user", "reason", "created", "at")
+
+    def __init__(self, user, reason: Optional[str], created: float, at: float):
+        self.user = user
+        self.reason = reason
+        self.created = created  # monotonic time it was cached
+        self.at = at  # wall-clock time Discord created the entry
+
+
+class AuditCache:
+    def __init__(self, ttl: float = AUDIT_CACHE_SECONDS, wait: float = AUDIT_WAIT_SECONDS,
+                 per_guild: int = AUDIT_CACHE_PER_GUILD, skew: float = AUDIT_SKEW_SECONDS):
+        self.ttl = ttl
+        self.wait = wait
+        self.skew = skew
+        self.per_guild = per_guild
+        self._guilds: Dict[int, "OrderedDict[Tuple[int, str], Attribution]"] = {}
+        self._waiters: Dict[Tuple[int, int, str], List[asyncio.Future]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, entry):
+        """Index one ``discord.AuditLogEntry``."""
+        target_id = getattr(entry.target, "id", None)
+        if target_id is None:
+            return
+        guild = entry.guild
+        user = entry.user or guild.get_member(getattr(entry, "user_id", None) or 0)
+        if user is None:
+            return
+        record = Attribution(user, entry.reason, time.monotonic(), entry.created_at.timestamp())
+        key = (target_id, entry.action.name)
+        entries = self._guilds.setdefault(guild.id, OrderedDict())
+        entries[key] = record
+        entries.move_to_end(key)
+        self._prune(entries)
+        for fut in self._waiters.pop((guild.id, *key), []):
+            if not fut.done():
+                fut.set_result(record)
+
+    def _prune(self, entries):
+        cutoff = time.monotonic() - self.ttl
+        while entries and (len(entries) > self.per_guild or next(iter(entries.values())).created < cutoff):
+            entries.popitem(last=False)
+
+    def get(self, guild_id: int, target_id: int, *actions: str, since: float = 0) -> Optional[Attribution]:
+        """The latest entry for ``target_id`` under any of ``actions`` created at or after ``since``
+        (a wall-clock timestamp)."""
+        entries = self._guilds.get(guild_id)
+        if not entries:
+            return None
+        cutoff = time.monotonic() - self.ttl
+        for action in actions:
+            record = entries.get((target_id, action))
+            if record and record.created >= cutoff and record.at >= since - self.skew:
+                return record
+        return None
+
+    async def lookup(self, guild_id: int, target_id: int, *actions: str,
+                     since: Optional[float] = None) -> Optional[Attribution]:
+        """Like ``get``, waiting up to ``wait`` seconds for a matching entry. ``since`` is when the
+        event happened and defaults to now."""
+        if since is None:
+            since = time.time()
+        record = self.get(guild_id, target_id, *actions, since=since)
+        if record is None and self.wait > 0:
+            fut = asyncio.get_running_loop().create_future()
+            keys = [(guild_id, target_id, action) for action in actions]
+            for key in keys:
+                self._waiters.setdefault(key, []).append(fut)
+            try:
+                record = await asyncio.wait_for(fut, self.wait)
+                if record.at < since - self.skew:
+                    record = None
+            except asyncio.TimeoutError:
+                record = None
+            finally:
+                for key in keys:
+                    waiters = self._waiters.get(key)
+                    if waiters and fut in waiters:
+                        waiters.remove(fut)
+                        if not waiters:
+                            del self._waiters[key]
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return record
+
+    def forget(self, guild_id: int):
+        self._guilds.pop(guild_id, None)
@@ -0,0 +1,159 @@
+# utils/automod.py
+"""
+Compiled automod rules.
+
+A guild's automod config (``{feature: {"delete", "warn", "mute", ...}}``) is
+compiled once into a ``Pipeline``: the enabled rules as precompiled check
+functions, cheapest first. ``Pipeline.run`` stops at the first rule a
+message trips, so most messages only pay for the cheap checks. Each rule
+keeps call, hit and time counters shared across guilds. Word rules match a
+guild's term list with one automaton pass (see ``utils.ahocorasick``).
+"""
+import re
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.ahocorasick import Matcher
+
+ACTIONS = ("delete", "warn", "mute")
+
+INVITE_RE = re.compile(r"discord(?:\.gg|(?:app)?\.com/invite)/", re.IGNORECASE)
+LINK_RE = re.compile(r"https?://", re.IGNORECASE)
+URL_RE = re.compile(r"https?://[\w.-]+", re.IGNORECASE)
+TOKEN_RE = re.compile(r"[MN][A-Za-z\d]{23}\.[\w-]{6}\.[\w-]{27}")
+EMOJI_RE = re.compile("[\U0001F600-\U0001F64E]")
+ZALGO_RE = re.compile("[\u0300-\u036e]")
+UNICODE_RE = re.compile("[^\u0000-\u03e8]")  # code points above 1000
+CAPS_RE = re.compile(r"[A-Z]")
+NSFW_WORDS = ("porn", "sex", "nude", "boobs", "nsfw")
+# Rules matching a per-guild term list; the default list applies until a guild edits its own
+TERM_RULES = {"antiwords": (), "antinsfw": NSFW_WORDS}
+
+Check = Callable[[object, str], bool]
+
+
+def _count_over(pattern: re.Pattern, limit: int) -> Check:
+    def check(message, content):
+        found = 0
+        for _ in pattern.finditer(content):
+            found += 1
+            if found > limit:
+                return True
+        return False
+    return check
+
+
+def _spam(message, content):
+    if len(content) > 200:
+        return True
+    words = content.split()
+    return len(words) > 5 and Counter(words).most_common(1)[0][1] > 5
+
+
+def build_matcher(feature: str, conf: dict) -> Matcher:
+    terms = conf.get("terms")
+    return Matcher(TERM_RULES[feature] if terms is None else terms, word_boundary=conf.get("boundary", False))
+
+
+def _term_check(matcher: Matcher) -> Check:
+    return lambda message, content: matcher.search(content) is not None
+
+
+# feature -> (relative cost, factory(feature config) -> check). Cost orders the pipeline.
+RULES: Dict[str, Tuple[int, Callable[[dict], Check]]] = {
+    "antiattachment": (0, lambda conf: lambda message, content: bool(message.attachments)),
+    "antimention": (0, lambda conf: lambda message, content: len(message.mentions) >= 5),
+    "antiinvite": (1, lambda conf: lambda message, content: INVITE_RE.search(content) is not None),
+    "antiservers": (1, lambda conf: lambda message, content: INVITE_RE.search(content) is not None),
+    "antilink": (1, lambda conf: lambda message, content: LINK_RE.search(content) is not None),
+    "antiurl": (1, lambda conf: lambda message, content: URL_RE.search(content) is not None),
+    "antizalgo": (2, lambda conf: lambda message, content: ZALGO_RE.search(content) is not None),
+    "antitoken": (2, lambda conf: lambda message, content: TOKEN_RE.search(content) is not None),
+    "antiemoji": (2, lambda conf: _count_over(EMOJI_RE, 5)),
+    "antiunicode": (2, lambda conf: _count_over(UNICODE_RE, 10)),
+    "anticaps": (2, lambda conf: _count_over(CAPS_RE, 30)),
+    "antinsfw": (3, lambda conf: _term_check(build_matcher("antinsfw", conf))),
+    "antiwords": (3, lambda conf: _term_check(build_matcher("antiwords", conf))),
+    "antispam": (4, lambda conf: _spam),
+}
+
+
+class RuleStats:
+    __slots__ = ("calls", "hits", "ns")
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.ns = 0
+
+
+STATS: Dict[str, RuleStats] = {name: RuleStats() for name in RULES}
+PIPELINE_STATS = RuleStats()  # whole-pipeline runs, for cost per message
+
+
+class Rule:
+    __slots__ = ("name", "check", "actions", "stats")
+
+    def __init__(self, name: str, check: Check, actions: dict):
+        self.name = name
+        self.check = check
+        self.actions = actions
+        self.stats = STATS[name]
+
+
+class Pipeline:
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def run(self, message) -> Optional[Rule]:
+        """The first rule ``message`` trips, or None."""
+        content = message.content
+        clock = time.perf_counter_ns
+        started = clock()
+        hit = None
+        for rule in self.rules:
+            before = clock()
+            tripped = rule.check(message, content)
+            stats = rule.stats
+            stats.ns += clock() - before
+            stats.calls += 1
+            if tripped:
+                stats.hits += 1
+                hit = rule
+                break
+        PIPELINE_STATS.ns += clock() - started
+        PIPELINE_STATS.calls += 1
+        if hit:
+            PIPELINE_STATS.hits += 1
+        return hit
+
+
+def compile_pipeline(config: dict, matchers: Optional[Dict[str, Matcher]] = None) -> Pipeline:
+    """Rules with at least one action enabled, cheapest first.
+
+    Term rules take their matcher from ``matchers`` (adding any they build), so
+    edits made to a matcher there apply without recompiling.
+    """
+    rules = []
+    for name, actions in config.items():
+        if name not in RULES or not any(actions.get(a) for a in ACTIONS):
+            continue
+        cost, factory = RULES[name]
+        if name in TERM_RULES and matchers is not None:
+            if name not in matchers:
+                matchers[name] = build_matcher(name, actions)
+            check = _term_check(matchers[name])
+        else:
+            check = factory(actions)
+        rules.append((cost, name, Rule(name, check, actions)))
+    rules.sort(key=lambda r: (r[0], r[1]))
+    return Pipeline([rule for _, _, rule in rules])
+
+
+def reset_stats():
+    for stats in list(STATS.values()) + [PIPELINE_STATS]:
+        stats.calls = stats.hits = stats.ns = 0
@@ -0,0 +1,47 @@
+# utils/coalesce.py
+"""
+Merges bursts of items per key.
+
+Items added for a key are collected for ``window`` seconds after the
+first one arrives, then handed to ``emit(key, context, items)`` in one
+call. ``context`` is whatever the latest ``add`` passed (e.g. the guild
+and member objects the items belong to).
+"""
+import asyncio
+import os
+from typing import Any, Dict, Hashable, List, Tuple
+
+VOICE_COALESCE_WINDOW = float(os.getenv("VOICE_COALESCE_WINDOW", "3"))
+
+
+class Coalescer:
+    def __init__(self, emit, window: float = VOICE_COALESCE_WINDOW):
+        self.emit = emit
+        self.window = window
+        self._pending: Dict[Hashable, Tuple[Any, List[Any]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, key: Hashable, context: Any, item: Any):
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = (context, [item])
+            self._timers[key] = asyncio.get_running_loop().call_later(self.window, self.flush, key)
+        else:
+            pending[1].append(item)
+            self._pending[key] = (context, pending[1])
+
+    def flush(self, key: Hashable):
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        pending = self._pending.pop(key, None)
+        if pending:
+            context, items = pending
+            self.emit(key, context, items)
+
+    def flush_all(self):
+        for key in list(self._pending):
+            self.flush(key)
@@ -0,0 +1,147 @@
+# utils/delivery.py
+"""
+Batches log embeds per channel into multi-embed messages.
+
+Embeds added within ``window`` seconds of the first one in a batch go out
+together, up to Discord's limits of 10 embeds and 6000 characters per
+message. Messages for one channel are sent in the order they were batched.
+An embed with a file attachment closes the current batch and goes out as
+its own message. A custom ``sender`` coroutine can deliver a batch some
+other way (e.g. a webhook); by default it is posted to the channel.
+
+At most ``max_pending`` closed batches wait to be sent per channel.
+Queued producers ``await wait_for_room(channel)`` before adding, so a slow
+channel pushes back on them instead of piling up send tasks here. Callers
+that must not wait (moderation commands) add directly; there are few of them.
+"""
+import asyncio
+import os
+from typing import Dict, List, Optional, Set
+
+import discord
+
+MAX_EMBEDS = 10
+MAX_CHARS = 6000
+LOG_BATCH_WINDOW = float(os.getenv("LOG_BATCH_WINDOW", "1.5"))
+LOG_MAX_PENDING = int(os.getenv("LOG_MAX_PENDING", "2"))  # batches waiting to be sent, per channel
+
+
+async def send_to_channel(channel, embeds: List[discord.Embed], files: Optional[List[discord.File]] = None):
+    await channel.send(embeds=embeds, files=files or [])
+
+
+class EmbedBatcher:
+    def __init__(self, sender=send_to_channel, window: float = LOG_BATCH_WINDOW, max_pending: int = LOG_MAX_PENDING):
+        self.sender = sender
+        self.window = window
+        self.max_pending = max(1, max_pending)
+        self._buffers: Dict[int, List[discord.Embed]] = {}
+        self._chars: Dict[int, int] = {}
+        self._channels: Dict[int, discord.abc.Messageable] = {}
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending: Dict[int, int] = {}  # channel id -> batches spawned but not yet sent
+        self._waiters: Dict[int, List[asyncio.Future]] = {}
+        self.messages_sent = 0
+        self.embeds_sent = 0
+
+    def add(self, channel, embed: discord.Embed, file: Optional[discord.File] = None):
+        cid = channel.id
+        if file is not None:
+            if cid in self._buffers:
+                self._flush_soon(cid)
+            self._spawn(cid, self._send(channel, [embed], [file]))
+            return
+        size = len(embed)
+        buf = self._buffers.get(cid)
+        if buf and (len(buf) >= MAX_EMBEDS or self._chars[cid] + size > MAX_CHARS):
+            self._flush_soon(cid)
+            buf = None
+        if buf is None:
+            buf = self._buffers[cid] = []
+            self._chars[cid] = 0
+            self._channels[cid] = channel
+            loop = asyncio.get_running_loop()
+            self._timers[cid] = loop.call_later(self.window, self._flush_soon, cid)
+        buf.append(embed)
+        self._chars[cid] += size
+        if len(buf) >= MAX_EMBEDS:
+            self._flush_soon(cid)
+
+    def _take(self, cid):
+        timer = self._timers.pop(cid, None)
+        if timer:
+            timer.cancel()
+        self._chars.pop(cid, None)
+        return self._channels.pop(cid, None), self._buffers.pop(cid, None)
+
+    def _flush_soon(self, cid):
+        channel, embeds = self._take(cid)
+        if embeds:
+            self._spawn(cid, self._send(channel, embeds))
+
+    def _spawn(self, cid, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        self._pending[cid] = self._pending.get(cid, 0) + 1
+        task.add_done_callback(lambda t: self._sent(cid, t))
+
+    def _sent(self, cid, task):
+        self._tasks.discard(task)
+        left = self._pending.get(cid, 1) - 1
+        if left > 0:
+            self._pending[cid] = left
+        else:
+            self._pending.pop(cid, None)
+        if left < self.max_pending:
+            # Waiters re-check for room when they wake
+            for fut in self._waiters.pop(cid, []):
+                if not fut.done():
+                    fut.set_result(None)
+
+    async def wait_for_room(self, channel):
+        """Wait until ``channel`` has fewer than ``max_pending`` batches waiting to be sent."""
+        cid = channel.id
+        while self._pending.get(cid, 0) >= self.max_pending:
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(cid, []).append(fut)
+            try:
+                await fut
+            finally:
+                waiters = self._waiters.get(cid)
+                if waiters and fut in waiters:
+                    waiters.remove(fut)
+
+    async def _send(self, channel, embeds: List[discord.Embed], files: Optional[List[discord.File]] = None):
+        lock = self._locks.setdefault(channel.id, asyncio.Lock())
+        async with lock:
+            try:
+                if files:
+                    await self.sender(channel, embeds, files)
+                else:
+                    await self.sender(channel, embeds)
+                self.messages_sent += 1
+                self.embeds_sent += len(embeds)
+            except discord.HTTPException as e:
+                if e.status == 400 and len(embeds) > 1:
+                    # One invalid embed rejects the whole message; send them singly so only it is lost
+                    for embed in embeds:
+                        await self._send_one(channel, embed)
+                    return
+                print(f"[Logs] Failed to deliver {len(embeds)} log embed(s) to {channel.id}: {e}")
+
+    async def _send_one(self, channel, embed: discord.Embed):
+        try:
+            await self.sender(channel, [embed])
+            self.messages_sent += 1
+            self.embeds_sent += 1
+        except discord.HTTPException as e:
+            print(f"[Logs] Dropped a rejected log embed ({embed.title}) for {channel.id}: {e}")
+
+    async def flush(self):
+        """Send everything still buffered and wait for in-flight messages."""
+        for cid in list(self._buffers):
+            self._flush_soon(cid)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,141 @@
+# utils/diffs.py
+"""
+Compact change rendering for update logs.
+
+Text is diffed word by word and only the changed spans are shown, with a
+few words of context (``~~removed~~`` / ``**added**``). Collections such as
+roles or permissions render as set deltas (``+added, -removed``). Every
+renderer takes a character ``limit`` and cuts at a piece boundary with a
+note of how much was left out, so results fit an embed field.
+"""
+import difflib
+import re
+from typing import Iterable, List, Optional, Tuple
+
+FIELD_LIMIT = 1024  # Discord's embed field value limit
+CONTEXT_WORDS = 4
+MAX_DIFF_TOKENS = 4000
+
+_TOKENS = re.compile(r"\s+|\w+|[^\w\s]")
+_MARKDOWN = re.compile(r"([\\*_~`|>])")
+
+
+def escape(text: str) -> str:
+    return _MARKDOWN.sub(r"\\\1", text)
+
+
+def clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:max(0, limit - 1)] + "…"
+
+
+def _fit(pieces: List[str], limit: int, sep: str = "", unit: str = "change") -> str:
+    """Join ``pieces`` up to ``limit`` characters, noting how many were left out."""
+    out, used = [], 0
+    for i, piece in enumerate(pieces):
+        cost = len(piece) + (len(sep) if out else 0)
+        left = len(pieces) - i
+        note = f"{sep if out else ''}… (+{left} more {unit}{'s' if left != 1 else ''})"
+        # Always leave room for the note in case a later piece doesn't fit
+        room = limit - (len(note) if left > 1 else 0)
+        if used + cost > room:
+            return "".join(out) + note
+        out.append((sep if out else "") + piece)
+        used += cost
+    return "".join(out)
+
+
+def _word_cut(tokens: List[str], words: int, from_end: bool) -> int:
+    """Index splitting ``words`` words off the start (or end) of ``tokens``; -1 if there aren't more."""
+    seen = 0
+    indices = range(len(tokens) - 1, -1, -1) if from_end else range(len(tokens))
+    for i in indices:
+        if not tokens[i].isspace():
+            seen += 1
+            if seen > words:
+                return i + 1 if from_end else i
+    return -1
+
+
+def _context(tokens: List[str], words: int, head: bool, tail: bool) -> str:
+    """An unchanged span, cut down to ``words`` words after the change before it (``head``)
+    and before the change after it (``tail``)."""
+    if not head and not tail:
+        return ""  # nothing changed on either side, so there is no context to show
+    keep = words * (head + tail)
+    if _word_cut(tokens, keep, from_end=False) == -1:
+        return escape("".join(tokens))
+    start = "".join(tokens[:_word_cut(tokens, words, from_end=False)]) if head else ""
+    end = "".join(tokens[_word_cut(tokens, words, from_end=True):]) if tail else ""
+    return escape(start) + "…" + escape(end)
+
+
+def _opcodes(a: List[str], b: List[str]) -> List[Tuple[str, int, int, int, int]]:
+    """difflib opcodes, diffing only what lies between the common prefix and suffix."""
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    ops = [("equal", 0, start, 0, start)] if start else []
+    mid_a, mid_b = a[start:len(a) - end], b[start:len(b) - end]
+    if len(mid_a) + len(mid_b) > MAX_DIFF_TOKENS:
+        # Too big to align cheaply; show it as one replacement and let truncation cut it
+        ops.append(("replace", start, len(a) - end, start, len(b) - end))
+    else:
+        for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, mid_a, mid_b).get_opcodes():
+            ops.append((tag, i1 + start, i2 + start, j1 + start, j2 + start))
+    if end:
+        ops.append(("equal", len(a) - end, len(a), len(b) - end, len(b)))
+    return ops
+
+
+def text_diff(before: str, after: str, limit: int = FIELD_LIMIT, context: int = CONTEXT_WORDS) -> str:
+    """Word-level diff of two strings showing only changed spans and nearby words."""
+    a, b = _TOKENS.findall(before), _TOKENS.findall(after)
+    ops = _opcodes(a, b)
+    pieces = []
+    changed = False
+    for n, (tag, i1, i2, j1, j2) in enumerate(ops):
+        if tag == "equal":
+            pieces.append(_context(a[i1:i2], context, head=n > 0, tail=n < len(ops) - 1))
+            continue
+        # A single huge change is clipped so something of it still fits
+        removed = clip("".join(a[i1:i2]).strip(), limit // 3)
+        added = clip("".join(b[j1:j2]).strip(), limit // 3)
+        piece = ""
+        changed = changed or bool(removed or added)
+        if removed:
+            piece += f"~~{escape(removed)}~~"
+        if added:
+            piece += (" " if removed else "") + f"**{escape(added)}**"
+        # Keep the surrounding whitespace outside the markers
+        lead = " " if (a[i1:i2] or b[j1:j2])[0].isspace() else ""
+        trail = " " if (a[i1:i2] or b[j1:j2])[-1].isspace() else ""
+        pieces.append(lead + piece + trail)
+    # Whitespace-only edits (or none, e.g. an embed unfurl) have nothing to mark
+    return _fit(pieces, limit) if changed else "*no visible change*"
+
+
+def set_diff(before: Iterable, after: Iterable, label=str, limit: int = FIELD_LIMIT) -> str:
+    """``+added, -removed`` for two collections; ``label`` renders one item."""
+    before, after = set(before), set(after)
+    pieces = [f"+{label(x)}" for x in after - before] + [f"-{label(x)}" for x in before - after]
+    pieces.sort(key=lambda p: (p[0] != "+", p[1:].lower()))
+    return _fit(pieces, limit, sep=", ", unit="item")
+
+
+def flag_diff(before: Iterable[Tuple[str, bool]], after: Iterable[Tuple[str, bool]], limit: int = FIELD_LIMIT) -> str:
+    """Set delta of the names whose flag is on, e.g. for ``discord.Permissions``."""
+    return set_diff((name for name, on in before if on), (name for name, on in after if on), limit=limit)
+
+
+def value_changes(changes: Iterable[Tuple[str, object, object]], value_limit: int = 100) -> List[str]:
+    """One ``Label: before → after`` line per changed value."""
+    return [f"{label}: {clip(escape(str(old)), value_limit)} → {clip(escape(str(new)), value_limit)}"
+            for label, old, new in changes if old != new]
+
+
+def listing(items: List[str], limit: int = FIELD_LIMIT, sep: str = ", ") -> str:
+    """``items`` joined by ``sep``, cut to ``limit`` with a count of what was left out."""
+    return _fit(items, limit, sep=sep, unit="item")
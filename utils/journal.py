@@ -0,0 +1,240 @@
+# utils/journal.py
+"""
+Append-only JSONL journal, one directory per key (e.g. per guild).
+
+Each key's history is split into numbered segments (``00000001.jsonl``).
+Appends go to the newest segment and rotate once it reaches the size cap.
+Sealed segments can be gzipped and expired by ``compact``. A record's
+position is ``(segment, offset)`` where offset is into the uncompressed text.
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from utils import aio
+
+SEGMENT_BYTES = 1024 * 1024
+MAX_OPEN_FILES = 64
+
+Position = Tuple[int, int]
+
+
+def _segment_name(seq: int, compressed: bool = False) -> str:
+    return f"{seq:08d}.jsonl" + (".gz" if compressed else "")
+
+
+class Journal:
+    def __init__(self, root: str, segment_bytes: int = SEGMENT_BYTES):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._open: "OrderedDict[str, Any]" = OrderedDict()  # key -> append handle of active segment
+        self._active: Dict[str, Tuple[int, int]] = {}  # key -> (segment, size)
+
+    # --- layout ---
+
+    def _dir(self, key) -> str:
+        return os.path.join(self.root, str(key))
+
+    def resource(self, key) -> str:
+        """Ordering key for ``aio.run_ordered``; work on it runs in turn with appends to ``key``."""
+        return self._dir(key)
+
+    def segments(self, key) -> List[Tuple[int, bool]]:
+        """``(segment, compressed)`` pairs for ``key``, oldest first."""
+        path = self._dir(key)
+        if not os.path.isdir(path):
+            return []
+        found = {}
+        for name in os.listdir(path):
+            if name.endswith(".jsonl"):
+                found[int(name[:-6])] = False
+            elif name.endswith(".jsonl.gz"):
+                found.setdefault(int(name[:-9]), True)
+        return sorted(found.items())
+
+    def keys(self) -> List[str]:
+        return [name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name))]
+
+    def _segment_path(self, key, seq: int, compressed: bool) -> str:
+        return os.path.join(self._dir(key), _segment_name(seq, compressed))
+
+    # --- writes ---
+
+    def _handle(self, key):
+        key = str(key)
+        handle = self._open.get(key)
+        if handle is not None:
+            self._open.move_to_end(key)
+            return handle
+        if key not in self._active:
+            segs = self.segments(key)
+            if segs and not segs[-1][1]:
+                seq = segs[-1][0]
+                size = os.path.getsize(self._segment_path(key, seq, False))
+            else:
+                seq = segs[-1][0] + 1 if segs else 1
+                size = 0
+            self._active[key] = (seq, size)
+        seq, _ = self._active[key]
+        os.makedirs(self._dir(key), exist_ok=True)
+        handle = open(self._segment_path(key, seq, False), "ab")
+        self._open[key] = handle
+        if len(self._open) > MAX_OPEN_FILES:
+            _, oldest = self._open.popitem(last=False)
+            oldest.close()
+        return handle
+
+    def _rotate(self, key):
+        handle = self._open.pop(key, None)
+        if handle is not None:
+            handle.close()
+        seq, _ = self._active[key]
+        self._active[key] = (seq + 1, 0)
+
+    def append(self, key, record: Any) -> Position:
+        key = str(key)
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            handle = self._handle(key)
+            seq, size = self._active[key]
+            if size and size + len(line) > self.segment_bytes:
+                self._rotate(key)
+                handle = self._handle(key)
+                seq, size = self._active[key]
+            handle.write(line)
+            handle.flush()
+            self._active[key] = (seq, size + len(line))
+        return seq, size
+
+    # --- reads ---
+
+    def _read_segment(self, key, seq: int, compressed: bool) -> bytes:
+        path = self._segment_path(key, seq, compressed)
+        if compressed:
+            with gzip.open(path, "rb") as f:
+                return f.read()
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _segment_lines(self, key, seq: int, compressed: bool) -> List[Tuple[int, bytes]]:
+        data = self._read_segment(key, seq, compressed)
+        lines, offset = [], 0
+        for raw in data.splitlines(keepends=True):
+            if raw.endswith(b"\n"):  # a torn final line from a crash is skipped
+                lines.append((offset, raw))
+            offset += len(raw)
+        return lines
+
+    def scan(self, key, reverse: bool = False) -> Iterator[Tuple[Position, Any]]:
+        """Stream ``(position, record)`` pairs one segment at a time."""
+        key = str(key)
+        segs = self.segments(key)
+        if reverse:
+            segs = list(reversed(segs))
+        for seq, compressed in segs:
+            with self._lock:
+                handle = self._open.get(key)
+                if handle is not None:
+                    handle.flush()
+            try:
+                lines = self._segment_lines(key, seq, compressed)
+            except FileNotFoundError:
+                # Gzipped or expired by compaction since we listed the segments
+                try:
+                    lines = self._segment_lines(key, seq, True) if not compressed else []
+                except FileNotFoundError:
+                    continue
+            if reverse:
+                lines.reverse()
+            for offset, raw in lines:
+                yield (seq, offset), json.loads(raw)
+
+    def iter(self, key, reverse: bool = False) -> Iterator[Any]:
+        for _, record in self.scan(key, reverse):
+            yield record
+
+    def latest(self, key, n: int) -> List[Any]:
+        """The newest ``n`` records, newest first."""
+        out = []
+        for record in self.iter(key, reverse=True):
+            out.append(record)
+            if len(out) >= n:
+                break
+        return out
+
+    def read_at(self, key, position: Position) -> Optional[Any]:
+        seq, offset = position
+        for compressed in (False, True):
+            path = self._segment_path(key, seq, compressed)
+            if not os.path.exists(path):
+                continue
+            opener = gzip.open if compressed else open
+            with opener(path, "rb") as f:
+                f.seek(offset)
+                raw = f.readline()
+            return json.loads(raw) if raw.endswith(b"\n") else None
+        return None
+
+    # --- maintenance ---
+
+    def compact(self, key, compress: bool = True, retention_days: Optional[float] = None,
+                max_segments: Optional[int] = None) -> Dict[str, int]:
+        """Gzip sealed segments and drop ones past the retention policy."""
+        key = str(key)
+        stats = {"compressed": 0, "removed": 0, "bytes_freed": 0}
+        with self._lock:
+            active = self._active.get(key, (None, 0))[0]
+        # Anything at or past the active segment may be appended to concurrently.
+        sealed = [(seq, c) for seq, c in self.segments(key) if active is None or seq < active]
+        if active is None and sealed and not sealed[-1][1]:
+            sealed = sealed[:-1]  # newest plain segment is still the append target
+        cutoff = time.time() - retention_days * 86400 if retention_days else None
+        drop = set()
+        if max_segments is not None and len(sealed) > max_segments:
+            drop.update(seq for seq, _ in sealed[:len(sealed) - max_segments])
+        for seq, compressed in sealed:
+            path = self._segment_path(key, seq, compressed)
+            if seq in drop or (cutoff is not None and os.path.getmtime(path) < cutoff):
+                stats["bytes_freed"] += os.path.getsize(path)
+                os.remove(path)
+                stats["removed"] += 1
+            elif compress and not compressed:
+                mtime = os.path.getmtime(path)
+                with open(path, "rb") as src, gzip.open(path + ".gz.tmp", "wb") as dst:
+                    dst.write(src.read())
+                os.utime(path + ".gz.tmp", (mtime, mtime))
+                os.replace(path + ".gz.tmp", path + ".gz")
+                before = os.path.getsize(path)
+                os.remove(path)
+                stats["bytes_freed"] += before - os.path.getsize(path + ".gz")
+                stats["compressed"] += 1
+        return stats
+
+    def compact_all(self, **policy) -> Dict[str, int]:
+        total = {"compressed": 0, "removed": 0, "bytes_freed": 0}
+        for key in self.keys():
+            for name, value in self.compact(key, **policy).items():
+                total[name] += value
+        return total
+
+    def close(self) -> None:
+        with self._lock:
+            for handle in self._open.values():
+                handle.close()
+            self._open.clear()
+
+    # --- coroutine variants, run on the shared I/O pool in order per key ---
+
+    async def aappend(self, key, record: Any) -> Position:
+        return await aio.run_ordered(self.resource(key), self.append, key, record)
+
+    async def alatest(self, key, n: int) -> List[Any]:
+        return await aio.run_ordered(self.resource(key), self.latest, key, n)
+
+    async def acompact_all(self, **policy) -> Dict[str, int]:
+        return await aio.run(self.compact_all, **policy)
@@ -0,0 +1,111 @@
+# utils/logqueue.py
+"""
+Bounded per-guild queue between gateway listeners and log delivery.
+
+Listeners ``submit`` and return immediately. Each guild with pending
+entries has one worker task that hands them to the handler in order and
+exits once the queue is empty. When a guild's queue is full the oldest
+entry is dropped; with the ``summarize`` policy the dropped entries are
+reported afterwards as a single overflow entry. The handler waits while
+delivery is behind, so the backlog stays here and this bound is the one
+that holds.
+"""
+import asyncio
+import os
+import time
+from collections import Counter, deque
+from typing import Dict, Optional
+
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "200"))
+LOG_QUEUE_POLICY = os.getenv("LOG_QUEUE_POLICY", "summarize").lower()  # or "drop-oldest"
+POLICIES = ("summarize", "drop-oldest")
+
+
+class GuildQueue:
+    __slots__ = ("items", "worker", "overflow", "dropped", "processed", "last_lag", "max_lag")
+
+    def __init__(self):
+        self.items = deque()  # (enqueued_at, args)
+        self.worker: Optional[asyncio.Task] = None
+        self.overflow = Counter()  # action -> entries dropped since the last summary
+        self.dropped = 0
+        self.processed = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+
+class LogQueue:
+    def __init__(self, handler, maxsize: int = LOG_QUEUE_SIZE, policy: str = LOG_QUEUE_POLICY):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown LOG_QUEUE_POLICY '{policy}'. Use one of: {', '.join(POLICIES)}")
+        self.handler = handler
+        self.maxsize = maxsize
+        self.policy = policy
+        self._queues: Dict[int, GuildQueue] = {}
+
+    def submit(self, guild, action: str, *args) -> bool:
+        """Queue one entry; returns False if an older entry had to be dropped."""
+        gq = self._queues.get(guild.id)
+        if gq is None:
+            gq = self._queues[guild.id] = GuildQueue()
+        accepted = True
+        if len(gq.items) >= self.maxsize:
+            _, (old_action, *_) = gq.items.popleft()
+            gq.dropped += 1
+            if self.policy == "summarize":
+                gq.overflow[old_action] += 1
+            accepted = False
+        gq.items.append((time.monotonic(), (action, *args)))
+        if gq.worker is None or gq.worker.done():
+            gq.worker = asyncio.ensure_future(self._work(guild, gq))
+        return accepted
+
+    async def _work(self, guild, gq: GuildQueue):
+        while gq.items:
+            if gq.overflow:
+                counts, gq.overflow = gq.overflow, Counter()
+                summary = ", ".join(f"{action} ×{n}" for action, n in counts.most_common())
+                await self._call(guild, ("log_overflow", guild.me, guild.me,
+                                         f"Dropped {sum(counts.values())} log entries during a burst: {summary}"))
+                continue
+            enqueued_at, args = gq.items.popleft()
+            gq.last_lag = time.monotonic() - enqueued_at
+            gq.max_lag = max(gq.max_lag, gq.last_lag)
+            await self._call(guild, args)
+            gq.processed += 1
+
+    async def _call(self, guild, args):
+        try:
+            await self.handler(guild, *args)
+        except Exception as e:
+            print(f"[Logs] Failed to log {args[0]} for guild {guild.id}: {e}")
+
+    def metrics(self, guild_id: int) -> dict:
+        gq = self._queues.get(guild_id) or GuildQueue()
+        oldest = time.monotonic() - gq.items[0][0] if gq.items else 0.0
+        return {
+            "depth": len(gq.items),
+            "oldest": oldest,
+            "last_lag": gq.last_lag,
+            "max_lag": gq.max_lag,
+            "processed": gq.processed,
+            "dropped": gq.dropped,
+        }
+
+    def totals(self) -> dict:
+        return {
+            "guilds": sum(1 for gq in self._queues.values() if gq.items),
+            "depth": sum(len(gq.items) for gq in self._queues.values()),
+            "dropped": sum(gq.dropped for gq in self._queues.values()),
+        }
+
+    async def drain(self):
+        """Wait until every queued entry has been handled."""
+        workers = [gq.worker for gq in self._queues.values() if gq.worker and not gq.worker.done()]
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def forget(self, guild_id: int):
+        gq = self._queues.pop(guild_id, None)
+        if gq and gq.worker:
+            gq.worker.cancel()
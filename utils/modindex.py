@@ -0,0 +1,169 @@
+# utils/modindex.py
+"""
+In-memory inverted indexes over the modlog journal.
+
+Each guild's index lists its entries' journal positions in append order
+and maps target, moderator and action keys to ordinals into that list.
+An index is built by scanning the guild's journal on first search, then
+kept current as entries are appended. Results are positions; entries are
+read back from the journal a page at a time.
+"""
+import bisect
+import heapq
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from utils import aio
+from utils.journal import Journal, Position
+
+MODLOG_INDEX_GUILDS = int(os.getenv("MODLOG_INDEX_GUILDS", "200"))  # indexes kept in memory
+
+
+def _timestamp(entry) -> float:
+    try:
+        return datetime.fromisoformat(entry.get("timestamp", "")).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def user_keys(entry: dict, role: str) -> List[str]:
+    """Index keys for the entry's ``role`` ("target"/"moderator"): its id and its name."""
+    keys = []
+    if entry.get(f"{role}_id") is not None:
+        keys.append(str(entry[f"{role}_id"]))
+    if entry.get(role):
+        keys.append(str(entry[role]).lower())
+    return keys
+
+
+def matches(entry: dict, targets: Optional[Iterable[str]] = None, moderators: Optional[Iterable[str]] = None,
+            action: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None) -> bool:
+    """Whether one entry passes the same filters ``GuildIndex.query`` takes, without an index."""
+    if action is not None and entry.get("action") != action:
+        return False
+    if targets is not None and not set(targets).intersection(user_keys(entry, "target")):
+        return False
+    if moderators is not None and not set(moderators).intersection(user_keys(entry, "moderator")):
+        return False
+    if since is not None or until is not None:
+        ts = _timestamp(entry)
+        if (since is not None and ts < since) or (until is not None and ts > until):
+            return False
+    return True
+
+
+class GuildIndex:
+    __slots__ = ("positions", "times", "targets", "moderators", "actions")
+
+    def __init__(self):
+        self.positions: List[Position] = []
+        self.times: List[float] = []
+        self.targets: Dict[str, List[int]] = {}
+        self.moderators: Dict[str, List[int]] = {}
+        self.actions: Dict[str, List[int]] = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def add(self, position: Position, entry: dict):
+        ordinal = len(self.positions)
+        self.positions.append(position)
+        self.times.append(_timestamp(entry))
+        for key in user_keys(entry, "target"):
+            self.targets.setdefault(key, []).append(ordinal)
+        for key in user_keys(entry, "moderator"):
+            self.moderators.setdefault(key, []).append(ordinal)
+        self.actions.setdefault(str(entry.get("action")), []).append(ordinal)
+
+    @staticmethod
+    def _union(index: Dict[str, List[int]], keys: Iterable[str]) -> List[int]:
+        lists = [index[k] for k in keys if k in index]
+        if len(lists) == 1:
+            return lists[0]
+        merged = []
+        for ordinal in heapq.merge(*lists):
+            if not merged or merged[-1] != ordinal:
+                merged.append(ordinal)
+        return merged
+
+    def query(self, targets: Optional[Iterable[str]] = None, moderators: Optional[Iterable[str]] = None,
+              action: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None) -> List[Position]:
+        """Positions of matching entries, newest first."""
+        lists = []
+        if targets is not None:
+            lists.append(self._union(self.targets, targets))
+        if moderators is not None:
+            lists.append(self._union(self.moderators, moderators))
+        if action is not None:
+            lists.append(self.actions.get(action, []))
+        # Entries are appended in time order, so a time range is a slice of ordinals
+        lo = bisect.bisect_left(self.times, since) if since is not None else 0
+        hi = bisect.bisect_right(self.times, until) if until is not None else len(self.positions)
+        if not lists:
+            return [self.positions[i] for i in range(hi - 1, lo - 1, -1)]
+        lists.sort(key=len)
+        smallest, others = lists[0], lists[1:]
+        matches = []
+        for ordinal in reversed(smallest):
+            if ordinal >= hi:
+                continue
+            if ordinal < lo:
+                break
+            if all(_contains(other, ordinal) for other in others):
+                matches.append(self.positions[ordinal])
+        return matches
+
+
+def _contains(ordinals: List[int], ordinal: int) -> bool:
+    i = bisect.bisect_left(ordinals, ordinal)
+    return i < len(ordinals) and ordinals[i] == ordinal
+
+
+class ModlogIndex:
+    def __init__(self, journal: Journal, max_guilds: int = MODLOG_INDEX_GUILDS):
+        self.journal = journal
+        self.max_guilds = max_guilds
+        self._guilds: "OrderedDict[str, GuildIndex]" = OrderedDict()
+
+    def _build(self, key: str) -> GuildIndex:
+        index = GuildIndex()
+        for position, entry in self.journal.scan(key):
+            index.add(position, entry)
+        return index
+
+    async def get(self, guild_id) -> GuildIndex:
+        key = str(guild_id)
+        index = self._guilds.get(key)
+        if index is None:
+            # Ordered with appends to this guild's journal, so none are missed or doubled
+            index = await aio.run_ordered(self.journal.resource(key), self._build, key)
+            self._guilds[key] = index
+            while len(self._guilds) > self.max_guilds:
+                self._guilds.popitem(last=False)
+        else:
+            self._guilds.move_to_end(key)
+        return index
+
+    def add(self, guild_id, position: Position, entry: dict):
+        index = self._guilds.get(str(guild_id))
+        if index is not None:
+            index.add(position, entry)
+
+    async def search(self, guild_id, **filters) -> List[Position]:
+        return (await self.get(guild_id)).query(**filters)
+
+    async def fetch(self, guild_id, positions: List[Position]) -> List[dict]:
+        """Read entries at ``positions``, skipping any removed by retention."""
+        key = str(guild_id)
+
+        def read():
+            return [self.journal.read_at(key, p) for p in positions]
+
+        entries = await aio.run_ordered(self.journal.resource(key), read)
+        return [e for e in entries if e is not None]
+
+    def reset(self):
+        self._guilds.clear()
@@ -1,28 +1,237 @@
 # utils/modutils.py
-import discord, json, os
+import discord, copy, json, os, time
 from discord.ext import commands
-from typing import Optional
+from typing import Dict, Optional
+from utils import http, storage
+from utils.journal import Journal
+from utils.delivery import EmbedBatcher
+from utils.diffs import FIELD_LIMIT, clip
+from utils.logqueue import LogQueue
+from utils.modindex import ModlogIndex
 
-LOG_FILE = "data/modlogs.json"
-MOD_ROLE_FILE = "data/modroles.json"
+MODROLES = storage.dataset("modroles")
+LOG_CONFIG = storage.dataset("logconfig")
 
-def load_json(file):
-    if not os.path.exists(file):
-        with open(file, "w") as f:
-            json.dump({}, f)
-    with open(file, "r") as f:
-        return json.load(f)
+# Modlog history: append-only per-guild journal under data/modlogs/<guild_id>/
+MODLOG_DIR = "data/modlogs"
+MODLOG_SEGMENT_KB = int(os.getenv("MODLOG_SEGMENT_KB", "1024"))
+MODLOG_RETENTION_DAYS = float(os.getenv("MODLOG_RETENTION_DAYS", "0"))  # 0 keeps history forever
+MODLOG_COMPRESS = os.getenv("MODLOG_COMPRESS", "1") != "0"
+MODLOGS = Journal(MODLOG_DIR, segment_bytes=MODLOG_SEGMENT_KB * 1024)
+MODLOG_INDEX = ModlogIndex(MODLOGS)  # search indexes, built per guild on first search
+LOG_SINKS = ("channel", "webhook")
 
-def save_json(file, data):
-    with open(file, "w") as f:
-        json.dump(data, f, indent=2)
+def import_legacy_history():
+    # One-time import of the history lists that used to live in modlogs.json
+    marker = os.path.join(MODLOG_DIR, ".imported")
+    if os.path.exists(marker):
+        return
+    if os.path.exists(storage.LEGACY_MODLOGS_FILE):
+        try:
+            with open(storage.LEGACY_MODLOGS_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        for guild_id, value in data.items():
+            if isinstance(value, list) and not MODLOGS.segments(guild_id):
+                for entry in value:
+                    MODLOGS.append(guild_id, entry)
+    open(marker, "w").close()
+
+import_legacy_history()
+
+async def compact_modlogs():
+    stats = await MODLOGS.acompact_all(
+        compress=MODLOG_COMPRESS,
+        retention_days=MODLOG_RETENTION_DAYS or None,
+    )
+    if stats["removed"]:
+        MODLOG_INDEX.reset()  # expired segments leave stale positions behind
+    return stats
+
+# Every log action gets one bit; a guild's enabled events compile to a mask
+_EVENT_BITS: Dict[str, int] = {}
+ALL_EVENTS = -1  # every bit set, including actions not registered yet
+
+def event_bit(action: str) -> int:
+    bit = _EVENT_BITS.get(action)
+    if bit is None:
+        bit = _EVENT_BITS[action] = 1 << len(_EVENT_BITS)
+    return bit
+
+def event_mask(*actions: str) -> int:
+    mask = 0
+    for action in actions:
+        mask |= event_bit(action)
+    return mask
+
+# Actions logged by moderation commands rather than gateway listeners
+COMMAND_ACTIONS = ("ban", "unban", "kick", "warn", "mute", "unmute", "timeout", "untimeout", "clear",
+                   "lock", "unlock", "slowmode", "nickname", "roleadd", "roleremove")
+# A burst of voice changes is logged as one voice_update, enabled along with any change it can merge
+VOICE_CHANGES = event_mask("voice_join", "voice_leave", "voice_move", "voice_self_mute", "voice_self_deaf")
+
+class LogConfig:
+    """Parsed log settings for one guild, kept in memory between events."""
+
+    def __init__(self, data: dict):
+        self.data = data
+        self.log_channel = data.get("log_channel")
+        self.embed_color = data.get("embed_color", discord.Color.red().value)
+        self.embed_title = data.get("embed_title", "Mod Action")
+        self.logging_enabled = data.get("logging_enabled", True)
+        enabled = data.get("enabled_events")
+        self.enabled_events = frozenset(enabled) if enabled is not None else None
+        self.event_embeds = data.get("event_embeds", {})
+        self.sink = data.get("sink", "channel")
+        self.voice_digest = data.get("voice_digest", 0)  # minutes between voice summaries, 0 = off
+        self.webhook = data.get("webhook")  # {"id", "token", "channel_id"} of the bot-created log webhook
+        self.archive_channels = frozenset(data.get("archive_channels", []))  # channels whose attachments are archived
+        if not self.logging_enabled:
+            self.mask = 0
+        elif self.enabled_events is None:
+            self.mask = ALL_EVENTS
+        else:
+            self.mask = event_mask(*self.enabled_events)
+            if self.mask & VOICE_CHANGES:
+                self.mask |= event_bit("voice_update")
+
+    def to_dict(self) -> dict:
+        # Commands edit a copy and hand it back to update_log_config
+        return copy.deepcopy(self.data)
+
+    def wants(self, action: str) -> bool:
+        return bool(self.mask & event_bit(action))
+
+    def embed_style(self, action: str):
+        econf = self.event_embeds.get(action, {})
+        return (
+            econf.get("color", self.embed_color),
+            econf.get("title", self.embed_title),
+            econf.get("icon"),
+        )
+
+_log_configs: Dict[int, LogConfig] = {}
+# Event masks outlive the config cache: one int per guild, checked synchronously by listeners
+_event_masks: Dict[int, int] = {}
+
+async def get_log_config(guild_id: int) -> LogConfig:
+    conf = _log_configs.get(guild_id)
+    if conf is None:
+        conf = _log_configs[guild_id] = LogConfig(await LOG_CONFIG.aget(guild_id, {}))
+        _event_masks[guild_id] = conf.mask
+    return conf
+
+async def update_log_config(guild_id: int, data: dict) -> LogConfig:
+    await LOG_CONFIG.aset(guild_id, data)
+    conf = _log_configs[guild_id] = LogConfig(data)
+    _event_masks[guild_id] = conf.mask
+    invalidate_log_channel(guild_id)
+    return conf
+
+async def load_event_masks():
+    for guild_id, data in (await LOG_CONFIG.aall()).items():
+        _event_masks[int(guild_id)] = LogConfig(data).mask
+
+def wants_event(guild_id: int, mask: int) -> bool:
+    """Cheap pre-check for listeners; guilds whose config isn't known yet pass."""
+    return bool(_event_masks.get(guild_id, ALL_EVENTS) & mask)
+
+def combined_event_mask(guild_ids) -> int:
+    mask = 0
+    for guild_id in guild_ids:
+        mask |= _event_masks.get(guild_id, ALL_EVENTS)
+    return mask
+
+def invalidate_log_config(guild_id: Optional[int] = None):
+    if guild_id is None:
+        _log_configs.clear()
+        _event_masks.clear()
+    else:
+        _log_configs.pop(guild_id, None)
+        _event_masks.pop(guild_id, None)
+    invalidate_log_channel(guild_id)
 
-mod_roles = load_json(MOD_ROLE_FILE)
-modlogs = load_json(LOG_FILE)
+# guild id -> id of the resolved log channel, or None if the guild has none
+_log_channels: Dict[int, Optional[int]] = {}
 
-def is_mod_user(user: discord.Member):
+def resolve_log_channel(guild: discord.Guild, conf: LogConfig) -> Optional[discord.TextChannel]:
+    if guild.id in _log_channels:
+        channel_id = _log_channels[guild.id]
+        return guild.get_channel(channel_id) if channel_id else None
+    channel = guild.get_channel(conf.log_channel) if conf.log_channel else None
+    if not channel:
+        channel = discord.utils.get(guild.text_channels, name="mod-logs")
+    if not isinstance(channel, discord.TextChannel):
+        channel = None
+    _log_channels[guild.id] = channel.id if channel else None
+    return channel
+
+def invalidate_log_channel(guild_id: Optional[int] = None):
+    if guild_id is None:
+        _log_channels.clear()
+    else:
+        _log_channels.pop(guild_id, None)
+
+# guild id -> (channel id, webhook) for guilds delivering logs through a webhook
+_webhooks: Dict[int, tuple] = {}
+# channel id -> when creating a webhook there may be tried again; until then logs go to the channel
+_webhook_failures: Dict[int, float] = {}
+WEBHOOK_RETRY_SECONDS = float(os.getenv("WEBHOOK_RETRY_SECONDS", "600"))
+
+async def get_log_webhook(channel: discord.TextChannel, conf: LogConfig) -> Optional[discord.Webhook]:
+    cached = _webhooks.get(channel.guild.id)
+    if cached and cached[0] == channel.id:
+        return cached[1]
+    data = conf.webhook
+    if not data or data.get("channel_id") != channel.id:
+        if _webhook_failures.get(channel.id, 0) > time.monotonic():
+            return None
+        try:
+            created = await channel.create_webhook(name="Mod Logs", reason="Log delivery")
+        except discord.HTTPException as e:
+            # Usually missing Manage Webhooks or the channel's webhook limit; don't retry every batch
+            _webhook_failures[channel.id] = time.monotonic() + WEBHOOK_RETRY_SECONDS
+            print(f"[Logs] Could not create a log webhook in {channel.id}: {e}")
+            return None
+        _webhook_failures.pop(channel.id, None)
+        data = {"id": created.id, "token": created.token, "channel_id": channel.id}
+        updated = conf.to_dict()
+        updated["webhook"] = data
+        await update_log_config(channel.guild.id, updated)
+    hook = discord.Webhook.partial(data["id"], data["token"], session=http.get_session())
+    _webhooks[channel.guild.id] = (channel.id, hook)
+    return hook
+
+async def forget_log_webhook(guild_id: int):
+    _webhooks.pop(guild_id, None)
+    conf = (await get_log_config(guild_id)).to_dict()
+    if conf.pop("webhook", None) is not None:
+        await update_log_config(guild_id, conf)
+
+async def send_log_embeds(channel: discord.TextChannel, embeds, files=None):
+    # Webhooks have their own rate limits, so log floods don't slow down moderation
+    conf = await get_log_config(channel.guild.id)
+    if conf.sink == "webhook":
+        hook = await get_log_webhook(channel, conf)
+        if hook:
+            me = channel.guild.me
+            try:
+                await hook.send(embeds=embeds, files=files or [], username=me.display_name, avatar_url=me.display_avatar.url)
+                return
+            except discord.NotFound:
+                # Webhook was deleted; a new one is created on the next batch
+                await forget_log_webhook(channel.guild.id)
+                for f in files or []:
+                    f.reset()
+    await channel.send(embeds=embeds, files=files or [])
+
+# Log embeds are packed into multi-embed messages per log channel
+LOG_BATCHER = EmbedBatcher(send_log_embeds)
+
+async def is_mod_user(user: discord.Member):
     # Check if user has a mod role set by admin
-    mod_roles = load_json("data/modroles.json").get(str(user.guild.id), [])
+    mod_roles = await MODROLES.aget(user.guild.id, [])
     has_mod_role = any(role.id in mod_roles for role in user.roles)
     # Check if user has any of the default Discord mod permissions
     perms = user.guild_permissions
@@ -31,58 +240,51 @@ def is_mod_user(user: discord.Member):
 
 
 from typing import Union
-async def log_mod_action(guild: discord.Guild, action: str, moderator: discord.Member, target: Union[discord.Member, discord.User], reason: Optional[str]=None):
+async def log_mod_action(guild: discord.Guild, action: str, moderator: discord.Member, target: Union[discord.Member, discord.User], reason: Optional[str]=None, file: Optional[discord.File]=None, wait: bool=False):
+    # Commands call this directly and must not stall behind a log flood; only the
+    # LOG_QUEUE worker passes wait=True and waits for the log channel to catch up
     entry = {
         "action": action,
         "moderator": str(moderator),
         "target": str(target),
         "reason": reason or "No reason provided",
-        "timestamp": discord.utils.utcnow().isoformat()
+        "timestamp": discord.utils.utcnow().isoformat(),
+        "moderator_id": getattr(moderator, "id", None),
+        "target_id": getattr(target, "id", None),
     }
-    # Save to logs (for history)
-    logs = modlogs.setdefault(str(guild.id), [])
-    logs.append(entry)
-    save_json(LOG_FILE, modlogs)
-
-    # Load config for this guild
-    log_channel_id = None
-    embed_color = discord.Color.red().value
-    embed_title = "Mod Action"
-    embed_icon = None
-    logging_enabled = True
-    enabled_events = None
-    try:
-        with open(LOG_FILE, "r") as f:
-            logdata = json.load(f)
-        conf = logdata.get(str(guild.id), {})
-        log_channel_id = conf.get("log_channel")
-        embed_color = conf.get("embed_color", embed_color)
-        embed_title = conf.get("embed_title", embed_title)
-        logging_enabled = conf.get("logging_enabled", True)
-        enabled_events = conf.get("enabled_events")
-        # Per-event embed customization
-        event_embeds = conf.get("event_embeds", {})
-        if action in event_embeds:
-            econf = event_embeds[action]
-            embed_color = econf.get("color", embed_color)
-            embed_title = econf.get("title", embed_title)
-            embed_icon = econf.get("icon")
-    except Exception:
-        pass
-    # Check if logging is enabled and event is enabled
-    if not logging_enabled:
+    # Cached config for this guild; disabled events are neither stored nor sent
+    conf = await get_log_config(guild.id)
+    if not conf.wants(action):
         return
-    if enabled_events is not None and action not in enabled_events:
-        return
-    channel = None
-    if log_channel_id:
-        channel = guild.get_channel(log_channel_id)
-    if not channel:
-        channel = discord.utils.get(guild.text_channels, name="mod-logs")
-    if channel and isinstance(channel, discord.TextChannel):
-        embed = discord.Embed(title=embed_title, color=embed_color)
+    # Save to logs (for history)
+    position = await MODLOGS.aappend(guild.id, entry)
+    MODLOG_INDEX.add(guild.id, position, entry)
+
+    # Per-event embed customization
+    embed_color, embed_title, embed_icon = conf.embed_style(action)
+    channel = resolve_log_channel(guild, conf)
+    if channel:
+        embed = discord.Embed(title=clip(embed_title, 256), color=embed_color)
         if embed_icon:
             embed.set_thumbnail(url=embed_icon)
         for k, v in entry.items():
-            embed.add_field(name=k.title(), value=v, inline=False)
-        await channel.send(embed=embed)
+            if k.endswith("_id"):
+                continue
+            embed.add_field(name=k.title(), value=clip(str(v), FIELD_LIMIT), inline=False)
+        if wait:
+            # Keeps a slow channel's backlog in LOG_QUEUE, where its overflow policy applies
+            await LOG_BATCHER.wait_for_room(channel)
+        LOG_BATCHER.add(channel, embed, file)
+
+async def _log_queued(guild, action, moderator, target, reason=None, file=None):
+    await log_mod_action(guild, action, moderator, target, reason, file, wait=True)
+
+
+# Gateway listeners queue entries instead of awaiting delivery
+LOG_QUEUE = LogQueue(_log_queued)
+
+def queue_mod_action(guild: discord.Guild, action: str, moderator, target, reason: Optional[str] = None,
+                     file: Optional[discord.File] = None) -> bool:
+    if not wants_event(guild.id, event_bit(action)):
+        return False
+    return LOG_QUEUE.submit(guild, action, moderator, target, reason, file)
@@ -0,0 +1,135 @@
+# utils/msgcache.py
+"""
+Compact content cache for delete/edit logging.
+
+discord.py only reports deletes and edits for messages still in its own
+cache. This keeps just what the logs need for recent messages, keyed by
+message id, with a size cap per guild and a TTL. Raw gateway events look
+messages up here.
+"""
+import io
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MSGCACHE_PER_GUILD = int(os.getenv("MSGCACHE_PER_GUILD", "5000"))
+MSGCACHE_TTL_HOURS = float(os.getenv("MSGCACHE_TTL_HOURS", "24"))
+MSGCACHE_CONTENT_CHARS = int(os.getenv("MSGCACHE_CONTENT_CHARS", "2000"))
+
+
+class CachedMessage:
+    __slots__ = ("id", "channel_id", "author_id", "author", "content", "attachments", "created")
+
+    def __init__(self, id: int, channel_id: int, author_id: int, author: str, content: str,
+                 attachments: Tuple[Tuple[str, int, str], ...], created: float):
+        self.id = id
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.author = author  # display string, e.g. "name" or "name#1234"
+        self.content = content
+        self.attachments = attachments  # (filename, size, url)
+        self.created = created
+
+    @classmethod
+    def from_message(cls, message, max_chars: int = MSGCACHE_CONTENT_CHARS) -> "CachedMessage":
+        return cls(
+            message.id,
+            message.channel.id,
+            message.author.id,
+            str(message.author),
+            message.content[:max_chars],
+            tuple((a.filename, a.size, a.url) for a in message.attachments),
+            time.time(),
+        )
+
+
+class MessageCache:
+    def __init__(self, per_guild: int = MSGCACHE_PER_GUILD, ttl_hours: float = MSGCACHE_TTL_HOURS,
+                 max_chars: int = MSGCACHE_CONTENT_CHARS):
+        self.per_guild = per_guild
+        self.ttl = ttl_hours * 3600
+        self.max_chars = max_chars
+        self._guilds: Dict[int, "OrderedDict[int, CachedMessage]"] = {}
+
+    def __len__(self):
+        return sum(len(msgs) for msgs in self._guilds.values())
+
+    def add(self, message) -> CachedMessage:
+        msgs = self._guilds.get(message.guild.id)
+        if msgs is None:
+            msgs = self._guilds[message.guild.id] = OrderedDict()
+        record = msgs[message.id] = CachedMessage.from_message(message, self.max_chars)
+        while len(msgs) > self.per_guild:
+            msgs.popitem(last=False)
+        return record
+
+    def get(self, guild_id: int, message_id: int) -> Optional[CachedMessage]:
+        msgs = self._guilds.get(guild_id)
+        return msgs.get(message_id) if msgs else None
+
+    def pop(self, guild_id: int, message_id: int) -> Optional[CachedMessage]:
+        msgs = self._guilds.get(guild_id)
+        return msgs.pop(message_id, None) if msgs else None
+
+    def pop_many(self, guild_id: int, message_ids: Iterable[int]) -> List[CachedMessage]:
+        """Cached records for ``message_ids``, oldest first."""
+        msgs = self._guilds.get(guild_id)
+        if not msgs:
+            return []
+        found = [msgs.pop(mid) for mid in message_ids if mid in msgs]
+        found.sort(key=lambda r: r.id)  # snowflakes sort by creation time
+        return found
+
+    def update_content(self, guild_id: int, message_id: int, content: str):
+        record = self.get(guild_id, message_id)
+        if record:
+            record.content = content[:self.max_chars]
+
+    def expire(self) -> int:
+        """Drop records older than the TTL; returns how many were dropped."""
+        cutoff = time.time() - self.ttl
+        dropped = 0
+        for guild_id, msgs in list(self._guilds.items()):
+            while msgs:
+                oldest = next(iter(msgs.values()))
+                if oldest.created >= cutoff:
+                    break
+                msgs.popitem(last=False)
+                dropped += 1
+            if not msgs:
+                del self._guilds[guild_id]
+        return dropped
+
+    def forget(self, guild_id: int):
+        self._guilds.pop(guild_id, None)
+
+
+def _snowflake_time(snowflake: int) -> datetime:
+    return datetime.fromtimestamp(((snowflake >> 22) + 1420070400000) / 1000, tz=timezone.utc)
+
+
+def write_transcript(records: List[CachedMessage], message_ids: Iterable[int], header: str) -> io.BytesIO:
+    """Plain-text transcript of a bulk delete, written line by line into memory."""
+    buffer = io.BytesIO()
+    cached = {r.id for r in records}
+    missing = sorted(mid for mid in message_ids if mid not in cached)
+
+    def write(line=""):
+        buffer.write(line.encode("utf-8") + b"\n")
+
+    write(header)
+    write(f"{len(records) + len(missing)} messages deleted, {len(records)} with cached content")
+    write()
+    for r in records:
+        write(f"[{_snowflake_time(r.id):%Y-%m-%d %H:%M:%S}] {r.author} ({r.author_id}): {r.content}")
+        for name, size, url in r.attachments:
+            write(f"    attachment: {name} ({size} bytes) {url}")
+    if missing:
+        write()
+        write("Not cached:")
+        for mid in missing:
+            write(f"[{_snowflake_time(mid):%Y-%m-%d %H:%M:%S}] message {mid}")
+    buffer.seek(0)
+    return buffer
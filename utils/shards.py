@@ -0,0 +1,123 @@
+# utils/shards.py
+"""
+Lazy per-guild views of a storage dataset.
+
+A shard (one guild's record) is loaded the first time it is asked for.
+Loaded shards are kept in LRU order; once their estimated size goes over
+the budget the least recently used ones are written back (if dirty) and
+dropped from memory.
+"""
+import asyncio
+import copy
+import json
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Set
+from utils import aio
+from utils.storage import Dataset
+
+
+def estimate_size(value) -> int:
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+class ShardCache:
+    def __init__(self, dataset: Dataset, budget_bytes: int,
+                 on_evict: Optional[Callable[[str, dict], None]] = None):
+        self.dataset = dataset
+        self.budget_bytes = budget_bytes
+        self.on_evict = on_evict  # called with (key, shard) just before a shard is dropped
+        self._shards: "OrderedDict[str, dict]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._dirty: Set[str] = set()
+        self._loading: Dict[str, asyncio.Task] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._shards)
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def peek(self, guild_id) -> Optional[dict]:
+        """The shard if it is already in memory, without loading it."""
+        return self._shards.get(str(guild_id))
+
+    def size(self, guild_id) -> int:
+        """Estimated size of a resident shard as of its last load or write."""
+        return self._sizes.get(str(guild_id), 0)
+
+    async def get(self, guild_id) -> dict:
+        key = str(guild_id)
+        shard = self._shards.get(key)
+        if shard is not None:
+            self._shards.move_to_end(key)
+            return shard
+        task = self._loading.get(key)
+        if task is None:
+            task = self._loading[key] = asyncio.ensure_future(self._load(key))
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._loading.pop(key, None)
+
+    async def _load(self, key: str) -> dict:
+        shard = await self.dataset.aget(key, {})
+        # Measured before it's published; nothing can be changing it yet
+        self._sizes[key] = await aio.run(estimate_size, shard)
+        self._shards[key] = shard
+        self.loads += 1
+        await self._evict(keep=key)
+        return shard
+
+    def mark_dirty(self, guild_id):
+        self._dirty.add(str(guild_id))
+
+    async def flush(self, guild_ids: Optional[Iterable] = None):
+        """Write dirty shards back to the dataset (all of them by default)."""
+        keys = self._dirty if guild_ids is None else {str(g) for g in guild_ids} & self._dirty
+        keys = [k for k in keys if k in self._shards]
+        if not keys:
+            return
+        # Snapshot on the event loop: listeners keep changing the live shards
+        # while the write (and the size estimate) run on the I/O pool
+        live = {k: self._shards[k] for k in keys}
+        batch = copy.deepcopy(live)
+        self._dirty.difference_update(keys)
+        try:
+            await self.dataset.aset_many(batch, copied=True)
+        except Exception:
+            self._dirty.update(keys)
+            raise
+        sizes = await aio.run(lambda: {k: estimate_size(v) for k, v in batch.items()})
+        for key, shard in live.items():
+            if self._shards.get(key) is shard:
+                self._sizes[key] = sizes[key]
+
+    async def _evict(self, keep: Optional[str] = None):
+        if self.resident_bytes <= self.budget_bytes:
+            return
+        for key in list(self._shards):
+            if self.resident_bytes <= self.budget_bytes:
+                break
+            if key == keep:
+                continue
+            if key in self._dirty:
+                await self.flush([key])
+            # A listener may have touched the shard while it was being written.
+            if key in self._dirty or key not in self._shards:
+                continue
+            if self.on_evict:
+                self.on_evict(key, self._shards[key])
+            del self._shards[key]
+            del self._sizes[key]
+            self.evictions += 1
+
+    def drop(self, guild_id):
+        """Forget a shard without writing it (e.g. the guild removed the bot)."""
+        key = str(guild_id)
+        self._shards.pop(key, None)
+        self._sizes.pop(key, None)
+        self._dirty.discard(key)
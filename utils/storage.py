@@ -0,0 +1,676 @@
+# utils/storage.py
+"""
+Shared persistence layer for every cog.
+
+Data is organised in named datasets. A dataset holds keyed records
+(``set``/``get``/``delete``) and optional append-only record lists per key
+(``append``/``records``). Values must be JSON serialisable.
+
+The engine is picked with the ``STORAGE_BACKEND`` environment variable:
+``sqlite`` (default, WAL mode) or ``json`` (one document per dataset).
+``STORAGE_CODECS`` picks the value encoding per dataset, e.g.
+``stats=msgpack,warnings=msgpack``; unlisted datasets stay JSON.
+"""
+import atexit
+import copy
+import json
+import os
+import sqlite3
+import threading
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+from utils import aio
+
+try:
+    import msgpack
+except ImportError:  # optional, only needed by datasets configured to use it
+    msgpack = None
+
+DATA_DIR = "data"
+DB_FILE = os.path.join(DATA_DIR, "bot.db")
+JSON_DIR = os.path.join(DATA_DIR, "store")
+
+# Datasets that used to live in their own JSON file, imported once on first start.
+LEGACY_FILES = {
+    "modroles": "data/modroles.json",
+    "muteroles": "data/muteroles.json",
+    "active_mutes": "data/active_mutes.json",
+    "warnings": "data/warnings.json",
+    "stats": "data/stats.json",
+    "stats_ignored": "data/ignored_channels.json",
+    "giveaways": "giveaways.json",
+    "birthdays": "data/birthdays.json",
+    "birthday_config": "data/birthday_config.json",
+    "birthday_embeds": "data/birthday_embeds.json",
+    "welcome_config": "data/welcome_config.json",
+    "customroles": "data/customroles.json",
+    "boostconfig": "boostconfig.json",
+    "prefixes": "data/prefixes.json",
+    "noprefix": "data/noprefix.json",
+}
+# modlogs.json mixed per-guild history lists with per-guild log config dicts.
+LEGACY_MODLOGS_FILE = "data/modlogs.json"
+META = "_meta"
+
+# Write-behind tuning for the JSON backend: a flush happens every
+# FLUSH_INTERVAL seconds, or sooner once FLUSH_MAX_PENDING changes queue up.
+FLUSH_INTERVAL = float(os.getenv("STORAGE_FLUSH_INTERVAL", "2"))
+FLUSH_MAX_PENDING = int(os.getenv("STORAGE_FLUSH_MAX_PENDING", "500"))
+
+CODECS = ("json", "msgpack")
+# Binary values start with a tag byte; untagged text is JSON, so data written
+# before a dataset switched codec keeps reading back transparently.
+MSGPACK_TAG = b"\x01"
+
+
+def _parse_codecs(spec: str) -> Dict[str, str]:
+    codecs = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, codec = item.partition("=")
+        codec = codec.strip().lower()
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec '{codec}' for dataset '{name}'. Use one of: {', '.join(CODECS)}")
+        codecs[name.strip()] = codec
+    return codecs
+
+DATASET_CODECS = _parse_codecs(os.getenv("STORAGE_CODECS", ""))
+if msgpack is None and "msgpack" in DATASET_CODECS.values():
+    print("[Storage] msgpack is not installed; datasets configured for it will be written as JSON")
+
+
+def codec_for(dataset: str) -> str:
+    codec = DATASET_CODECS.get(dataset.split(".")[0], "json")
+    return "json" if codec == "msgpack" and msgpack is None else codec
+
+
+def load_json(file):
+    if not os.path.exists(file):
+        with open(file, "w") as f:
+            json.dump({}, f)
+    with open(file, "r") as f:
+        return json.load(f)
+
+def save_json(file, data):
+    atomic_write(file, json.dumps(data, indent=2))
+
+def atomic_write(path, data):
+    # Write a sibling temp file and swap it in, so a crash never leaves a truncated file.
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class WriteBehind:
+    """
+    Coalesces whole-document writes. Callers mark a document dirty; a
+    background thread writes each dirty document at most once per flush.
+    """
+
+    def __init__(self, lock, interval: float = FLUSH_INTERVAL, max_pending: int = FLUSH_MAX_PENDING):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._doc_lock = lock  # held while a document is serialised
+        self._flush_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._dirty: Dict[str, Tuple[Any, Any, Optional[str]]] = {}
+        self._pending = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="storage-writebehind", daemon=True)
+        self._thread.start()
+
+    def mark(self, path: str, doc: Any, encode=None, replaces: Optional[str] = None) -> None:
+        """Queue ``doc`` for ``path``; ``replaces`` is removed once it is written."""
+        with self._cond:
+            self._dirty[path] = (doc, encode or _encode_document, replaces)
+            self._pending += 1
+            if self._pending >= self.max_pending:
+                self._cond.notify()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._cond:
+                dirty, self._dirty = self._dirty, {}
+                self._pending = 0
+            failed = None
+            for path, entry in dirty.items():
+                doc, encode, replaces = entry
+                try:
+                    with self._doc_lock:
+                        data = encode(doc)
+                    atomic_write(path, data)
+                    if replaces and os.path.exists(replaces):
+                        os.remove(replaces)
+                except Exception as e:
+                    # Keep it dirty (unless re-marked meanwhile) so the next flush retries
+                    with self._cond:
+                        if path not in self._dirty:
+                            self._dirty[path] = entry
+                            self._pending += 1
+                    failed = failed or e
+            if failed is not None:
+                raise failed
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"[Storage] Final write-behind flush failed: {e!r}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and self._pending < self.max_pending:
+                    self._cond.wait(self.interval)
+                closed = self._closed
+            if closed:
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[Storage] Write-behind flush failed: {e!r}")
+
+
+def _encode(value, codec="json"):
+    if codec == "msgpack":
+        return MSGPACK_TAG + msgpack.packb(value)
+    return json.dumps(value, separators=(",", ":"))
+
+def _decode(raw):
+    if isinstance(raw, bytes):
+        if raw[:1] == MSGPACK_TAG:
+            if msgpack is None:
+                raise RuntimeError("Stored value is msgpack-encoded but msgpack is not installed")
+            return msgpack.unpackb(raw[1:], strict_map_key=False)
+        raw = raw.decode("utf-8")
+    return json.loads(raw)
+
+def _encode_document(doc):
+    return json.dumps(doc, indent=2)
+
+
+class StorageBackend:
+    """Interface implemented by every storage engine. All methods are blocking.
+
+    ``set``, ``set_many`` and ``append`` take ownership of the values they are
+    given: a backend may keep them and read them later from another thread,
+    so callers must not mutate them afterwards (``Dataset`` hands over copies).
+    """
+
+    def resource(self, dataset: str) -> str:
+        """Name of the file backing ``dataset``; async calls on it run in order."""
+        raise NotImplementedError
+
+    def get(self, dataset: str, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, dataset: str, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def set_many(self, dataset: str, items: Dict[str, Any]) -> None:
+        for key, value in items.items():
+            self.set(dataset, key, value)
+
+    def delete(self, dataset: str, key: str) -> None:
+        raise NotImplementedError
+
+    def items(self, dataset: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def keys(self, dataset: str) -> List[str]:
+        return list(self.items(dataset))
+
+    def append(self, dataset: str, key: str, record: Any) -> None:
+        raise NotImplementedError
+
+    def records(self, dataset: str, key: str, limit: Optional[int] = None) -> List[Any]:
+        """Records for ``key`` oldest first; with ``limit`` only the latest ``limit``."""
+        raise NotImplementedError
+
+    def is_empty(self, dataset: str) -> bool:
+        raise NotImplementedError
+
+    def datasets(self) -> List[str]:
+        raise NotImplementedError
+
+    def recode(self, dataset: str) -> Tuple[int, int]:
+        """Rewrite ``dataset`` in its configured codec. Returns bytes before and after."""
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Block until every write made so far is on disk."""
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBackend(StorageBackend):
+    """Single SQLite database in WAL mode; every key is its own row."""
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " dataset TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " PRIMARY KEY (dataset, key)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " dataset TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS records_key ON records (dataset, key, id)")
+
+    def resource(self, dataset):
+        # One connection serves every dataset, so all calls share one queue.
+        return self.path
+
+    def get(self, dataset, key, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE dataset = ? AND key = ?", (dataset, key)
+            ).fetchone()
+        return _decode(row[0]) if row else default
+
+    def set(self, dataset, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (dataset, key, value) VALUES (?, ?, ?)",
+                (dataset, key, _encode(value, codec_for(dataset))),
+            )
+
+    def set_many(self, dataset, items):
+        codec = codec_for(dataset)
+        rows = [(dataset, key, _encode(value, codec)) for key, value in items.items()]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO kv (dataset, key, value) VALUES (?, ?, ?)", rows
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def delete(self, dataset, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE dataset = ? AND key = ?", (dataset, key))
+
+    def items(self, dataset):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM kv WHERE dataset = ?", (dataset,)
+            ).fetchall()
+        return {key: _decode(value) for key, value in rows}
+
+    def keys(self, dataset):
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM kv WHERE dataset = ?", (dataset,)).fetchall()
+        return [key for (key,) in rows]
+
+    def append(self, dataset, key, record):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO records (dataset, key, value) VALUES (?, ?, ?)",
+                (dataset, key, _encode(record, codec_for(dataset))),
+            )
+
+    def records(self, dataset, key, limit=None):
+        with self._lock:
+            if limit is None:
+                rows = self._conn.execute(
+                    "SELECT value FROM records WHERE dataset = ? AND key = ? ORDER BY id",
+                    (dataset, key),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT value FROM records WHERE dataset = ? AND key = ? ORDER BY id DESC LIMIT ?",
+                    (dataset, key, limit),
+                ).fetchall()
+                rows.reverse()
+        return [_decode(value) for (value,) in rows]
+
+    def is_empty(self, dataset):
+        with self._lock:
+            kv = self._conn.execute("SELECT 1 FROM kv WHERE dataset = ? LIMIT 1", (dataset,)).fetchone()
+            rec = self._conn.execute("SELECT 1 FROM records WHERE dataset = ? LIMIT 1", (dataset,)).fetchone()
+        return kv is None and rec is None
+
+    def datasets(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT dataset FROM kv UNION SELECT DISTINCT dataset FROM records").fetchall()
+        return [name for (name,) in rows]
+
+    def _size(self, dataset):
+        return sum(
+            self._conn.execute(
+                f"SELECT COALESCE(SUM(LENGTH(CAST(value AS BLOB))), 0) FROM {table} WHERE dataset = ?", (dataset,)
+            ).fetchone()[0]
+            for table in ("kv", "records")
+        )
+
+    def recode(self, dataset):
+        codec = codec_for(dataset)
+        with self._lock:
+            before = self._size(dataset)
+            kv = self._conn.execute("SELECT key, value FROM kv WHERE dataset = ?", (dataset,)).fetchall()
+            recs = self._conn.execute("SELECT id, value FROM records WHERE dataset = ?", (dataset,)).fetchall()
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "UPDATE kv SET value = ? WHERE dataset = ? AND key = ?",
+                    [(_encode(_decode(value), codec), dataset, key) for key, value in kv],
+                )
+                self._conn.executemany(
+                    "UPDATE records SET value = ? WHERE id = ?",
+                    [(_encode(_decode(value), codec), rid) for rid, value in recs],
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return before, self._size(dataset)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JSONBackend(StorageBackend):
+    """One JSON document per dataset under ``data/store``, written behind."""
+
+    def __init__(self, root: str = JSON_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._docs: Dict[str, dict] = {}
+        self._writer = WriteBehind(self._lock)
+
+    def _path(self, name, codec=None):
+        codec = codec or codec_for(name)
+        return os.path.join(self.root, f"{name}.{'msgpack' if codec == 'msgpack' else 'json'}")
+
+    def _other_path(self, name):
+        return self._path(name, "json" if codec_for(name) == "msgpack" else "msgpack")
+
+    def resource(self, dataset):
+        return self._path(dataset)
+
+    def _doc(self, name):
+        doc = self._docs.get(name)
+        if doc is None:
+            doc = {}
+            # Fall back to the file left by the dataset's previous codec
+            for path in (self._path(name), self._other_path(name)):
+                if os.path.exists(path):
+                    if path.endswith(".msgpack"):
+                        with open(path, "rb") as f:
+                            doc = _decode(f.read())
+                    else:
+                        doc = load_json(path)
+                    break
+            self._docs[name] = doc
+        return doc
+
+    def _save(self, name):
+        if codec_for(name) == "msgpack":
+            encode = partial(_encode, codec="msgpack")
+        else:
+            encode = _encode_document
+        self._writer.mark(self._path(name), self._docs[name], encode, replaces=self._other_path(name))
+
+    # Documents are serialised on the writer thread. Reads return copies made
+    # under the lock; writes keep the (already copied, see StorageBackend)
+    # values they are handed, so no caller shares a live reference.
+
+    def get(self, dataset, key, default=None):
+        with self._lock:
+            return copy.deepcopy(self._doc(dataset).get(key, default))
+
+    def set(self, dataset, key, value):
+        with self._lock:
+            self._doc(dataset)[key] = value
+            self._save(dataset)
+
+    def set_many(self, dataset, items):
+        with self._lock:
+            self._doc(dataset).update(items)
+            self._save(dataset)
+
+    def delete(self, dataset, key):
+        with self._lock:
+            if self._doc(dataset).pop(key, None) is not None:
+                self._save(dataset)
+
+    def items(self, dataset):
+        with self._lock:
+            return copy.deepcopy(self._doc(dataset))
+
+    def keys(self, dataset):
+        with self._lock:
+            return list(self._doc(dataset))
+
+    def append(self, dataset, key, record):
+        name = f"{dataset}.records"
+        with self._lock:
+            self._doc(name).setdefault(key, []).append(record)
+            self._save(name)
+
+    def records(self, dataset, key, limit=None):
+        with self._lock:
+            recs = copy.deepcopy(self._doc(f"{dataset}.records").get(key, []))
+        return recs if limit is None else recs[-limit:]
+
+    def is_empty(self, dataset):
+        with self._lock:
+            return not self._doc(dataset) and not self._doc(f"{dataset}.records")
+
+    def datasets(self):
+        names = set()
+        for filename in os.listdir(self.root):
+            name, ext = os.path.splitext(filename)
+            if ext in (".json", ".msgpack"):
+                names.add(name.split(".")[0])
+        return sorted(names)
+
+    def _files_size(self, dataset):
+        paths = [self._path(name, codec) for name in (dataset, f"{dataset}.records") for codec in CODECS]
+        return sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+
+    def recode(self, dataset):
+        before = self._files_size(dataset)
+        with self._lock:
+            for name in (dataset, f"{dataset}.records"):
+                if os.path.exists(self._path(name)) or os.path.exists(self._other_path(name)):
+                    self._doc(name)
+                    self._save(name)
+        self._writer.flush()
+        return before, self._files_size(dataset)
+
+    def flush(self):
+        self._writer.flush()
+
+    def close(self):
+        self._writer.close()
+
+
+BACKENDS = {
+    "sqlite": SQLiteBackend,
+    "json": JSONBackend,
+}
+
+
+def migrate_legacy(backend: StorageBackend) -> None:
+    """Import the pre-storage JSON files into ``backend``. Runs once per dataset."""
+    for name, path in LEGACY_FILES.items():
+        marker = f"migrated:{name}"
+        if backend.get(META, marker) or not os.path.exists(path):
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        # noprefix.json / ignored_channels.json were plain lists of ids
+        if isinstance(data, list):
+            data = {str(item): True for item in data}
+        if data and backend.is_empty(name):
+            backend.set_many(name, {str(k): v for k, v in data.items()})
+        backend.set(META, marker, True)
+
+    # History lists are imported into the modlog journal by utils.modutils.
+    marker = "migrated:logconfig"
+    if not backend.get(META, marker) and os.path.exists(LEGACY_MODLOGS_FILE):
+        try:
+            with open(LEGACY_MODLOGS_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if backend.is_empty("logconfig"):
+            for guild_id, value in data.items():
+                if isinstance(value, dict):
+                    backend.set("logconfig", str(guild_id), value)
+        backend.set(META, marker, True)
+
+
+_store: Optional[StorageBackend] = None
+_store_lock = threading.Lock()
+
+def get_store() -> StorageBackend:
+    global _store
+    with _store_lock:
+        if _store is None:
+            kind = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+            if kind not in BACKENDS:
+                raise ValueError(f"Unknown STORAGE_BACKEND '{kind}'. Use one of: {', '.join(BACKENDS)}")
+            _store = BACKENDS[kind]()
+            migrate_legacy(_store)
+        return _store
+
+def close() -> None:
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
+
+# Pending writes are flushed on interpreter exit even if the bot didn't shut down cleanly.
+atexit.register(close)
+
+
+class Dataset:
+    """Typed handle on one dataset. Keys are stored as strings.
+
+    Values are copied on the caller's thread before they reach the backend,
+    which keeps them (see ``StorageBackend``). The coroutine variants copy on
+    the event loop before the call moves to the I/O pool, so a caller that
+    keeps mutating its object can't race the write.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @property
+    def backend(self) -> StorageBackend:
+        return get_store()
+
+    def get(self, key, default=None):
+        return self.backend.get(self.name, str(key), default)
+
+    def set(self, key, value):
+        self._set(key, copy.deepcopy(value))
+
+    def _set(self, key, value):
+        self.backend.set(self.name, str(key), value)
+
+    def set_many(self, items: dict):
+        self._set_many(copy.deepcopy(items))
+
+    def _set_many(self, items: dict):
+        self.backend.set_many(self.name, {str(k): v for k, v in items.items()})
+
+    def delete(self, key):
+        self.backend.delete(self.name, str(key))
+
+    def all(self) -> dict:
+        return self.backend.items(self.name)
+
+    def keys(self) -> list:
+        return self.backend.keys(self.name)
+
+    def append(self, key, record):
+        self._append(key, copy.deepcopy(record))
+
+    def _append(self, key, record):
+        self.backend.append(self.name, str(key), record)
+
+    def records(self, key, limit: Optional[int] = None) -> list:
+        return self.backend.records(self.name, str(key), limit)
+
+    def update(self, key, fn, default=None):
+        """Replace ``key``'s value with ``fn(value)``; a result of None deletes the key."""
+        value = fn(self.get(key, default))
+        if value is None:
+            self.delete(key)
+        else:
+            self._set(key, copy.deepcopy(value))
+        return value
+
+    def flush(self):
+        self.backend.flush()
+
+    # Coroutine variants run on the shared I/O pool, in order per backing file.
+    async def _run(self, fn, *args):
+        return await aio.run_ordered(self.backend.resource(self.name), fn, *args)
+
+    async def aget(self, key, default=None):
+        return await self._run(self.get, key, default)
+
+    async def aset(self, key, value):
+        await self._run(self._set, key, copy.deepcopy(value))
+
+    async def aset_many(self, items: dict, copied: bool = False):
+        """``copied=True`` hands over ``items`` as is, for callers that already made a private copy."""
+        await self._run(self._set_many, items if copied else copy.deepcopy(items))
+
+    async def adelete(self, key):
+        await self._run(self.delete, key)
+
+    async def aall(self) -> dict:
+        return await self._run(self.all)
+
+    async def akeys(self) -> list:
+        return await self._run(self.keys)
+
+    async def aappend(self, key, record):
+        await self._run(self._append, key, copy.deepcopy(record))
+
+    async def arecords(self, key, limit: Optional[int] = None) -> list:
+        return await self._run(self.records, key, limit)
+
+    async def aupdate(self, key, fn, default=None):
+        # One queued call, so no other async access to the dataset lands between the read and the write
+        return await self._run(self.update, key, fn, default)
+
+    async def aflush(self):
+        await self._run(self.flush)
+
+    async def arecode(self) -> Tuple[int, int]:
+        return await self._run(self.backend.recode, self.name)
+
+
+def dataset(name: str) -> Dataset:
+    return Dataset(name)
@@ -0,0 +1,71 @@
+# utils/wal.py
+"""
+Single-file write-ahead log of JSON records.
+
+Every ``append`` is fsynced before it returns. The owner replays the log
+on startup and truncates it once a snapshot covering it has been written.
+"""
+import json
+import os
+import threading
+from typing import Any, Iterable, List
+from utils import aio
+
+
+class WriteAheadLog:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self.bytes_written = 0
+
+    def append(self, records: Iterable[Any]) -> int:
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode("utf-8")
+        if not data:
+            return 0
+        with self._lock:
+            with open(self.path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.bytes_written += len(data)
+        return len(data)
+
+    def replay(self) -> List[Any]:
+        """Every complete record in the log, oldest first."""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        records = []
+        for raw in data.splitlines(keepends=True):
+            if not raw.endswith(b"\n"):
+                break  # torn final write from a crash
+            try:
+                records.append(json.loads(raw))
+            except ValueError:
+                break
+        return records
+
+    def truncate(self) -> None:
+        with self._lock:
+            with open(self.path, "wb") as f:
+                os.fsync(f.fileno())
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    # --- coroutine variants, run on the shared I/O pool in order ---
+
+    async def aappend(self, records: Iterable[Any]) -> int:
+        return await aio.run_ordered(self.path, self.append, records)
+
+    async def areplay(self) -> List[Any]:
+        return await aio.run_ordered(self.path, self.replay)
+
+    async def atruncate(self) -> None:
+        await aio.run_ordered(self.path, self.truncate)